@@ -0,0 +1,89 @@
+"""denormalize user_id/goal_id onto knowledge_chunks
+
+Revision ID: 202512170002
+Revises: 202512170001
+Create Date: 2025-12-17 00:10:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "202512170002"
+down_revision = "202512170001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            nullable=True,
+            comment="owner id (copied from document)",
+        ),
+    )
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "goal_id",
+            postgresql.UUID(as_uuid=True),
+            nullable=True,
+            comment="related goal id (copied from document)",
+        ),
+    )
+
+    op.execute(
+        """
+        UPDATE knowledge_chunks AS c
+        SET user_id = d.user_id,
+            goal_id = d.goal_id
+        FROM knowledge_documents AS d
+        WHERE c.document_id = d.id;
+        """
+    )
+    op.alter_column("knowledge_chunks", "user_id", nullable=False)
+
+    op.create_foreign_key(
+        "fk_knowledge_chunks_user_id",
+        "knowledge_chunks",
+        "users",
+        ["user_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "fk_knowledge_chunks_goal_id",
+        "knowledge_chunks",
+        "goals",
+        ["goal_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    # Live rows only: these drive the per-tenant candidate set in search.
+    op.create_index(
+        "ix_knowledge_chunks_user_id_live",
+        "knowledge_chunks",
+        ["user_id"],
+        postgresql_where=sa.text("is_deleted IS false"),
+    )
+    op.create_index(
+        "ix_knowledge_chunks_goal_id_live",
+        "knowledge_chunks",
+        ["goal_id"],
+        postgresql_where=sa.text("is_deleted IS false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_knowledge_chunks_goal_id_live", table_name="knowledge_chunks")
+    op.drop_index("ix_knowledge_chunks_user_id_live", table_name="knowledge_chunks")
+    op.drop_constraint("fk_knowledge_chunks_goal_id", "knowledge_chunks", type_="foreignkey")
+    op.drop_constraint("fk_knowledge_chunks_user_id", "knowledge_chunks", type_="foreignkey")
+    op.drop_column("knowledge_chunks", "goal_id")
+    op.drop_column("knowledge_chunks", "user_id")
@@ -0,0 +1,95 @@
+"""add tsvector column, maintaining trigger and GIN index on knowledge_chunks.content
+
+Revision ID: 202512170003
+Revises: 202512170002
+Create Date: 2025-12-17 00:20:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+
+
+revision = "202512170003"
+down_revision = "202512170002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Text search config is baked into the trigger; queries must use the same
+    # KNOWLEDGE_FTS_CONFIG. A plain nullable column (unlike a generated one)
+    # is added without rewriting the table.
+    tsvector = f"to_tsvector('{settings.KNOWLEDGE_FTS_CONFIG}'::regconfig, %s)"
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "content_tsv",
+            postgresql.TSVECTOR(),
+            nullable=True,
+            comment="full-text search vector of content (set by trigger)",
+        ),
+    )
+    op.execute(
+        f"""
+        CREATE FUNCTION knowledge_chunks_content_tsv_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.content_tsv := {tsvector % "NEW.content"};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER knowledge_chunks_content_tsv
+        BEFORE INSERT OR UPDATE OF content ON knowledge_chunks
+        FOR EACH ROW EXECUTE FUNCTION knowledge_chunks_content_tsv_update();
+        """
+    )
+
+    # Existing rows: short transactions in primary key order, so writers are
+    # never blocked for long. New rows are covered by the trigger meanwhile.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        last_id = None
+        while True:
+            ids = conn.execute(
+                sa.text(
+                    "SELECT id FROM knowledge_chunks "
+                    + ("WHERE id > :last_id " if last_id is not None else "")
+                    + "ORDER BY id LIMIT :batch_size"
+                ),
+                {"last_id": last_id, "batch_size": BACKFILL_BATCH_SIZE},
+            ).scalars().all()
+            if not ids:
+                break
+            conn.execute(
+                sa.text(
+                    f"UPDATE knowledge_chunks SET content_tsv = {tsvector % 'content'} "
+                    "WHERE id = ANY(:ids) AND content_tsv IS NULL"
+                ),
+                {"ids": list(ids)},
+            )
+            last_id = ids[-1]
+
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_chunks_content_tsv
+            ON knowledge_chunks USING gin (content_tsv);
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_knowledge_chunks_content_tsv;")
+    op.execute("DROP TRIGGER IF EXISTS knowledge_chunks_content_tsv ON knowledge_chunks;")
+    op.execute("DROP FUNCTION IF EXISTS knowledge_chunks_content_tsv_update();")
+    op.drop_column("knowledge_chunks", "content_tsv")
@@ -0,0 +1,45 @@
+"""add content_sha256 to knowledge_documents for content-addressed storage
+
+Revision ID: 202512170004
+Revises: 202512170003
+Create Date: 2025-12-17 00:30:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202512170004"
+down_revision = "202512170003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable: documents uploaded before this revision were never hashed and
+    # simply don't take part in deduplication.
+    op.add_column(
+        "knowledge_documents",
+        sa.Column(
+            "content_sha256",
+            sa.String(length=64),
+            nullable=True,
+            comment="sha256 of the uploaded file (hex)",
+        ),
+    )
+    op.create_index(
+        "ix_knowledge_documents_user_id_content_sha256",
+        "knowledge_documents",
+        ["user_id", "content_sha256"],
+        postgresql_where=sa.text("is_deleted IS false AND content_sha256 IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_knowledge_documents_user_id_content_sha256",
+        table_name="knowledge_documents",
+    )
+    op.drop_column("knowledge_documents", "content_sha256")
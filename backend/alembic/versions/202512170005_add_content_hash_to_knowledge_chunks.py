@@ -0,0 +1,39 @@
+"""add content_hash to knowledge_chunks for incremental re-ingestion
+
+Revision ID: 202512170005
+Revises: 202512170004
+Create Date: 2025-12-17 00:40:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202512170005"
+down_revision = "202512170004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "content_hash",
+            sa.String(length=64),
+            nullable=True,
+            comment="sha256 of content (hex)",
+        ),
+    )
+    # Same digest as app.utils.chunk_writer computes for new rows.
+    op.execute(
+        "UPDATE knowledge_chunks "
+        "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex') "
+        "WHERE content_hash IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_chunks", "content_hash")
@@ -0,0 +1,70 @@
+"""add composite partial indexes on live rows for soft-delete tables
+
+Revision ID: 202512170006
+Revises: 202512170005
+Create Date: 2025-12-17 01:30:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "202512170006"
+down_revision = "202512170005"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns) matched to the service queries, which all filter
+# live rows next to the owner/parent key. Soft-deleted rows are never read
+# through these paths, so they are left out of the index.
+#
+# The predicate is spelled exactly like the `.is_(False)` clause the services
+# emit: the planner only uses a partial index when it can prove the query's
+# WHERE implies the index predicate, and an identical clause always does.
+LIVE_INDEXES = [
+    # TaskService.list_tasks (optionally by list), count_tasks_by_goal join
+    ("ix_tasks_user_id_task_list_id_live", "tasks", "user_id, task_list_id"),
+    # count_pending/completed/overdue_tasks, summary task stats
+    ("ix_tasks_user_id_is_completed_end_date_live", "tasks", "user_id, is_completed, end_date"),
+    # list_task_lists (optionally by goal)
+    ("ix_task_lists_user_id_goal_id_live", "task_lists", "user_id, goal_id"),
+    # get_task_list_by_name (default name collision checks)
+    ("ix_task_lists_user_id_name_live", "task_lists", "user_id, name"),
+    # goal stats join of SummaryService
+    ("ix_task_lists_goal_id_live", "task_lists", "goal_id"),
+    # list_goals, get_goal_by_name, summary goal listing ordered by created_at
+    ("ix_goals_user_id_created_at_live", "goals", "user_id, created_at"),
+    # list_phases, phase default names
+    ("ix_phases_goal_id_live", "phases", "goal_id"),
+    # list_summaries (optionally by type), ordered by period_start desc
+    ("ix_summaries_user_id_type_period_start_live", "summaries", "user_id, summary_type, period_start"),
+    # list_documents, ordered by created_at desc
+    ("ix_knowledge_documents_user_id_created_at_live", "knowledge_documents", "user_id, created_at"),
+    # list_documents_by_goal / list_documents_unassigned (goal_id IS NULL)
+    (
+        "ix_knowledge_documents_user_id_goal_id_created_at_live",
+        "knowledge_documents",
+        "user_id, goal_id, created_at",
+    ),
+]
+
+
+def upgrade() -> None:
+    # Built concurrently so the API keeps writing to these tables meanwhile.
+    with op.get_context().autocommit_block():
+        for name, table, columns in LIVE_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} ({columns}) WHERE is_deleted IS false;"
+            )
+        # Planner statistics for the new indexes' tables.
+        for table in dict.fromkeys(table for _, table, _ in LIVE_INDEXES):
+            op.execute(f"ANALYZE {table};")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(LIVE_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
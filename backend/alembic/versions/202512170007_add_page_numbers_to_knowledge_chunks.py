@@ -0,0 +1,45 @@
+"""add page_start/page_end to knowledge_chunks
+
+Revision ID: 202512170007
+Revises: 202512170006
+Create Date: 2025-12-17 02:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202512170007"
+down_revision = "202512170006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable and not backfilled: existing chunks get page numbers the next
+    # time their document is re-ingested.
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "page_start",
+            sa.Integer(),
+            nullable=True,
+            comment="first source page of the chunk (1-based)",
+        ),
+    )
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "page_end",
+            sa.Integer(),
+            nullable=True,
+            comment="last source page of the chunk (1-based)",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_chunks", "page_end")
+    op.drop_column("knowledge_chunks", "page_start")
@@ -0,0 +1,46 @@
+"""add chunk generations so re-ingested chunks stay hidden until reconciled
+
+Revision ID: 202512170008
+Revises: 202512170007
+Create Date: 2025-12-17 02:30:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "202512170008"
+down_revision = "202512170007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Constant defaults: no table rewrite, existing rows read as generation 0.
+    op.add_column(
+        "knowledge_documents",
+        sa.Column(
+            "generation",
+            sa.Integer(),
+            nullable=False,
+            server_default=sa.text("0"),
+            comment="chunk generation visible to search",
+        ),
+    )
+    op.add_column(
+        "knowledge_chunks",
+        sa.Column(
+            "generation",
+            sa.Integer(),
+            nullable=False,
+            server_default=sa.text("0"),
+            comment="ingestion generation that wrote the chunk",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_chunks", "generation")
+    op.drop_column("knowledge_documents", "generation")
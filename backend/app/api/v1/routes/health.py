@@ -1,7 +1,54 @@
+import asyncio
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.services.embedding_batcher import current_embedding_batcher
+from app.services.embedding_cache import EmbeddingCache, get_query_embedding_cache
+from app.services.embedding_service import embedding_cache_model, is_embedding_model_ready
+from app.services.rerank_service import get_rerank_service
 
 router = APIRouter()
 
 @router.get("/health", tags=["health"], summary="Health check")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", tags=["health"], summary="Readiness check")
+async def readiness_check():
+    # With preload enabled, a pod isn't ready until the model is warm.
+    model_loaded = is_embedding_model_ready()
+    ready = model_loaded or not settings.EMBEDDING_PRELOAD
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "embedding_model_loaded": model_loaded,
+        },
+    )
+
+
+@router.get(
+    "/health/embedding-cache",
+    tags=["health"],
+    summary="Embedding cache hit/miss counters",
+)
+async def embedding_cache_stats():
+    response: dict = {"enabled": settings.EMBEDDING_CACHE_ENABLED}
+    if settings.EMBEDDING_CACHE_ENABLED:
+        # Counters are aggregated in Redis across API and worker processes.
+        stats = await asyncio.to_thread(
+            EmbeddingCache(embedding_cache_model()).stats
+        )
+        response.update(hits=stats["total_hits"], misses=stats["total_misses"])
+    if settings.QUERY_EMBEDDING_CACHE_SIZE > 0:
+        # Query cache counters are per API process.
+        response["query"] = get_query_embedding_cache(embedding_cache_model()).stats()
+    batcher = current_embedding_batcher()
+    if batcher is not None:
+        response["microbatch"] = batcher.stats()
+    if get_rerank_service.cache_info().currsize:
+        response["rerank"] = get_rerank_service().stats()
+    return response
\ No newline at end of file
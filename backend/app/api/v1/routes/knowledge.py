@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.responses import StreamingResponse
 import uuid
 
@@ -18,6 +18,7 @@ from app.schemas.knowledge import (
     KnowledgeQueryResponse,
 )
 from app.schemas.user import UserResponse
+from app.services.embedding_batcher import EmbeddingOverloadedError
 from app.services.knowledge_service import KnowledgeService
 
 router = APIRouter(prefix="/knowledge-base", tags=["knowledge_base"])
@@ -50,6 +51,33 @@ async def upload_document(
     return ok(KnowledgeDocumentResponse.model_validate(document), code=201)
 
 
+@router.post(
+    "/documents/batch",
+    response_model=StandardResponse[list[KnowledgeDocumentResponse]],
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_documents(
+    files: list[UploadFile] = File(...),
+    goal_id: str | None = Form(None),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StandardResponse[list[KnowledgeDocumentResponse]]:
+    try:
+        documents = await knowledge_service.upload_documents(
+            db,
+            current_user.id,
+            files,
+            goal_id=uuid.UUID(goal_id) if goal_id else None,
+        )
+    except RuntimeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)
+        ) from exc
+
+    response = [KnowledgeDocumentResponse.model_validate(d) for d in documents]
+    return ok(response, code=201)
+
+
 @router.get(
     "/documents",
     response_model=StandardResponse[list[KnowledgeDocumentResponse]],
@@ -102,10 +130,32 @@ async def download_document(
     current_user: UserResponse = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    path = await knowledge_service.ensure_document_path(
+    path, filename = await knowledge_service.ensure_document_path(
         db, current_user.id, uuid.UUID(document_id)
     )
-    return FileResponse(path, filename=path.name)
+    # Stored names are content hashes; download under the uploaded name.
+    return FileResponse(path, filename=filename)
+
+@router.put(
+    "/documents/{document_id}/file",
+    response_model=StandardResponse[KnowledgeDocumentResponse],
+)
+async def replace_document_file(
+    document_id: str,
+    file: UploadFile = File(...),
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StandardResponse[KnowledgeDocumentResponse]:
+    try:
+        document = await knowledge_service.replace_document_file(
+            db, current_user.id, uuid.UUID(document_id), file
+        )
+    except RuntimeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)
+        ) from exc
+
+    return ok(KnowledgeDocumentResponse.model_validate(document))
 
 @router.patch(
     "/documents/{document_id}/goal",
@@ -149,12 +199,14 @@ async def delete_document(
 @router.post(
     "/query",
     response_model=StandardResponse[KnowledgeQueryResponse],
+    description="With `fields`, each context only carries the requested fields.",
 )
 async def query_knowledge(
     payload: KnowledgeQueryRequest,
     current_user: UserResponse = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-) -> StandardResponse[KnowledgeQueryResponse]:
+) -> StandardResponse[KnowledgeQueryResponse] | JSONResponse:
+    fields = {f.value for f in payload.fields} if payload.fields else None
     try:
         results = await knowledge_service.search(
             db=db,
@@ -162,7 +214,21 @@ async def query_knowledge(
             query=payload.question,
             top_k=payload.top_k,
             document_ids=payload.document_ids if payload.document_ids else None,
+            ef_search=payload.ef_search,
+            goal_id=payload.goal_id,
+            mode=payload.mode,
+            rerank=payload.rerank,
+            # Don't ship chunk text from Postgres if the client doesn't want it.
+            content_chars=(
+                settings.KNOWLEDGE_CONTEXT_PREVIEW_CHARS
+                if fields is None or "content" in fields
+                else 0
+            ),
         )
+    except EmbeddingOverloadedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
+        ) from exc
     except RuntimeError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)
@@ -170,17 +236,33 @@ async def query_knowledge(
 
     contexts = [
         KnowledgeContext(
-            document_id=chunk.document_id,
-            chunk_index=chunk.chunk_index,
-            content=chunk.content[: settings.KNOWLEDGE_CONTEXT_PREVIEW_CHARS],
-            score=float(score),
-            stored_filename=document.stored_filename,
-            original_filename=document.original_filename,
+            document_id=hit.document_id,
+            chunk_index=hit.chunk_index,
+            page_start=hit.page_start,
+            page_end=hit.page_end,
+            content=hit.content,
+            score=hit.score,
+            stored_filename=hit.stored_filename,
+            original_filename=hit.original_filename,
         )
-        for chunk, document, score in results
+        for hit in results
     ]
+    response = ok(KnowledgeQueryResponse(contexts=contexts))
+    if fields is None:
+        return response
 
-    return ok(KnowledgeQueryResponse(contexts=contexts))
+    # The compact payload doesn't fit the response model, so it is
+    # serialized here instead of being validated against it.
+    return JSONResponse(
+        response.model_dump(
+            mode="json",
+            include={
+                "code": True,
+                "message": True,
+                "data": {"contexts": {"__all__": fields}},
+            },
+        )
+    )
 
 
 @router.post(
@@ -226,6 +308,9 @@ async def conversation_stream(
             document_ids=payload.document_ids if payload.document_ids else None,
             conversation_id=payload.conversation_id,
             max_context_chars=payload.max_context_chars,
+            ef_search=payload.ef_search,
+            mode=payload.mode,
+            rerank=payload.rerank,
         ),
         media_type="text/event-stream",
     )
@@ -1,3 +1,4 @@
+from redis import Redis
 from redis import asyncio as aioredis
 
 from .config import settings
@@ -8,6 +9,18 @@ redis_client = aioredis.from_url(
     decode_responses=True,
 )
 
+# Synchronous, binary-safe client: usable from worker threads and Celery tasks
+# regardless of which event loop (if any) is running.
+sync_redis_client = Redis.from_url(
+    f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}",
+    password=settings.REDIS_PASSWORD,
+    decode_responses=False,
+)
+
 
 def get_redis_client() -> aioredis.Redis:
-    return redis_client
\ No newline at end of file
+    return redis_client
+
+
+def get_sync_redis_client() -> Redis:
+    return sync_redis_client
\ No newline at end of file
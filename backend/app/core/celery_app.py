@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import logging
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.concurrency import get_implementation
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from kombu import Queue
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 def _redis_url() -> str:
     # Use explicit CELERY_BROKER_URL if provided, otherwise derive from existing Redis settings.
@@ -31,18 +43,125 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    worker_proc_alive_timeout=settings.CELERY_WORKER_PROC_ALIVE_TIMEOUT,
+    # A worker started without -Q consumes all of these.
+    task_default_queue=settings.CELERY_DEFAULT_QUEUE,
+    task_queues=(
+        Queue(settings.CELERY_DEFAULT_QUEUE),
+        Queue(settings.CELERY_INGEST_QUEUE),
+        Queue(settings.CELERY_SUMMARIES_QUEUE),
+    ),
+    task_routes={
+        "knowledge.ingest_document": {"queue": settings.CELERY_INGEST_QUEUE},
+        "knowledge.ingest_documents": {"queue": settings.CELERY_INGEST_QUEUE},
+        "summaries.*": {"queue": settings.CELERY_SUMMARIES_QUEUE},
+    },
 )
 
-if settings.SUMMARY_AUTOGEN_ENABLED:
-    celery_app.conf.beat_schedule = {
-        "summaries-generate-missing-daily": {
-            "task": "summaries.generate_missing",
-            "schedule": crontab(
-                hour=settings.SUMMARY_AUTOGEN_HOUR_UTC,
-                minute=settings.SUMMARY_AUTOGEN_MINUTE_UTC,
-            ),
+
+def _worker_profile(profile: str | None) -> dict:
+    if profile is None:
+        # One worker for every queue (compose, `make worker`): keep Celery's
+        # defaults (CPU-count concurrency), so summaries aren't stuck behind
+        # a single ingestion process.
+        return {}
+    if profile == "ingest":
+        return {
+            "worker_concurrency": settings.CELERY_INGEST_CONCURRENCY,
+            "worker_pool": settings.CELERY_INGEST_POOL,
+            "worker_prefetch_multiplier": settings.CELERY_INGEST_PREFETCH_MULTIPLIER,
+            "worker_max_memory_per_child": settings.CELERY_INGEST_MAX_MEMORY_PER_CHILD_KB or None,
+        }
+    if profile == "summaries":
+        return {
+            "worker_concurrency": settings.CELERY_SUMMARIES_CONCURRENCY,
+            "worker_pool": settings.CELERY_SUMMARIES_POOL,
+            "worker_prefetch_multiplier": settings.CELERY_SUMMARIES_PREFETCH_MULTIPLIER,
+            "worker_max_memory_per_child": settings.CELERY_SUMMARIES_MAX_MEMORY_PER_CHILD_KB or None,
         }
+    if profile == "default":
+        # Maintenance tasks (GC): short and rare, one at a time is plenty.
+        return {"worker_concurrency": 1, "worker_prefetch_multiplier": 1}
+    raise ValueError(
+        f"Unknown CELERY_WORKER_PROFILE {profile!r}; expected ingest, summaries or default"
+    )
+
+
+# Command line flags (-c, -P, --prefetch-multiplier, ...) still take precedence.
+celery_app.conf.update(_worker_profile(settings.CELERY_WORKER_PROFILE))
+
+
+@worker_init.connect
+def _check_pool(sender, **_kwargs) -> None:
+    from app.core.worker_loop import SUPPORTED_POOLS
+
+    # pool_cls is still the -P / worker_pool value here (a name or a class).
+    pool = get_implementation(sender.pool_cls)
+    if pool not in {get_implementation(name) for name in SUPPORTED_POOLS}:
+        logger.error(
+            "worker pool %s is not supported: async tasks need one of %s",
+            pool.__module__,
+            ", ".join(SUPPORTED_POOLS),
+        )
+
+
+@worker_process_init.connect
+def _reset_db_pools(**_kwargs) -> None:
+    # Connections opened before the fork belong to the parent; drop them
+    # (without closing the parent's sockets) so each child opens its own.
+    from app.core.db import async_engine, sync_engine
+
+    sync_engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+# Prefork children run tasks (and own a loop); the solo pool runs them in the
+# worker process itself. In a prefork parent this finds no loop.
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _close_worker_loop(**_kwargs) -> None:
+    from app.core.worker_loop import close_worker_loop
+
+    close_worker_loop()
+
+
+@worker_process_init.connect
+def _preload_embedding_model(**_kwargs) -> None:
+    # Runs in each pool child after fork, so the first ingestion on a fresh
+    # worker doesn't pay for loading the model.
+    if not settings.EMBEDDING_PRELOAD:
+        return
+    if settings.CELERY_WORKER_PROFILE != "ingest":
+        # Summaries and GC workers never embed, and an all-queues worker runs
+        # CPU-count children: preloading there would hold one model copy per
+        # child. They load it lazily, on their first ingestion.
+        return
+    try:
+        from app.services.embedding_service import warm_up_embedding_model
+
+        warm_up_embedding_model()
+    except Exception as exc:
+        logger.warning("embedding model warm-up failed: %s", exc)
+
+
+beat_schedule: dict = {}
+if settings.SUMMARY_AUTOGEN_ENABLED:
+    beat_schedule["summaries-generate-missing-daily"] = {
+        "task": "summaries.generate_missing",
+        "schedule": crontab(
+            hour=settings.SUMMARY_AUTOGEN_HOUR_UTC,
+            minute=settings.SUMMARY_AUTOGEN_MINUTE_UTC,
+        ),
+    }
+if settings.KNOWLEDGE_GC_ENABLED:
+    beat_schedule["knowledge-gc-daily"] = {
+        "task": "knowledge.gc",
+        "schedule": crontab(
+            hour=settings.KNOWLEDGE_GC_HOUR_UTC,
+            minute=settings.KNOWLEDGE_GC_MINUTE_UTC,
+        ),
     }
+celery_app.conf.beat_schedule = beat_schedule
 
 # Auto-discover tasks by importing `app.tasks` (package)
 celery_app.autodiscover_tasks(["app"])
@@ -40,6 +40,10 @@ class Settings(BaseSettings):
         return [str(origin).rstrip("/") for origin in self.BACKEND_CORS_ORIGINS] + [
                 self.FRONTEND_HOST
         ]
+
+    # gzip responses larger than this many bytes (0 disables compression)
+    GZIP_MINIMUM_SIZE: int = 1000
+    GZIP_COMPRESS_LEVEL: int = 6
     
     POSTGRES_SERVER: str
     POSTGRES_PORT: int = 5432
@@ -83,25 +87,137 @@ class Settings(BaseSettings):
     # Celery (defaults to Redis derived from REDIS_* if not set explicitly)
     CELERY_BROKER_URL: str | None = None
     CELERY_RESULT_BACKEND: str | None = None
+    # Seconds a worker child may spend in process init (model preload) before
+    # Celery considers it dead.
+    CELERY_WORKER_PROC_ALIVE_TIMEOUT: float = 120
+    # Queues: ingestion (long, CPU/memory heavy), summaries (time-sensitive,
+    # mostly waiting on the DB and the AI provider) and everything else.
+    CELERY_DEFAULT_QUEUE: str = "default"
+    CELERY_INGEST_QUEUE: str = "ingest"
+    CELERY_SUMMARIES_QUEUE: str = "summaries"
+    # Tuning profile a worker applies: "ingest" | "summaries" | "default", or
+    # None for a single worker that consumes every queue with Celery's
+    # default settings. See the worker-* Makefile targets. Pools (*_POOL, -P):
+    # "prefork" or "solo" only, see app/core/worker_loop.py.
+    CELERY_WORKER_PROFILE: str | None = None
+    # Ingest workers: one task reserved at a time (no hoarding of big jobs),
+    # and children recycled once resident memory passes the limit (KiB;
+    # 0 disables), since the model plus parser garbage only grows.
+    CELERY_INGEST_CONCURRENCY: int = 1
+    CELERY_INGEST_POOL: str = "prefork"
+    CELERY_INGEST_PREFETCH_MULTIPLIER: int = 1
+    CELERY_INGEST_MAX_MEMORY_PER_CHILD_KB: int = 3_000_000
+    CELERY_SUMMARIES_CONCURRENCY: int = 4
+    CELERY_SUMMARIES_POOL: str = "prefork"
+    CELERY_SUMMARIES_PREFETCH_MULTIPLIER: int = 4
+    CELERY_SUMMARIES_MAX_MEMORY_PER_CHILD_KB: int = 0
     # External AI (Dify/Gemini)
     
     KNOWLEDGE_STORAGE_ROOT: str = "data"
+    # Uploads larger than this are rejected with 413 (0 disables the limit)
+    KNOWLEDGE_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    # Batch upload: files per request, and how many are written to disk at once
+    KNOWLEDGE_BATCH_UPLOAD_MAX_FILES: int = 200
+    KNOWLEDGE_UPLOAD_CONCURRENCY: int = 8
+    # Total size of one batch upload; exceeding it aborts the batch with 413 (0 disables)
+    KNOWLEDGE_BATCH_UPLOAD_MAX_BYTES: int = 1024 * 1024 * 1024
     # Embeddings (local HF)
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
     # Keep 768 to match existing pgvector schema/migration by default.
     EMBEDDING_DIM: int = 768
     # Local HF embedding options
     HF_EMBEDDING_DEVICE: str = "cpu"  # "cpu" | "cuda" | "mps"
+    # Inference backend: "torch" (SentenceTransformers/PyTorch) | "onnx" (ONNX Runtime, CPU)
+    EMBEDDING_BACKEND: str = "torch"
+    # Dynamic int8 quantization for the ONNX backend:
+    # "avx2" | "avx512" | "avx512_vnni" | "arm64"; None keeps fp32 ONNX.
+    EMBEDDING_ONNX_QUANTIZATION: str | None = "avx2"
+    # Where exported/quantized ONNX models are stored
+    EMBEDDING_ONNX_EXPORT_DIR: str = "data/onnx"
     HF_EMBEDDING_BATCH_SIZE: int = 32
+    # Load the model and run a warm-up encode at API startup and in the
+    # children of an ingest-profile worker (other workers load it lazily)
+    EMBEDDING_PRELOAD: bool = True
+    # Persistent (Redis) embedding cache keyed by (model, sha256 of text)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30
+    # In-process TTL+LRU cache for single search queries (0 entries disables it)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 600
+    # Back the query cache with Redis, so repeated queries survive restarts
+    # and are shared across API replicas
+    QUERY_EMBEDDING_CACHE_REDIS: bool = True
+    # API-side micro-batching of concurrent query embeddings
+    EMBEDDING_MICROBATCH_ENABLED: bool = True
+    EMBEDDING_MICROBATCH_WINDOW_MS: float = 5
+    EMBEDDING_MICROBATCH_MAX_BATCH: int = 64
+    EMBEDDING_MICROBATCH_MAX_QUEUE: int = 256
+    EMBEDDING_MICROBATCH_ENQUEUE_TIMEOUT_MS: float = 2000
 
     # Knowledge chunking (tuned for RAG QA; units are characters, not tokens)
     KNOWLEDGE_CHUNK_SIZE: int = 700
     KNOWLEDGE_CHUNK_OVERLAP: int = 120
+    # With KNOWLEDGE_CHUNK_MAX_TOKENS > 0, chunks are sized in tokens of the
+    # embedding model's tokenizer instead (capped at the model's input window,
+    # overlap included) and overlap by KNOWLEDGE_CHUNK_OVERLAP_TOKENS.
+    KNOWLEDGE_CHUNK_MAX_TOKENS: int = 0
+    KNOWLEDGE_CHUNK_OVERLAP_TOKENS: int = 32
+    # PDFs with at least KNOWLEDGE_PDF_PARALLEL_MIN_PAGES pages are extracted by
+    # a pool of KNOWLEDGE_PDF_WORKERS processes, KNOWLEDGE_PDF_PAGES_PER_TASK
+    # pages per task (capped at the CPU count; 0 or 1 worker: page by page in
+    # the ingest worker). Small PDFs aren't worth the pool startup.
+    KNOWLEDGE_PDF_WORKERS: int = 4
+    KNOWLEDGE_PDF_PARALLEL_MIN_PAGES: int = 64
+    KNOWLEDGE_PDF_PAGES_PER_TASK: int = 8
+    # How ingestion writes chunk rows: "copy" | "executemany" | "orm"
+    KNOWLEDGE_INGEST_WRITE_MODE: str = "copy"
+    # Re-ingesting a document keeps chunks whose text is unchanged (and their
+    # embeddings) instead of rebuilding everything.
+    KNOWLEDGE_INGEST_INCREMENTAL: bool = True
+    # ingest_document runs extract+chunk, embed and DB write as concurrent
+    # stages with this many batches queued between them; 0 runs the stages
+    # one after another in the task's thread.
+    KNOWLEDGE_INGEST_PIPELINE_DEPTH: int = 2
     # What we send back to frontend as "context preview" (avoid huge UI payloads)
     KNOWLEDGE_CONTEXT_PREVIEW_CHARS: int = 400
     # Retrieval gating: if best distance is worse than this, skip context.
     # Set to None to disable gating.
     KNOWLEDGE_MAX_DISTANCE: float | None = 0.5
+    # HNSW index on knowledge_chunks.embedding: build parameters (read by the migration that creates the index)
+    KNOWLEDGE_HNSW_M: int = 16
+    KNOWLEDGE_HNSW_EF_CONSTRUCTION: int = 64
+    # Per-query search effort (higher = better recall, slower); overridable per request
+    KNOWLEDGE_HNSW_EF_SEARCH: int = 64
+    # pgvector >= 0.8 iterative index scans for filtered (per-user) search:
+    # "relaxed_order" | "strict_order"; None leaves the server default (off).
+    KNOWLEDGE_ITERATIVE_SCAN: str | None = "relaxed_order"
+    # Tenants (or document filters) with at most this many live chunks are
+    # ranked exactly instead of through the ANN index. 0 always uses the index.
+    KNOWLEDGE_EXACT_SEARCH_MAX_CHUNKS: int = 20000
+    # Full-text search (hybrid mode). "simple" avoids language-specific stemming,
+    # which suits a multilingual corpus and exact tokens like error codes.
+    KNOWLEDGE_FTS_CONFIG: str = "simple"
+    # Candidates fetched from each retriever before reciprocal rank fusion
+    KNOWLEDGE_HYBRID_CANDIDATES: int = 50
+    # RRF constant: score = sum(1 / (k + rank))
+    KNOWLEDGE_RRF_K: int = 60
+    # Optional cross-encoder reranking of the first-stage candidates.
+    # Per-request `rerank` overrides KNOWLEDGE_RERANK_ENABLED.
+    KNOWLEDGE_RERANK_ENABLED: bool = False
+    KNOWLEDGE_RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    # Candidates fetched and rescored per query (more = better precision, slower)
+    KNOWLEDGE_RERANK_CANDIDATES: int = 30
+    KNOWLEDGE_RERANK_MAX_LENGTH: int = 512
+    KNOWLEDGE_RERANK_BATCH_SIZE: int = 32
+    # Rerank jobs queued or running at once per process; further requests
+    # wait for a slot, within the budget below.
+    KNOWLEDGE_RERANK_MAX_PENDING: int = 4
+    # Search time (embedding + retrieval + rerank) after which reranking is
+    # skipped or abandoned and the vector order is returned. 0 disables it.
+    KNOWLEDGE_RERANK_BUDGET_MS: int = 400
+    # Score cache keyed by (query, chunk); per process
+    KNOWLEDGE_RERANK_CACHE_SIZE: int = 4096
+    KNOWLEDGE_RERANK_CACHE_TTL_SECONDS: int = 600
 
     # Dify (LLM QA)
     DIFY_API_BASE: str = "https://api.dify.ai/v1"
@@ -109,8 +225,34 @@ class Settings(BaseSettings):
     DIFY_KB_API_KEY: str | None = None
     DIFY_SUMMARY_API_KEY: str | None = None
 
+    # Physical cleanup of soft-deleted knowledge rows and unreferenced files
+    KNOWLEDGE_GC_ENABLED: bool = True
+    KNOWLEDGE_GC_HOUR_UTC: int = 3
+    KNOWLEDGE_GC_MINUTE_UTC: int = 30
+    # Only rows/files deleted (or written) longer ago than this are collected;
+    # keep it above the longest upload, whose temp file is unreferenced
+    KNOWLEDGE_GC_GRACE_HOURS: int = 24
+    # Rows per DELETE statement, and the maximum number of batches per run
+    KNOWLEDGE_GC_BATCH_SIZE: int = 5000
+    KNOWLEDGE_GC_MAX_BATCHES: int = 200
+    # Report what would be reclaimed without changing anything
+    KNOWLEDGE_GC_DRY_RUN: bool = False
+    # VACUUM knowledge_chunks when dead tuples reach this share of the table
+    KNOWLEDGE_GC_VACUUM_DEAD_RATIO: float = 0.1
+    # REINDEX the vector index when a run deletes this share of the chunks
+    KNOWLEDGE_GC_REINDEX_RATIO: float = 0.2
+
     SUMMARY_AUTOGEN_ENABLED: bool = True
     SUMMARY_AUTOGEN_HOUR_UTC: int = 23
     SUMMARY_AUTOGEN_MINUTE_UTC: int = 55
+    # The nightly run pages through users and fans out one subtask per
+    # SUMMARY_FANOUT_BATCH_SIZE users; each works on up to
+    # SUMMARY_USER_CONCURRENCY users at a time and starts at most
+    # SUMMARY_AI_RATE_PER_SECOND AI provider calls per second (per subtask,
+    # so the provider sees up to CELERY_SUMMARIES_CONCURRENCY times that;
+    # 0 disables the limit).
+    SUMMARY_FANOUT_BATCH_SIZE: int = 100
+    SUMMARY_USER_CONCURRENCY: int = 8
+    SUMMARY_AI_RATE_PER_SECOND: float = 2.0
     
 settings = Settings()  # type: ignore[assignment]
@@ -0,0 +1,70 @@
+"""
+Event loop for the async code called from Celery tasks.
+
+Supported pools: prefork (the default) and solo. Both run every task on the
+main thread of their process, so each process has one loop, which is closed
+with the async engine's pool when the process shuts down. Thread-based pools
+would run one loop per thread over the one shared async engine, whose pooled
+asyncpg connections are bound to the loop that opened them; run_async
+refuses to run off the main thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Names (as given to -P / CELERY_*_POOL) of the pools run_async supports.
+SUPPORTED_POOLS = ("prefork", "processes", "solo")
+
+_local = threading.local()
+
+
+def _loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _local.loop = loop
+    return loop
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine from sync code (Celery tasks) on this thread's
+    persistent event loop.
+
+    Unlike asyncio.run, the loop outlives the call, so the async engine's
+    pooled asyncpg connections (which are bound to the loop that opened
+    them) are reused by the next task instead of being left to a closed loop.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        coro.close()
+        raise RuntimeError(
+            "run_async must run on the worker process's main thread; "
+            f"use one of the {', '.join(SUPPORTED_POOLS)} pools"
+        )
+    return _loop().run_until_complete(coro)
+
+
+def close_worker_loop() -> None:
+    """Dispose the async engine's pool and close this thread's loop."""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        return
+    from app.core.db import async_engine
+
+    try:
+        loop.run_until_complete(async_engine.dispose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except Exception as exc:
+        logger.warning("closing the worker event loop failed: %s", exc)
+    finally:
+        loop.close()
+        _local.loop = None
@@ -1,13 +1,56 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 
 from .api.v1.main import api_router
 from .core.config import settings
+from .services.embedding_batcher import current_embedding_batcher
+from .services.embedding_service import warm_up_embedding_model
+from .services.rerank_service import warm_up_reranker
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_models() -> None:
+    if settings.EMBEDDING_PRELOAD:
+        try:
+            await asyncio.to_thread(warm_up_embedding_model)
+        except Exception as exc:
+            # Keep serving non-knowledge routes; /health/ready stays 503.
+            logger.warning("embedding model warm-up failed: %s", exc)
+    if settings.KNOWLEDGE_RERANK_ENABLED:
+        try:
+            await asyncio.to_thread(warm_up_reranker)
+        except Exception as exc:
+            # Searches keep working; they skip reranking until it loads.
+            logger.warning("reranker warm-up failed: %s", exc)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models in the background so the app (and liveness probes) answer
+    # right away; /health/ready reports "starting" until the model is warm.
+    warm_up = asyncio.create_task(_warm_up_models())
+    yield
+    # A load already running in its thread is not interrupted, only awaited
+    # no further.
+    warm_up.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up
+    batcher = current_embedding_batcher()
+    if batcher is not None:
+        await batcher.close()
+
 
 app = FastAPI(
     title="AuroraMind",
     description="An AI Personal Growth Platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -20,4 +63,13 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Search results and document lists are verbose JSON; compress them.
+# Starlette leaves text/event-stream alone, so SSE is not buffered.
+if settings.GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.GZIP_MINIMUM_SIZE,
+        compresslevel=settings.GZIP_COMPRESS_LEVEL,
+    )
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
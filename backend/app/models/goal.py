@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import String, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.schema import ForeignKey
@@ -19,3 +19,13 @@ class Goal(BaseModel):
     user_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, comment="owner id"
     )
+
+    # Live-row indexes from migration 202512170006
+    __table_args__ = (
+        Index(
+            "ix_goals_user_id_created_at_live",
+            "user_id",
+            "created_at",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+    )
@@ -4,8 +4,8 @@ import uuid
 from typing import TYPE_CHECKING
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Index, Integer, Text, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import FetchedValue, Index, Integer, String, Text, ForeignKey, text
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.config import settings
@@ -24,17 +24,78 @@ class KnowledgeChunk(BaseModel):
         nullable=False,
         comment="related document id",
     )
+    # Copied from the document so per-user vector search can filter chunks
+    # without joining (and scanning) other tenants' rows.
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id"),
+        nullable=False,
+        comment="owner id (copied from document)",
+    )
+    goal_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("goals.id", ondelete="SET NULL"),
+        nullable=True,
+        comment="related goal id (copied from document)",
+    )
     chunk_index: Mapped[int] = mapped_column(
         Integer, nullable=False, comment="chunk order in document"
     )
     content: Mapped[str] = mapped_column(
         Text, nullable=False, comment="chunk text content"
     )
+    # Source pages of paged formats (PDF); NULL for plain text and DOCX.
+    page_start: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, comment="first source page of the chunk (1-based)"
+    )
+    page_end: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, comment="last source page of the chunk (1-based)"
+    )
+    # Lets re-ingestion keep rows (and embeddings) whose text is unchanged.
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, comment="sha256 of content (hex)"
+    )
+    # Set by a trigger from content (with KNOWLEDGE_FTS_CONFIG, see migration
+    # 202512170003); deferred so entity loads don't carry it.
+    content_tsv: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+        nullable=True,
+        deferred=True,
+        comment="full-text search vector of content (set by trigger)",
+    )
+    # Search only sees chunks up to the document's generation, so rows
+    # written by an incremental re-ingest stay hidden until it completes.
+    generation: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="ingestion generation that wrote the chunk",
+    )
     embedding: Mapped[list[float]] = mapped_column(
         Vector(settings.EMBEDDING_DIM), nullable=False, comment="vector embedding"
     )
 
     document: Mapped["KnowledgeDocument"] = relationship(back_populates="chunks")
 
-    __table_args__ = (Index("ix_knowledge_chunks_document_id", "document_id"),)
+    __table_args__ = (
+        Index("ix_knowledge_chunks_document_id", "document_id"),
+        Index(
+            "ix_knowledge_chunks_user_id_live",
+            "user_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_knowledge_chunks_goal_id_live",
+            "goal_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_knowledge_chunks_content_tsv",
+            "content_tsv",
+            postgresql_using="gin",
+        ),
+    )
 
@@ -4,7 +4,7 @@ import uuid
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Integer, String, ForeignKey, Text
+from sqlalchemy import Index, Integer, String, ForeignKey, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -47,6 +47,9 @@ class KnowledgeDocument(BaseModel):
     file_size: Mapped[int] = mapped_column(
         Integer, nullable=False, comment="file size in bytes"
     )
+    content_sha256: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, comment="sha256 of the uploaded file (hex)"
+    )
     status: Mapped[str] = mapped_column(
         String(32), nullable=False, default="ready", comment="ingestion status"
     )
@@ -59,9 +62,38 @@ class KnowledgeDocument(BaseModel):
     error_message: Mapped[str | None] = mapped_column(
         Text, nullable=True, comment="ingestion error (if failed)"
     )
+    # Highest chunk generation visible to search (see KnowledgeChunk.generation)
+    generation: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+        comment="chunk generation visible to search",
+    )
 
     chunks: Mapped[list["KnowledgeChunk"]] = relationship(
         back_populates="document", cascade="all, delete-orphan"
     )
     goal: Mapped["Goal | None"] = relationship()
 
+    __table_args__ = (
+        Index(
+            "ix_knowledge_documents_user_id_content_sha256",
+            "user_id",
+            "content_sha256",
+            postgresql_where=text("is_deleted IS false AND content_sha256 IS NOT NULL"),
+        ),
+        Index(
+            "ix_knowledge_documents_user_id_created_at_live",
+            "user_id",
+            "created_at",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_knowledge_documents_user_id_goal_id_created_at_live",
+            "user_id",
+            "goal_id",
+            "created_at",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+    )
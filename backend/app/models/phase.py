@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import String, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.schema import ForeignKey
@@ -16,3 +16,12 @@ class Phase(BaseModel):
     goal_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("goals.id"), nullable=False, comment="goal id"
     )
+
+    # Live-row indexes from migration 202512170006
+    __table_args__ = (
+        Index(
+            "ix_phases_goal_id_live",
+            "goal_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+    )
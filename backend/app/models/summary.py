@@ -1,6 +1,6 @@
 from datetime import date
 
-from sqlalchemy import Date, Integer, String, Text
+from sqlalchemy import Date, Index, Integer, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.schema import ForeignKey, UniqueConstraint
@@ -18,6 +18,14 @@ class Summary(BaseModel):
             "period_start",
             name="uq_summaries_user_type_start",
         ),
+        # Live-row index from migration 202512170006
+        Index(
+            "ix_summaries_user_id_type_period_start_live",
+            "user_id",
+            "summary_type",
+            "period_start",
+            postgresql_where=text("is_deleted IS false"),
+        ),
     )
 
     user_id: Mapped[uuid.UUID] = mapped_column(
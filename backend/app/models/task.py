@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, String, DateTime
+from sqlalchemy import Boolean, String, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.schema import ForeignKey
@@ -37,3 +37,20 @@ class Task(BaseModel):
     completed_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, comment="completion timestamp"
     )
+
+    # Live-row indexes from migration 202512170006
+    __table_args__ = (
+        Index(
+            "ix_tasks_user_id_task_list_id_live",
+            "user_id",
+            "task_list_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_tasks_user_id_is_completed_end_date_live",
+            "user_id",
+            "is_completed",
+            "end_date",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import String, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.schema import ForeignKey
@@ -22,3 +22,24 @@ class TaskList(BaseModel):
         nullable=True,
         comment="linked goal id",
     )
+
+    # Live-row indexes from migration 202512170006
+    __table_args__ = (
+        Index(
+            "ix_task_lists_user_id_goal_id_live",
+            "user_id",
+            "goal_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_task_lists_user_id_name_live",
+            "user_id",
+            "name",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+        Index(
+            "ix_task_lists_goal_id_live",
+            "goal_id",
+            postgresql_where=text("is_deleted IS false"),
+        ),
+    )
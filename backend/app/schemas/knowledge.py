@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
+from enum import Enum
 
 from pydantic import BaseModel, Field
 
@@ -23,10 +24,39 @@ class KnowledgeDocumentResponse(BaseModel):
         from_attributes = True
 
 
+class KnowledgeSearchMode(str, Enum):
+    vector = "vector"
+    hybrid = "hybrid"
+
+
+class KnowledgeContextField(str, Enum):
+    document_id = "document_id"
+    chunk_index = "chunk_index"
+    page_start = "page_start"
+    page_end = "page_end"
+    content = "content"
+    score = "score"
+    stored_filename = "stored_filename"
+    original_filename = "original_filename"
+
+
 class KnowledgeQueryRequest(BaseModel):
     question: str = Field(..., description="user question to search")
     top_k: int = Field(5, ge=1, le=20)
     document_ids: list[uuid.UUID] | None = None
+    goal_id: uuid.UUID | None = Field(None, description="only search documents of this goal")
+    mode: KnowledgeSearchMode = Field(
+        KnowledgeSearchMode.vector,
+        description="vector: cosine only; hybrid: full-text rank fused with cosine (RRF)",
+    )
+    # ANN search effort override (default comes from settings)
+    ef_search: int | None = Field(None, ge=1, le=1000, description="HNSW ef_search")
+    rerank: bool | None = Field(
+        None, description="rerank candidates with the cross-encoder (default from settings)"
+    )
+    fields: list[KnowledgeContextField] | None = Field(
+        None, description="only return these context fields (default: all)"
+    )
 
 
 class KnowledgeConversationRequest(BaseModel):
@@ -36,6 +66,9 @@ class KnowledgeConversationRequest(BaseModel):
     conversation_id: str | None = None
     # Hard cap to avoid huge prompts (characters, not tokens).
     max_context_chars: int = Field(12000, ge=1000, le=50000)
+    mode: KnowledgeSearchMode = KnowledgeSearchMode.vector
+    ef_search: int | None = Field(None, ge=1, le=1000, description="HNSW ef_search")
+    rerank: bool | None = None
 
 class KnowledgeDocumentGoalUpdateRequest(BaseModel):
     goal_id: uuid.UUID | None
@@ -44,6 +77,9 @@ class KnowledgeDocumentGoalUpdateRequest(BaseModel):
 class KnowledgeContext(BaseModel):
     document_id: uuid.UUID
     chunk_index: int
+    # Source pages (PDF only)
+    page_start: int | None = None
+    page_end: int | None = None
     content: str
     score: float
     stored_filename: str
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingOverloadedError(RuntimeError):
+    """Raised when the embedding queue stays full past the enqueue timeout."""
+
+
+@dataclass
+class _Request:
+    texts: list[str]
+    future: asyncio.Future = field(repr=False)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into a single model call.
+
+    Requests are queued; one consumer task waits for the first request, keeps
+    collecting for `window_ms` (or until `max_batch` texts are queued), then runs
+    one encode in a worker thread and hands each caller its rows. Only one encode
+    runs at a time, so concurrent queries no longer fight over the GIL and BLAS
+    threads. The queue is bounded: when it is full, callers wait up to
+    `enqueue_timeout_ms` and then get EmbeddingOverloadedError.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        *,
+        window_ms: float | None = None,
+        max_batch: int | None = None,
+        max_queue: int | None = None,
+        enqueue_timeout_ms: float | None = None,
+    ) -> None:
+        self._encode = encode
+        self.window_s = (
+            settings.EMBEDDING_MICROBATCH_WINDOW_MS if window_ms is None else window_ms
+        ) / 1000
+        self.max_batch = max(
+            int(settings.EMBEDDING_MICROBATCH_MAX_BATCH if max_batch is None else max_batch), 1
+        )
+        self.enqueue_timeout_s = (
+            settings.EMBEDDING_MICROBATCH_ENQUEUE_TIMEOUT_MS
+            if enqueue_timeout_ms is None
+            else enqueue_timeout_ms
+        ) / 1000
+        self._queue: asyncio.Queue[_Request] = asyncio.Queue(
+            maxsize=max(
+                int(settings.EMBEDDING_MICROBATCH_MAX_QUEUE if max_queue is None else max_queue), 1
+            )
+        )
+        self._consumer: asyncio.Task | None = None
+
+        self.batches = 0
+        self.batched_texts = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_consumer(self) -> None:
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._run())
+
+    async def submit(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, settings.EMBEDDING_DIM), dtype=np.float32)
+        self._ensure_consumer()
+
+        request = _Request(texts=texts, future=asyncio.get_running_loop().create_future())
+        try:
+            await asyncio.wait_for(self._queue.put(request), self.enqueue_timeout_s)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise EmbeddingOverloadedError(
+                f"Embedding queue is full ({self._queue.maxsize} pending requests)"
+            ) from None
+        return await request.future
+
+    async def _collect(self) -> list[_Request]:
+        batch = [await self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = asyncio.get_running_loop().time() + self.window_s
+        while size < self.max_batch:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (cancelled) don't need their rows.
+            batch = [r for r in batch if not r.future.done()]
+            if not batch:
+                continue
+
+            texts = [t for r in batch for t in r.texts]
+            try:
+                mat = await asyncio.to_thread(self._encode, texts)
+            except Exception as exc:
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.batched_texts += len(texts)
+            offset = 0
+            for r in batch:
+                n = len(r.texts)
+                if not r.future.done():
+                    r.future.set_result(mat[offset : offset + n])
+                offset += n
+
+    async def close(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "texts": self.batched_texts,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0,
+            "rejected": self.rejected,
+        }
+
+
+# asyncio queues and futures belong to one event loop; keep one batcher per loop.
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingBatcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_embedding_batcher(
+    encode: Callable[[list[str]], np.ndarray],
+) -> EmbeddingBatcher:
+    """Return the batcher for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = EmbeddingBatcher(encode)
+        _batchers[loop] = batcher
+    return batcher
+
+
+def current_embedding_batcher() -> EmbeddingBatcher | None:
+    try:
+        return _batchers.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return None
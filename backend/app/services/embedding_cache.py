@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+from redis import Redis
+from redis.client import Pipeline
+
+from app.core.cache import get_sync_redis_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a search query: NFKC, trimmed, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Redis-backed cache of normalized embeddings keyed by (model name, sha256 of text).
+
+    Synchronous on purpose: it is called from the embedding worker thread, so the
+    same code path works in the API and in Celery tasks. Redis failures are
+    logged and treated as misses; the cache never fails an embedding request.
+    """
+
+    KEY_PREFIX = "embcache"
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        namespace: str = "text",
+        ttl_seconds: int | None = None,
+        client: Redis | None = None,
+    ) -> None:
+        self.model_name = model_name
+        self.namespace = namespace
+        self.ttl_seconds = (
+            settings.EMBEDDING_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.client = client or get_sync_redis_client()
+        self.hits = 0
+        self.misses = 0
+        # Counted here but not yet added to the shared counters in Redis.
+        self._unsent_hits = 0
+        self._unsent_misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, digest: str) -> str:
+        return f"{self.KEY_PREFIX}:{self.namespace}:{self.model_name}:{digest}"
+
+    @property
+    def _stats_key(self) -> str:
+        return f"{self.KEY_PREFIX}:stats:{self.namespace}:{self.model_name}"
+
+    def _record(self, hits: int, misses: int, *, sent: bool = False) -> None:
+        with self._lock:
+            if not sent:
+                self.hits += hits
+                self.misses += misses
+            self._unsent_hits += hits
+            self._unsent_misses += misses
+
+    def _queue_stats(self, pipe: Pipeline) -> tuple[int, int]:
+        """
+        Queue the unsent hit/miss counts on `pipe`, so the shared counters
+        ride along with the next cache command instead of costing a round
+        trip of their own. Put them back with _record(..., sent=True) if
+        the pipeline fails.
+        """
+        with self._lock:
+            hits, misses = self._unsent_hits, self._unsent_misses
+            self._unsent_hits = self._unsent_misses = 0
+        if hits:
+            pipe.hincrby(self._stats_key, "hits", hits)
+        if misses:
+            pipe.hincrby(self._stats_key, "misses", misses)
+        return hits, misses
+
+    def get_many(self, digests: Sequence[str]) -> list[np.ndarray | None]:
+        if not digests:
+            return []
+        queued = (0, 0)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            queued = self._queue_stats(pipe)
+            pipe.mget([self._key(d) for d in digests])
+            raw = pipe.execute()[-1]
+        except Exception as exc:
+            logger.warning("embedding cache lookup failed: %s", exc)
+            self._record(*queued, sent=True)
+            raw = [None] * len(digests)
+
+        out: list[np.ndarray | None] = []
+        for value in raw:
+            vec = None
+            if isinstance(value, bytes):
+                arr = np.frombuffer(value, dtype="<f4")
+                if arr.shape[0] == settings.EMBEDDING_DIM:
+                    vec = arr
+            out.append(vec)
+
+        hits = sum(1 for v in out if v is not None)
+        self._record(hits, len(out) - hits)
+        return out
+
+    def set_many(self, digests: Sequence[str], vectors: np.ndarray) -> None:
+        if not digests:
+            return
+        queued = (0, 0)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            queued = self._queue_stats(pipe)
+            for digest, vec in zip(digests, vectors):
+                pipe.set(
+                    self._key(digest),
+                    np.asarray(vec, dtype="<f4").tobytes(),
+                    ex=self.ttl_seconds or None,
+                )
+            pipe.execute()
+        except Exception as exc:
+            logger.warning("embedding cache store failed: %s", exc)
+            self._record(*queued, sent=True)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters for this process and for all processes (from Redis)."""
+        with self._lock:
+            local_hits, local_misses = self.hits, self.misses
+        total_hits = total_misses = 0
+        queued = (0, 0)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            queued = self._queue_stats(pipe)
+            pipe.hgetall(self._stats_key)
+            raw = pipe.execute()[-1]
+            total_hits = int(raw.get(b"hits", 0))
+            total_misses = int(raw.get(b"misses", 0))
+        except Exception as exc:
+            logger.debug("embedding cache stats read failed: %s", exc)
+            self._record(*queued, sent=True)
+        return {
+            "hits": local_hits,
+            "misses": local_misses,
+            "total_hits": total_hits,
+            "total_misses": total_misses,
+        }
+
+
+class QueryEmbeddingCache:
+    """
+    In-process TTL + LRU cache of query embeddings, optionally backed by the
+    shared Redis cache so every API replica benefits from a single encode.
+
+    Also tracks how much model time it saved: every miss updates a moving
+    average of encode latency, and every hit is credited with that average
+    minus the time the lookup itself took.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        max_entries: int | None = None,
+        ttl_seconds: int | None = None,
+        remote: EmbeddingCache | None = None,
+    ) -> None:
+        self.model_name = model_name
+        self.max_entries = max(
+            int(settings.QUERY_EMBEDDING_CACHE_SIZE if max_entries is None else max_entries), 1
+        )
+        self.ttl_seconds = (
+            settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.remote = remote
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._avg_encode_seconds = 0.0
+
+    def get(self, key: str) -> np.ndarray | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, vec = entry
+            if expires_at < now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, vec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_remote(self, key: str) -> np.ndarray | None:
+        if self.remote is None:
+            return None
+        return self.remote.get_many([content_hash(key)])[0]
+
+    def put_remote(self, key: str, vec: np.ndarray) -> None:
+        if self.remote is not None:
+            self.remote.set_many([content_hash(key)], np.asarray([vec]))
+
+    def record_hit(self, *, remote: bool, lookup_seconds: float) -> None:
+        with self._lock:
+            if remote:
+                self.remote_hits += 1
+            else:
+                self.local_hits += 1
+            self.saved_seconds += max(self._avg_encode_seconds - lookup_seconds, 0.0)
+
+    def record_miss(self, encode_seconds: float) -> None:
+        with self._lock:
+            self.misses += 1
+            if self.misses == 1:
+                self._avg_encode_seconds = encode_seconds
+            else:
+                self._avg_encode_seconds = (
+                    0.9 * self._avg_encode_seconds + 0.1 * encode_seconds
+                )
+
+    def stats(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "avg_encode_ms": round(self._avg_encode_seconds * 1000, 2),
+                "saved_ms": round(self.saved_seconds * 1000, 2),
+            }
+
+
+@lru_cache(maxsize=None)
+def get_query_embedding_cache(model_name: str) -> QueryEmbeddingCache:
+    """Process-wide query cache, shared by every EmbeddingService instance."""
+    remote = None
+    if settings.QUERY_EMBEDDING_CACHE_REDIS:
+        remote = EmbeddingCache(
+            model_name,
+            namespace="query",
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+        )
+    return QueryEmbeddingCache(model_name, remote=remote)
@@ -1,67 +1,318 @@
 from __future__ import annotations
 
-from typing import Sequence, cast
+from typing import Any, Sequence, cast
 import asyncio
+import copy
+import os
+import shutil
+import tempfile
+import threading
+import time
 from functools import lru_cache
+from pathlib import Path
 
 import numpy as np
 
 from app.core.config import settings
+from app.services.embedding_batcher import EmbeddingOverloadedError, get_embedding_batcher
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    content_hash,
+    get_query_embedding_cache,
+    normalize_query,
+)
 
 
-@lru_cache(maxsize=1)
-def _load_sentence_transformer():
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+
+def _load_onnx_model():
+    """
+    Load the model on ONNX Runtime, exporting (and optionally int8-quantizing)
+    it on first use. Exports are kept under EMBEDDING_ONNX_EXPORT_DIR, so only
+    the first process pays for the conversion. The API and worker processes
+    share that directory: each export is written to a private directory and
+    renamed into place, so nobody ever loads a half-written model.
+    """
+    from sentence_transformers import (  # type: ignore
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    quantization = settings.EMBEDDING_ONNX_QUANTIZATION
+    file_name = f"model_qint8_{quantization}.onnx" if quantization else "model.onnx"
+    variant = f"qint8_{quantization}" if quantization else "fp32"
+    export_dir = (
+        Path(settings.EMBEDDING_ONNX_EXPORT_DIR).expanduser().resolve()
+        / settings.EMBEDDING_MODEL_NAME.replace("/", "__")
+        / variant
+    )
+    model_path = export_dir / "onnx" / file_name
+
+    if not model_path.exists():
+        export_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=export_dir.parent, prefix=f".{variant}-"))
+        try:
+            # Converts the HF checkpoint to fp32 ONNX unless the repo ships one.
+            model = SentenceTransformer(
+                settings.EMBEDDING_MODEL_NAME, backend="onnx", device="cpu"
+            )
+            model.save_pretrained(str(tmp_dir))
+            if quantization:
+                export_dynamic_quantized_onnx_model(
+                    model,
+                    quantization_config=quantization,
+                    model_name_or_path=str(tmp_dir),
+                )
+            try:
+                os.replace(tmp_dir, export_dir)
+            except OSError:
+                # Another process published the same export first.
+                if not model_path.exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return SentenceTransformer(
+        str(export_dir),
+        backend="onnx",
+        device="cpu",
+        model_kwargs={"file_name": f"onnx/{file_name}"},
+    )
+
+
+@lru_cache(maxsize=len(EMBEDDING_BACKENDS))
+def load_embedding_model(backend: str):
     # Lazy import so environments that use Gemini don't need these deps.
     from sentence_transformers import SentenceTransformer  # type: ignore
 
-    model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device=settings.HF_EMBEDDING_DEVICE)
-    return model
+    if backend == "torch":
+        return SentenceTransformer(
+            settings.EMBEDDING_MODEL_NAME, device=settings.HF_EMBEDDING_DEVICE
+        )
+    if backend == "onnx":
+        try:
+            return _load_onnx_model()
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=onnx needs the ONNX extras: "
+                "uv sync --extra onnx"
+            ) from e
+    raise ValueError(
+        f"Unknown embedding backend {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}"
+    )
+
+
+_model_warm = False
+
+_tokenizer_copies = threading.local()
+
+
+def _chunking_tokenizer(backend: str) -> Any:
+    # model.encode reconfigures the model's fast tokenizer (truncation,
+    # padding) on every call, so using it from another thread at the same
+    # time fails with "Already borrowed" or mis-pads a batch. Chunking (which
+    # runs in the ingest pipeline's extract thread) gets a copy per thread.
+    copies: dict[str, Any] | None = getattr(_tokenizer_copies, "by_backend", None)
+    if copies is None:
+        copies = _tokenizer_copies.by_backend = {}
+    tokenizer = copies.get(backend)
+    if tokenizer is None:
+        tokenizer = copies[backend] = copy.deepcopy(load_embedding_model(backend).tokenizer)
+    return tokenizer
+
+
+def is_embedding_model_ready() -> bool:
+    """True once the model is loaded and has served at least one encode."""
+    return _model_warm and load_embedding_model.cache_info().currsize > 0
+
+
+def warm_up_embedding_model() -> None:
+    """
+    Load the model and run one throwaway encode, so the first real request
+    doesn't pay for weight loading and lazy kernel initialisation.
+    Blocking; call it from a thread or a process init hook.
+    """
+    EmbeddingService()._encode(["warm-up"])
+
+
+def embedding_cache_model(backend: str | None = None) -> str:
+    """
+    Model key of the embedding caches. Quantized vectors differ slightly
+    from full precision ones; keep their cache entries apart.
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "onnx":
+        quantization = settings.EMBEDDING_ONNX_QUANTIZATION or "fp32"
+        return f"{settings.EMBEDDING_MODEL_NAME}:onnx-{quantization}"
+    return settings.EMBEDDING_MODEL_NAME
 
 
 class EmbeddingService:
     """Local HF SentenceTransformers embeddings."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: EmbeddingCache | None = None,
+        backend: str | None = None,
+    ) -> None:
         self.model = settings.EMBEDDING_MODEL_NAME
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        cache_model = embedding_cache_model(self.backend)
+        if cache is None and settings.EMBEDDING_CACHE_ENABLED:
+            cache = EmbeddingCache(cache_model)
+        self.cache = cache
+        self.query_cache: QueryEmbeddingCache | None = None
+        if settings.QUERY_EMBEDDING_CACHE_SIZE > 0:
+            self.query_cache = get_query_embedding_cache(cache_model)
+
+    def token_budget(self) -> int:
+        """Tokens of a text the model embeds; longer inputs are truncated."""
+        model = load_embedding_model(self.backend)
+        return int(model.max_seq_length) - model.tokenizer.num_special_tokens_to_add()
+
+    def token_offsets(self, text: str) -> list[int]:
+        """
+        Start offset in `text` of each of its tokens (special tokens excluded).
+        Safe to call while another thread is encoding.
+        """
+        tokenizer = _chunking_tokenizer(self.backend)
+        encoded = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+        return [start for start, _ in encoded["offset_mapping"]]
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        model = load_embedding_model(self.backend)
+        batch_size = max(int(settings.HF_EMBEDDING_BATCH_SIZE or 32), 1)
+
+        # returns np.ndarray (N, D)
+        mat = cast(
+            np.ndarray,
+            model.encode(
+                texts,
+                batch_size=batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=False,
+            ),
+        )
+
+        if mat.ndim != 2:
+            raise RuntimeError(f"Unexpected embedding shape: {mat.shape!r}")
+        if mat.shape[1] != settings.EMBEDDING_DIM:
+            raise RuntimeError(
+                f"Embedding dim mismatch: got {mat.shape[1]}, expected {settings.EMBEDDING_DIM}. "
+                f"Check EMBEDDING_MODEL_NAME/EMBEDDING_DIM."
+            )
+
+        global _model_warm
+        _model_warm = True
+
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-10
+        return (mat / norms).astype(np.float32)
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        if self.cache is None:
+            return self._encode(texts)
+
+        # Identical texts (repeated headers, licences, templates) are looked up
+        # and encoded once.
+        digests = [content_hash(t) for t in texts]
+        unique: dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            unique.setdefault(digest, text)
+        unique_digests = list(unique)
+
+        found: dict[str, np.ndarray] = {}
+        for digest, vec in zip(unique_digests, self.cache.get_many(unique_digests)):
+            if vec is not None:
+                found[digest] = vec
+
+        missing = [d for d in unique_digests if d not in found]
+        if missing:
+            encoded = self._encode([unique[d] for d in missing])
+            self.cache.set_many(missing, encoded)
+            found.update(zip(missing, encoded))
+
+        return np.stack([found[d] for d in digests]).astype(np.float32)
+
+    def embed_texts_sync(self, texts: Sequence[str]) -> list[list[float]]:
+        """
+        Blocking embed_texts for sync callers (Celery tasks), without an
+        event loop or a thread hop per batch.
+        """
+        if not texts:
+            return []
+
+        try:
+            return self._embed(list(texts)).tolist()
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate embeddings: {e}") from e
 
     async def embed_texts(self, texts: Sequence[str]) -> list[list[float]]:
         """
         Generates L2-normalized embeddings for a list of texts.
         Uses SentenceTransformers locally (runs in a thread to avoid blocking).
+        Texts already embedded with the same model are served from the cache.
         """
         if not texts:
             return []
+        return await asyncio.to_thread(self.embed_texts_sync, texts)
 
-        try:
-            model = _load_sentence_transformer()
-            batch_size = max(int(settings.HF_EMBEDDING_BATCH_SIZE or 32), 1)
-
-            def _encode() -> np.ndarray:
-                # returns np.ndarray (N, D)
-                return cast(
-                    np.ndarray,
-                    model.encode(
-                        list(texts),
-                        batch_size=batch_size,
-                        show_progress_bar=False,
-                        convert_to_numpy=True,
-                        normalize_embeddings=False,
-                    ),
-                )
+    async def _encode_query(self, query: str) -> np.ndarray:
+        if settings.EMBEDDING_MICROBATCH_ENABLED:
+            # Concurrent queries share one model call instead of each running
+            # its own encode in a separate thread.
+            return (await get_embedding_batcher(self._encode).submit([query]))[0]
+        return (await asyncio.to_thread(self._encode, [query]))[0]
 
-            mat = await asyncio.to_thread(_encode)
+    async def embed_query(self, query: str) -> list[float]:
+        """
+        Embeds a single search query.
+        Repeated queries (retries, regenerate) are answered from an in-process
+        TTL+LRU cache, then from the shared Redis cache, both keyed by the
+        normalized query text; misses embed the query as given and are
+        micro-batched with other concurrent queries.
+        """
+        key = normalize_query(query)
+        if not key:
+            return []
 
-            if mat.ndim != 2:
-                raise RuntimeError(f"Unexpected embedding shape: {mat.shape!r}")
-            if mat.shape[1] != settings.EMBEDDING_DIM:
-                raise RuntimeError(
-                    f"Embedding dim mismatch: got {mat.shape[1]}, expected {settings.EMBEDDING_DIM}. "
-                    f"Check EMBEDDING_MODEL_NAME/EMBEDDING_DIM."
+        query_cache = self.query_cache
+        try:
+            if query_cache is None:
+                return (await self._encode_query(query)).tolist()
+
+            started = time.perf_counter()
+            vec = query_cache.get(key)
+            if vec is not None:
+                query_cache.record_hit(
+                    remote=False, lookup_seconds=time.perf_counter() - started
                 )
+                return vec.tolist()
 
-            norms = np.linalg.norm(mat, axis=1, keepdims=True)
-            norms[norms == 0] = 1e-10
-            normed_mat = mat / norms
-            return normed_mat.astype(np.float32).tolist()
+            if query_cache.remote is not None:
+                vec = await asyncio.to_thread(query_cache.get_remote, key)
+            if vec is not None:
+                query_cache.record_hit(
+                    remote=True, lookup_seconds=time.perf_counter() - started
+                )
+            else:
+                vec = await self._encode_query(query)
+                query_cache.record_miss(time.perf_counter() - started)
+                if query_cache.remote is not None:
+                    await asyncio.to_thread(query_cache.put_remote, key, vec)
+            query_cache.put(key, vec)
+            return vec.tolist()
+        except EmbeddingOverloadedError:
+            raise
         except Exception as e:
-            raise RuntimeError(f"Failed to generate embeddings: {e}") from e
\ No newline at end of file
+            raise RuntimeError(f"Failed to generate embeddings: {e}") from e
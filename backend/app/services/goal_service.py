@@ -54,15 +54,18 @@ class GoalService:
         await db.refresh(goal)
         return goal
 
+    @staticmethod
+    def _list_goals_statement(user_id: uuid.UUID) -> Select[tuple[Goal]]:
+        return select(Goal).where(
+            and_(Goal.user_id == user_id, Goal.is_deleted.is_(False))
+        )
+
     async def list_goals(
         self,
         db: AsyncSession,
         user_id: uuid.UUID,
     ) -> Sequence[Goal]:
-        stmt: Select[tuple[Goal]] = select(Goal).where(
-            and_(Goal.user_id == user_id, Goal.is_deleted.is_(False))
-        )
-        result = await db.execute(stmt)
+        result = await db.execute(self._list_goals_statement(user_id))
         return result.scalars().all()
 
     async def get_goal(
@@ -79,16 +82,19 @@ class GoalService:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    @staticmethod
+    def _get_goal_by_name_statement(name: str, user_id: uuid.UUID) -> Select[tuple[Goal]]:
+        return select(Goal).where(
+            and_(Goal.name == name, Goal.user_id == user_id, Goal.is_deleted.is_(False))
+        )
+
     async def get_goal_by_name(
         self,
         db: AsyncSession,
         name: str,
         user_id: uuid.UUID,
     ) -> Goal | None:
-        stmt: Select[tuple[Goal]] = select(Goal).where(
-            and_(Goal.name == name, Goal.user_id == user_id, Goal.is_deleted.is_(False))
-        )
-        result = await db.execute(stmt)
+        result = await db.execute(self._get_goal_by_name_statement(name, user_id))
         return result.scalar_one_or_none()
 
     async def update_goal(
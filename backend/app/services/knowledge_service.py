@@ -1,43 +1,252 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
+import threading
+import time
 import uuid
-from datetime import datetime
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Sequence, AsyncIterator, Any
 
 from fastapi import UploadFile, HTTPException, status
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, insert, literal, literal_column, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 
 from app.core.config import settings
 from app.models.goal import Goal
 from app.models.knowledge_chunk import KnowledgeChunk
 from app.models.knowledge_document import KnowledgeDocument
-from app.schemas.knowledge import KnowledgeContext
+from app.schemas.knowledge import KnowledgeContext, KnowledgeSearchMode
 from app.services.ai_service import DifyAIService
 from app.services.embedding_service import EmbeddingService
+from app.services.rerank_service import RerankService, get_rerank_service
 
-def _make_storage_dir(user_id: uuid.UUID) -> Path:
-    base = Path(settings.KNOWLEDGE_STORAGE_ROOT).expanduser().resolve()
-    user_dir = base / str(user_id)
-    user_dir.mkdir(parents=True, exist_ok=True)
-    return user_dir
+def _storage_root() -> Path:
+    return Path(settings.KNOWLEDGE_STORAGE_ROOT).expanduser().resolve()
 
 
-def _build_unique_filename(target_dir: Path, original_name: str) -> tuple[str, Path]:
+def _object_path(sha256: str, original_name: str) -> tuple[str, Path]:
     """
-    Store files using timestamped names; collisions are practically avoided by microseconds.
-    Example: report_20241208_153045123456.pdf
+    Content-addressed location of an upload: objects/<ab>/<sha256><suffix>.
+    Identical files map to the same object, so they are stored once.
+    Example: objects/9f/9f86d081884c7d65...0f00a08.pdf
     """
-    safe_name = Path(original_name).name
-    stem = Path(safe_name).stem
-    suffix = Path(safe_name).suffix
+    suffix = Path(Path(original_name).name).suffix.lower()
+    stored = f"{sha256}{suffix}"
+    return stored, _storage_root() / "objects" / sha256[:2] / stored
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S%f")
-    stored = f"{stem}_{timestamp}{suffix}"
-    return stored, target_dir / stored
+
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    stored_filename: str
+    path: Path
+    size: int
+    sha256: str
+
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {settings.KNOWLEDGE_MAX_UPLOAD_BYTES} byte upload limit",
+    )
+
+
+def _batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f"Batch exceeds the {settings.KNOWLEDGE_BATCH_UPLOAD_MAX_BYTES} "
+            "byte upload limit"
+        ),
+    )
+
+
+class _BatchBudget:
+    """
+    Running byte total of one batch upload, shared by its concurrent temp
+    writers. The total only grows, so once it is over the limit every writer
+    aborts on its next chunk.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self, size: int) -> None:
+        with self._lock:
+            self.used += size
+            if self.limit and self.used > self.limit:
+                raise _batch_too_large()
+
+    def check(self) -> None:
+        self.take(0)
+
+
+def _still_processing() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Document is still being processed; retry once it is ready",
+    )
+
+
+@dataclass(frozen=True)
+class _TempUpload:
+    path: Path
+    size: int
+    sha256: str
+
+
+def _write_temp(file: UploadFile, budget: _BatchBudget | None = None) -> _TempUpload:
+    """
+    Copy an upload to a temporary file in fixed-size chunks, hashing as it
+    goes. Blocking; run it in a thread. Aborts as soon as
+    KNOWLEDGE_MAX_UPLOAD_BYTES, or the batch's `budget`, is exceeded.
+    """
+    limit = settings.KNOWLEDGE_MAX_UPLOAD_BYTES
+    tmp_dir = _storage_root() / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    if budget is not None:
+        # Files queued behind the one that broke the limit don't start.
+        budget.check()
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as out:
+        tmp_path = Path(out.name)
+        try:
+            while chunk := file.file.read(_UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if limit and size > limit:
+                    raise _upload_too_large()
+                if budget is not None:
+                    budget.take(len(chunk))
+                digest.update(chunk)
+                out.write(chunk)
+        except BaseException:
+            out.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+    return _TempUpload(tmp_path, size, digest.hexdigest())
+
+
+def _promote_upload(upload: _TempUpload, original_name: str) -> StoredUpload:
+    """
+    Move a temporary upload to its content-addressed path, or drop it if
+    that object already exists. Blocking.
+    """
+    stored_filename, target_path = _object_path(upload.sha256, original_name)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # Reuse: the caller's object lock keeps the knowledge GC off the file
+        # until the new document row is committed; the fresh mtime also keeps
+        # it for the grace period if that transaction rolls back.
+        os.utime(target_path)
+        upload.path.unlink(missing_ok=True)
+    except FileNotFoundError:
+        # Atomic: a concurrent identical upload just replaces it with the same bytes.
+        os.replace(upload.path, target_path)
+    return StoredUpload(stored_filename, target_path, upload.size, upload.sha256)
+
+
+def _check_upload_size(file: UploadFile) -> None:
+    limit = settings.KNOWLEDGE_MAX_UPLOAD_BYTES
+    # Reject early when the multipart parser already knows the size.
+    if limit and file.size is not None and file.size > limit:
+        raise _upload_too_large()
+
+
+async def _lock_objects(db: AsyncSession, paths: Sequence[Path]) -> None:
+    """
+    Take the transaction-level advisory lock of each object path, in a fixed
+    order. Held from promotion until the document rows commit, so the
+    knowledge GC (which try-locks the same keys before unlinking) never
+    removes an object that is about to be referenced.
+    """
+    for path in sorted(set(paths)):
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(str(path)))))
+
+
+async def _promote_uploads(
+    db: AsyncSession, temps: Sequence[_TempUpload], files: Sequence[UploadFile]
+) -> list[StoredUpload]:
+    try:
+        await _lock_objects(
+            db,
+            [
+                _object_path(temp.sha256, file.filename or "upload")[1]
+                for temp, file in zip(temps, files)
+            ],
+        )
+    except BaseException:
+        for temp in temps:
+            temp.path.unlink(missing_ok=True)
+        raise
+
+    def _promote_all() -> list[StoredUpload]:
+        return [
+            _promote_upload(temp, file.filename or "upload")
+            for temp, file in zip(temps, files)
+        ]
+
+    return await asyncio.to_thread(_promote_all)
+
+
+async def _store_upload(db: AsyncSession, file: UploadFile) -> StoredUpload:
+    _check_upload_size(file)
+    temp = await asyncio.to_thread(_write_temp, file)
+    return (await _promote_uploads(db, [temp], [file]))[0]
+
+
+@dataclass(frozen=True)
+class KnowledgeSearchHit:
+    """One search result, projected straight from the row (no ORM entities)."""
+
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
+    chunk_index: int
+    content: str
+    score: float
+    stored_filename: str
+    original_filename: str
+    keyword_match: bool = False
+    # Source pages (PDF only)
+    page_start: int | None = None
+    page_end: int | None = None
+    # Cross-encoder relevance (higher is better) when the hits were reranked.
+    rerank_score: float | None = None
+
+
+def _hit_columns(content_chars: int | None) -> list[Any]:
+    """
+    Columns of a KnowledgeSearchHit. The embedding is never selected, and
+    with `content_chars` the content is truncated by Postgres before it is
+    sent.
+    """
+    content = (
+        KnowledgeChunk.content
+        if content_chars is None
+        else func.left(KnowledgeChunk.content, content_chars)
+    )
+    return [
+        KnowledgeChunk.id.label("chunk_id"),
+        KnowledgeChunk.document_id,
+        KnowledgeChunk.chunk_index,
+        KnowledgeChunk.page_start,
+        KnowledgeChunk.page_end,
+        content.label("content"),
+        KnowledgeDocument.stored_filename,
+        KnowledgeDocument.original_filename,
+    ]
 
 
 class KnowledgeService:
@@ -45,9 +254,11 @@ class KnowledgeService:
         self,
         embedding_service: EmbeddingService | None = None,
         ai_service: DifyAIService | None = None,
+        rerank_service: RerankService | None = None,
     ) -> None:
         self.embedding_service = embedding_service
         self.ai_service = ai_service
+        self.rerank_service = rerank_service
 
     def _get_embedding_service(self) -> EmbeddingService:
         if self.embedding_service is None:
@@ -59,13 +270,14 @@ class KnowledgeService:
             self.ai_service = DifyAIService()
         return self.ai_service
 
-    async def upload_document(
-        self,
-        db: AsyncSession,
-        user_id: uuid.UUID,
-        file: UploadFile,
-        goal_id: uuid.UUID | None = None,
-    ) -> KnowledgeDocument:
+    def _get_rerank_service(self) -> RerankService:
+        if self.rerank_service is None:
+            self.rerank_service = get_rerank_service()
+        return self.rerank_service
+
+    async def _ensure_goal(
+        self, db: AsyncSession, user_id: uuid.UUID, goal_id: uuid.UUID | None
+    ) -> None:
         if goal_id is not None:
             stmt = select(Goal.id).where(
                 Goal.id == goal_id,
@@ -78,28 +290,256 @@ class KnowledgeService:
                     status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found"
                 )
 
-        user_dir = _make_storage_dir(user_id)
-        stored_filename, target_path = _build_unique_filename(
-            user_dir, file.filename or "upload"
+    @staticmethod
+    def _find_duplicate_statement(
+        user_id: uuid.UUID, sha256: str
+    ) -> Select[tuple[KnowledgeDocument]]:
+        # Only the uploader's own documents: reusing another user's chunks
+        # would reveal that they hold the same file (cross-user duplicates
+        # still skip the model via the embedding cache).
+        return (
+            select(KnowledgeDocument)
+            .where(
+                KnowledgeDocument.user_id == user_id,
+                KnowledgeDocument.content_sha256 == sha256,
+                KnowledgeDocument.is_deleted.is_(False),
+                KnowledgeDocument.status == "ready",
+            )
+            .order_by(KnowledgeDocument.created_at.desc())
+            .limit(1)
         )
 
-        content = await file.read()
-        target_path.write_bytes(content)
+    async def _find_duplicate(
+        self, db: AsyncSession, user_id: uuid.UUID, sha256: str
+    ) -> KnowledgeDocument | None:
+        result = await db.execute(self._find_duplicate_statement(user_id, sha256))
+        return result.scalar_one_or_none()
+
+    async def _copy_chunks(
+        self,
+        db: AsyncSession,
+        source: KnowledgeDocument,
+        target: KnowledgeDocument,
+    ) -> None:
+        """Server-side INSERT ... SELECT of the source document's chunks."""
+        chunk_table = KnowledgeChunk.__table__
+        copied = select(
+            func.gen_random_uuid(),
+            literal(False),
+            func.now(),
+            func.now(),
+            literal(target.id, chunk_table.c.document_id.type),
+            literal(target.user_id, chunk_table.c.user_id.type),
+            literal(target.goal_id, chunk_table.c.goal_id.type),
+            KnowledgeChunk.chunk_index,
+            KnowledgeChunk.page_start,
+            KnowledgeChunk.page_end,
+            KnowledgeChunk.content,
+            KnowledgeChunk.content_hash,
+            KnowledgeChunk.embedding,
+        ).where(
+            KnowledgeChunk.document_id == source.id,
+            KnowledgeChunk.is_deleted.is_(False),
+            KnowledgeChunk.generation <= source.generation,
+        )
+        await db.execute(
+            insert(KnowledgeChunk).from_select(
+                [
+                    "id",
+                    "is_deleted",
+                    "created_at",
+                    "updated_at",
+                    "document_id",
+                    "user_id",
+                    "goal_id",
+                    "chunk_index",
+                    "page_start",
+                    "page_end",
+                    "content",
+                    "content_hash",
+                    "embedding",
+                ],
+                copied,
+                # Python-side defaults (uuid4) would give every row the same id.
+                include_defaults=False,
+            )
+        )
 
+    async def _add_document(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        goal_id: uuid.UUID | None,
+        file: UploadFile,
+        upload: StoredUpload,
+    ) -> tuple[KnowledgeDocument, bool]:
+        """
+        Add the document row for a stored upload. If the user already has a
+        ready document with the same content, its chunks and embeddings are
+        copied and the new document is ready at once; otherwise the caller
+        must enqueue ingestion (second element of the result).
+        """
+        source = await self._find_duplicate(db, user_id, upload.sha256)
         document = KnowledgeDocument(
             user_id=user_id,
             goal_id=goal_id,
-            original_filename=file.filename or stored_filename,
-            stored_filename=stored_filename,
-            file_path=str(target_path),
+            original_filename=file.filename or upload.stored_filename,
+            stored_filename=upload.stored_filename,
+            file_path=str(upload.path),
             mime_type=file.content_type,
-            file_size=len(content),
-            status="processing",
-            ingest_progress=0,
-            chunk_count=0,
+            file_size=upload.size,
+            content_sha256=upload.sha256,
+            status="processing" if source is None else "ready",
+            ingest_progress=0 if source is None else 100,
+            chunk_count=0 if source is None else source.chunk_count,
             error_message=None,
         )
         db.add(document)
+        if source is not None:
+            await db.flush()
+            await self._copy_chunks(db, source, document)
+        return document, source is None
+
+    async def upload_document(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        file: UploadFile,
+        goal_id: uuid.UUID | None = None,
+    ) -> KnowledgeDocument:
+        await self._ensure_goal(db, user_id, goal_id)
+
+        # Never hold the whole file in memory or write it on the event loop.
+        upload = await _store_upload(db, file)
+        document, needs_ingest = await self._add_document(
+            db, user_id, goal_id, file, upload
+        )
+        await db.commit()
+        await db.refresh(document)
+
+        if not needs_ingest:
+            return document
+
+        from app.tasks.knowledge_ingest import ingest_document
+
+        ingest_document.delay(str(document.id))  # type: ignore[attr-defined]
+
+        return document
+
+    async def upload_documents(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        files: Sequence[UploadFile],
+        goal_id: uuid.UUID | None = None,
+    ) -> list[KnowledgeDocument]:
+        """
+        Store many files and ingest them with a single batch job. Files are
+        written to disk concurrently (bounded by KNOWLEDGE_UPLOAD_CONCURRENCY)
+        and the documents are created in one transaction; duplicates of
+        already ingested files skip the job entirely.
+        """
+        if len(files) > settings.KNOWLEDGE_BATCH_UPLOAD_MAX_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {settings.KNOWLEDGE_BATCH_UPLOAD_MAX_FILES} files per batch",
+            )
+        await self._ensure_goal(db, user_id, goal_id)
+
+        for file in files:
+            _check_upload_size(file)
+        budget = _BatchBudget(settings.KNOWLEDGE_BATCH_UPLOAD_MAX_BYTES)
+        # Reject early when the multipart parser already knows the sizes.
+        if budget.limit and sum(file.size or 0 for file in files) > budget.limit:
+            raise _batch_too_large()
+
+        semaphore = asyncio.Semaphore(max(settings.KNOWLEDGE_UPLOAD_CONCURRENCY, 1))
+
+        async def _save(file: UploadFile) -> _TempUpload:
+            async with semaphore:
+                return await asyncio.to_thread(_write_temp, file, budget)
+
+        # Files are only moved to shared object storage once all of them are
+        # written, so a failed batch just drops its own temporary files.
+        results = await asyncio.gather(
+            *(_save(file) for file in files), return_exceptions=True
+        )
+        temps = [r for r in results if isinstance(r, _TempUpload)]
+        if len(temps) < len(results):
+            for temp in temps:
+                temp.path.unlink(missing_ok=True)
+            raise next(r for r in results if isinstance(r, BaseException))
+
+        uploads = await _promote_uploads(db, temps, files)
+
+        documents: list[KnowledgeDocument] = []
+        to_ingest: list[KnowledgeDocument] = []
+        for file, upload in zip(files, uploads):
+            document, needs_ingest = await self._add_document(
+                db, user_id, goal_id, file, upload
+            )
+            documents.append(document)
+            if needs_ingest:
+                to_ingest.append(document)
+        await db.commit()
+
+        if to_ingest:
+            from app.tasks.knowledge_ingest import ingest_documents
+
+            ingest_documents.delay([str(d.id) for d in to_ingest])  # type: ignore[attr-defined]
+
+        return documents
+
+    async def replace_document_file(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        document_id: uuid.UUID,
+        file: UploadFile,
+    ) -> KnowledgeDocument:
+        """
+        Swap in a new version of a document's file and re-ingest it. With
+        incremental ingestion only the chunks that changed are embedded again.
+        Refused with 409 while the document is still being ingested, so two
+        ingestions never reconcile the same chunks at once.
+        """
+        document = await self.get_document(db, user_id, document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+            )
+        if document.status == "processing":
+            raise _still_processing()
+
+        upload = await _store_upload(db, file)
+        if upload.sha256 == document.content_sha256 and document.status == "ready":
+            return document
+
+        # Conditional on the status, so a concurrent replace that got here
+        # first wins and this one is refused. The previous object may be
+        # shared with other documents; unreferenced objects are left for
+        # storage cleanup.
+        claimed = await db.execute(
+            update(KnowledgeDocument)
+            .where(
+                KnowledgeDocument.id == document.id,
+                KnowledgeDocument.status != "processing",
+            )
+            .values(
+                stored_filename=upload.stored_filename,
+                file_path=str(upload.path),
+                mime_type=file.content_type or document.mime_type,
+                file_size=upload.size,
+                content_sha256=upload.sha256,
+                status="processing",
+                ingest_progress=0,
+                error_message=None,
+            )
+            .returning(KnowledgeDocument.id)
+        )
+        if claimed.scalar_one_or_none() is None:
+            await db.rollback()
+            raise _still_processing()
         await db.commit()
         await db.refresh(document)
 
@@ -133,52 +573,45 @@ class KnowledgeService:
                 status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
             )
 
-        if goal_id is not None:
-            stmt = select(Goal.id).where(
-                Goal.id == goal_id,
-                Goal.user_id == user_id,
-                Goal.is_deleted.is_(False),
-            )
-            result = await db.execute(stmt)
-            if result.scalar_one_or_none() is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found"
-                )
+        await self._ensure_goal(db, user_id, goal_id)
 
         document.goal_id = goal_id
+        await db.execute(
+            update(KnowledgeChunk)
+            .where(KnowledgeChunk.document_id == document.id)
+            .values(goal_id=goal_id)
+        )
         await db.commit()
         await db.refresh(document)
         return document
 
-    async def list_documents(
-        self, db: AsyncSession, user_id: uuid.UUID
-    ) -> Sequence[KnowledgeDocument]:
-        stmt = (
+    @staticmethod
+    def _list_documents_statement(
+        user_id: uuid.UUID, *conditions: Any
+    ) -> Select[tuple[KnowledgeDocument]]:
+        return (
             select(KnowledgeDocument)
             .where(
                 and_(
                     KnowledgeDocument.user_id == user_id,
+                    *conditions,
                     KnowledgeDocument.is_deleted.is_(False),
                 )
             )
             .order_by(KnowledgeDocument.created_at.desc())
         )
-        result = await db.execute(stmt)
+
+    async def list_documents(
+        self, db: AsyncSession, user_id: uuid.UUID
+    ) -> Sequence[KnowledgeDocument]:
+        result = await db.execute(self._list_documents_statement(user_id))
         return result.scalars().all()
 
     async def list_documents_by_goal(
         self, db: AsyncSession, user_id: uuid.UUID, goal_id: uuid.UUID
     ) -> Sequence[KnowledgeDocument]:
-        stmt = (
-            select(KnowledgeDocument)
-            .where(
-                and_(
-                    KnowledgeDocument.user_id == user_id,
-                    KnowledgeDocument.goal_id == goal_id,
-                    KnowledgeDocument.is_deleted.is_(False),
-                )
-            )
-            .order_by(KnowledgeDocument.created_at.desc())
+        stmt = self._list_documents_statement(
+            user_id, KnowledgeDocument.goal_id == goal_id
         )
         result = await db.execute(stmt)
         return result.scalars().all()
@@ -186,16 +619,8 @@ class KnowledgeService:
     async def list_documents_unassigned(
         self, db: AsyncSession, user_id: uuid.UUID
     ) -> Sequence[KnowledgeDocument]:
-        stmt = (
-            select(KnowledgeDocument)
-            .where(
-                and_(
-                    KnowledgeDocument.user_id == user_id,
-                    KnowledgeDocument.goal_id.is_(None),
-                    KnowledgeDocument.is_deleted.is_(False),
-                )
-            )
-            .order_by(KnowledgeDocument.created_at.desc())
+        stmt = self._list_documents_statement(
+            user_id, KnowledgeDocument.goal_id.is_(None)
         )
         result = await db.execute(stmt)
         return result.scalars().all()
@@ -223,18 +648,15 @@ class KnowledgeService:
         for chunk in document.chunks:
             chunk.soft_delete()
 
+        # The stored object may be shared with other documents (or about to
+        # be reused by a concurrent upload); the knowledge GC task removes it
+        # once nothing references it.
         await db.commit()
 
-        try:
-            path = Path(document.file_path)
-            if path.exists():
-                path.unlink()
-        except Exception:
-            pass
-
     async def ensure_document_path(
         self, db: AsyncSession, user_id: uuid.UUID, document_id: uuid.UUID
-    ) -> Path:
+    ) -> tuple[Path, str]:
+        """Stored file of a document and the filename to download it as."""
         document = await self.get_document(db, user_id, document_id)
         if not document:
             raise HTTPException(
@@ -245,61 +667,324 @@ class KnowledgeService:
             raise HTTPException(
                 status_code=status.HTTP_410_GONE, detail="Document file missing"
             )
-        return path
+        return path, document.original_filename
 
-    async def search(
+    async def _apply_vector_search_params(
         self,
         db: AsyncSession,
+        *,
+        top_k: int,
+        ef_search: int | None = None,
+    ) -> None:
+        """
+        Set the ANN search effort for the current transaction only
+        (equivalent to SET LOCAL; SET itself cannot take bind parameters).
+        """
+        # ef_search below top_k would cap the number of rows returned.
+        value = max(ef_search or settings.KNOWLEDGE_HNSW_EF_SEARCH, top_k)
+        params = [func.set_config("hnsw.ef_search", str(value), True)]
+        if settings.KNOWLEDGE_ITERATIVE_SCAN:
+            # Keep walking the index until enough rows pass the tenant filter
+            # instead of returning fewer than top_k (pgvector >= 0.8).
+            params.append(
+                func.set_config(
+                    "hnsw.iterative_scan", settings.KNOWLEDGE_ITERATIVE_SCAN, True
+                )
+            )
+        await db.execute(select(*params))
+
+    async def _use_exact_search(self, db: AsyncSession, filters: list[Any]) -> bool:
+        """
+        Small candidate sets (most tenants, or an explicit document filter) are
+        ranked exactly via the user_id index; counting stops at the threshold,
+        so this probe is cheap even for very large tenants.
+        """
+        threshold = settings.KNOWLEDGE_EXACT_SEARCH_MAX_CHUNKS
+        if threshold <= 0:
+            return False
+        probe = select(KnowledgeChunk.id).where(*filters).limit(threshold + 1).subquery()
+        result = await db.execute(select(func.count()).select_from(probe))
+        return result.scalar_one() <= threshold
+
+    @staticmethod
+    def _search_filters(
         user_id: uuid.UUID,
-        query: str,
-        top_k: int = 5,
         document_ids: Sequence[uuid.UUID] | None = None,
-    ) -> list[tuple[KnowledgeChunk, KnowledgeDocument, float]]:
-        if top_k <= 0:
-            top_k = 5
-        query_embedding = await self._get_embedding_service().embed_texts([query])
-        if not query_embedding:
-            return []
-        embedding = query_embedding[0]
+        goal_id: uuid.UUID | None = None,
+    ) -> list[Any]:
+        # Tenant filters hit the chunk table directly (denormalized columns),
+        # so other users' vectors are never visited.
+        filters: list[Any] = [
+            KnowledgeChunk.user_id == user_id,
+            KnowledgeChunk.is_deleted.is_(False),
+        ]
+        if document_ids:
+            filters.append(KnowledgeChunk.document_id.in_(set(document_ids)))
+        if goal_id is not None:
+            filters.append(KnowledgeChunk.goal_id == goal_id)
+        return filters
 
+    def _search_statement(
+        self,
+        query: str,
+        embedding: Sequence[float],
+        filters: list[Any],
+        *,
+        exact: bool,
+        hybrid: bool,
+        top_k: int,
+        limit: int,
+        content_chars: int | None = None,
+    ) -> Any:
+        """
+        The ranking statement of `search`: the `limit` nearest chunks passing
+        `filters` (exactly, or through the ANN index), fused with full-text
+        candidates in hybrid mode, joined to the hit columns.
+        """
+        live_documents = [
+            KnowledgeDocument.is_deleted.is_(False),
+            # Chunks are committed batch by batch during ingestion, so a
+            # document that is still processing is already searchable...
+            KnowledgeDocument.status.in_(("ready", "processing")),
+            # ...except for the rows of an incremental re-ingest, which only
+            # show up together with the soft-delete of the chunks they replace.
+            KnowledgeChunk.generation <= KnowledgeDocument.generation,
+        ]
         distance = KnowledgeChunk.embedding.cosine_distance(embedding)
-        stmt = (
-            select(
-                KnowledgeChunk,
-                KnowledgeDocument,
-                distance.label("score"),
-            )
+        candidates = (
+            select(KnowledgeChunk.id.label("chunk_id"), distance.label("score"))
             .join(
                 KnowledgeDocument,
                 KnowledgeChunk.document_id == KnowledgeDocument.id,
             )
-            .where(
-                KnowledgeDocument.user_id == user_id,
-                KnowledgeDocument.is_deleted.is_(False),
-                KnowledgeDocument.status == "ready",
-                KnowledgeChunk.is_deleted.is_(False),
+            .where(*filters, *live_documents)
+        )
+
+        if exact:
+            # OFFSET 0 stops the planner from flattening the subquery, so the
+            # ORDER BY can't be served by the ANN index: exact ranking.
+            exact_candidates = candidates.offset(0).subquery()
+            hits = (
+                select(exact_candidates.c.chunk_id, exact_candidates.c.score)
+                .order_by(exact_candidates.c.score)
+                .limit(limit)
+                .subquery()
             )
-            .order_by(distance)
-            .limit(top_k)
+        else:
+            hits = candidates.order_by(distance).limit(limit).subquery()
+
+        if not hybrid:
+            # Iterative scans may return rows slightly out of order; re-sort.
+            stmt = (
+                select(
+                    *_hit_columns(content_chars),
+                    hits.c.score,
+                    literal(False).label("keyword_match"),
+                )
+                .select_from(KnowledgeChunk)
+                .join(hits, KnowledgeChunk.id == hits.c.chunk_id)
+                .order_by(hits.c.score)
+            )
+        else:
+            stmt = self._hybrid_statement(
+                query, hits, filters, live_documents, distance, top_k, limit,
+                content_chars,
+            )
+        return stmt.join(
+            KnowledgeDocument,
+            KnowledgeChunk.document_id == KnowledgeDocument.id,
+        )
+
+    async def search(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        query: str,
+        top_k: int = 5,
+        document_ids: Sequence[uuid.UUID] | None = None,
+        ef_search: int | None = None,
+        goal_id: uuid.UUID | None = None,
+        mode: KnowledgeSearchMode = KnowledgeSearchMode.vector,
+        content_chars: int | None = None,
+        rerank: bool | None = None,
+    ) -> list[KnowledgeSearchHit]:
+        """
+        Rank the user's chunks against `query`. Only the columns needed for a
+        KnowledgeSearchHit are fetched; pass `content_chars` to receive a
+        server-side truncated preview instead of the full chunk text.
+
+        With `rerank` (default: KNOWLEDGE_RERANK_ENABLED) the first stage
+        over-fetches KNOWLEDGE_RERANK_CANDIDATES hits and a cross-encoder
+        reorders them, within KNOWLEDGE_RERANK_BUDGET_MS.
+        """
+        started = time.perf_counter()
+        if top_k <= 0:
+            top_k = 5
+        if rerank is None:
+            rerank = settings.KNOWLEDGE_RERANK_ENABLED
+        fetch_k = max(settings.KNOWLEDGE_RERANK_CANDIDATES, top_k) if rerank else top_k
+        # The cross-encoder needs the full text; truncate after scoring.
+        fetch_chars = None if rerank else content_chars
+        embedding = await self._get_embedding_service().embed_query(query)
+        if not embedding:
+            return []
+
+        filters = self._search_filters(user_id, document_ids, goal_id)
+        hybrid = mode == KnowledgeSearchMode.hybrid
+        # In hybrid mode each retriever over-fetches candidates for fusion.
+        limit = max(settings.KNOWLEDGE_HYBRID_CANDIDATES, fetch_k) if hybrid else fetch_k
+        exact = await self._use_exact_search(db, filters)
+        if not exact:
+            await self._apply_vector_search_params(db, top_k=limit, ef_search=ef_search)
+        stmt = self._search_statement(
+            query,
+            embedding,
+            filters,
+            exact=exact,
+            hybrid=hybrid,
+            top_k=fetch_k,
+            limit=limit,
+            content_chars=fetch_chars,
         )
-        if document_ids:
-            stmt = stmt.where(KnowledgeDocument.id.in_(set(document_ids)))
 
         result = await db.execute(stmt)
-        rows = result.all()
-        scored = [(row[0], row[1], float(row[2])) for row in rows]
+        scored = [
+            KnowledgeSearchHit(
+                chunk_id=row.chunk_id,
+                document_id=row.document_id,
+                chunk_index=row.chunk_index,
+                content=row.content,
+                score=float(row.score),
+                stored_filename=row.stored_filename,
+                original_filename=row.original_filename,
+                keyword_match=bool(row.keyword_match),
+                page_start=row.page_start,
+                page_end=row.page_end,
+            )
+            for row in result.all()
+        ]
         if (
             scored
             and not document_ids
             and settings.KNOWLEDGE_MAX_DISTANCE is not None
+            # An exact keyword hit is relevant whatever its cosine distance.
+            and not any(hit.keyword_match for hit in scored)
         ):
-            best_distance = scored[0][2]
+            best_distance = min(hit.score for hit in scored)
             if best_distance > settings.KNOWLEDGE_MAX_DISTANCE:
                 return []
+
+        if rerank and len(scored) > 1:
+            scored = await self._rerank(query, scored, started)
+        if rerank:
+            scored = scored[:top_k]
+            if content_chars is not None:
+                scored = [
+                    replace(hit, content=hit.content[:content_chars]) for hit in scored
+                ]
         return scored
 
+    async def _rerank(
+        self,
+        query: str,
+        hits: list[KnowledgeSearchHit],
+        started: float,
+    ) -> list[KnowledgeSearchHit]:
+        """
+        Reorder first-stage hits by cross-encoder score. Whatever is left of
+        the latency budget bounds the reranker; if it runs out, the
+        first-stage order is kept.
+        """
+        budget = settings.KNOWLEDGE_RERANK_BUDGET_MS / 1000
+        remaining = budget - (time.perf_counter() - started) if budget > 0 else None
+        scores = await self._get_rerank_service().score(
+            query,
+            [hit.chunk_id for hit in hits],
+            [hit.content for hit in hits],
+            budget_seconds=remaining,
+        )
+        if scores is None:
+            return hits
+        reranked = [
+            replace(hit, rerank_score=score) for hit, score in zip(hits, scores)
+        ]
+        reranked.sort(key=lambda hit: hit.rerank_score or 0.0, reverse=True)
+        return reranked
+
+    def _hybrid_statement(
+        self,
+        query: str,
+        vector_hits: Any,
+        filters: list[Any],
+        live_documents: list[Any],
+        distance: Any,
+        top_k: int,
+        limit: int,
+        content_chars: int | None = None,
+    ) -> Any:
+        """
+        Reciprocal rank fusion of vector and full-text candidates in a single
+        statement: score = 1/(k + vector_rank) + 1/(k + text_rank).
+        """
+        rrf_k = settings.KNOWLEDGE_RRF_K
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{settings.KNOWLEDGE_FTS_CONFIG}'::regconfig"), query
+        )
+        text_score = func.ts_rank_cd(KnowledgeChunk.content_tsv, ts_query)
+        text_hits = (
+            select(KnowledgeChunk.id.label("chunk_id"), text_score.label("score"))
+            .join(
+                KnowledgeDocument,
+                KnowledgeChunk.document_id == KnowledgeDocument.id,
+            )
+            .where(
+                *filters,
+                *live_documents,
+                KnowledgeChunk.content_tsv.op("@@")(ts_query),
+            )
+            .order_by(text_score.desc())
+            .limit(limit)
+            .subquery()
+        )
+
+        vec = select(
+            vector_hits.c.chunk_id,
+            func.row_number().over(order_by=vector_hits.c.score).label("rank"),
+        ).cte("vector_ranked")
+        txt = select(
+            text_hits.c.chunk_id,
+            func.row_number().over(order_by=text_hits.c.score.desc()).label("rank"),
+        ).cte("text_ranked")
+
+        fused_score = func.coalesce(
+            literal(1.0) / (rrf_k + vec.c.rank), 0
+        ) + func.coalesce(literal(1.0) / (rrf_k + txt.c.rank), 0)
+        fused = (
+            select(
+                func.coalesce(vec.c.chunk_id, txt.c.chunk_id).label("chunk_id"),
+                fused_score.label("fused"),
+                txt.c.rank.is_not(None).label("keyword_match"),
+            )
+            .select_from(vec.join(txt, vec.c.chunk_id == txt.c.chunk_id, full=True))
+            .order_by(fused_score.desc())
+            .limit(top_k)
+            .subquery()
+        )
+
+        # The reported score stays the cosine distance, as in vector mode.
+        return (
+            select(
+                *_hit_columns(content_chars),
+                distance.label("score"),
+                fused.c.keyword_match,
+            )
+            .select_from(KnowledgeChunk)
+            .join(fused, KnowledgeChunk.id == fused.c.chunk_id)
+            .order_by(fused.c.fused.desc())
+        )
+
     def _build_context_text(
-        self, contexts: list[KnowledgeChunk], *, max_chars: int
+        self, contexts: Sequence[KnowledgeSearchHit], *, max_chars: int
     ) -> str:
         if max_chars <= 0:
             return ""
@@ -331,6 +1016,9 @@ class KnowledgeService:
         conversation_id: str | None = None,
         max_context_chars: int = 12000,
         timeout_s: float = 60,
+        ef_search: int | None = None,
+        mode: KnowledgeSearchMode = KnowledgeSearchMode.vector,
+        rerank: bool | None = None,
     ) -> AsyncIterator[str]:
         """
         Server-Sent Events stream generator:
@@ -347,17 +1035,20 @@ class KnowledgeService:
                 query=question,
                 top_k=top_k,
                 document_ids=document_ids,
+                ef_search=ef_search,
+                mode=mode,
+                rerank=rerank,
             )
             contexts = [
                 KnowledgeContext(
-                    document_id=chunk.document_id,
-                    chunk_index=chunk.chunk_index,
-                    content=chunk.content,
-                    score=float(score),
-                    stored_filename=document.stored_filename,
-                    original_filename=document.original_filename,
+                    document_id=hit.document_id,
+                    chunk_index=hit.chunk_index,
+                    content=hit.content,
+                    score=hit.score,
+                    stored_filename=hit.stored_filename,
+                    original_filename=hit.original_filename,
                 )
-                for chunk, document, score in results
+                for hit in results
             ]
 
             yield (
@@ -370,9 +1061,8 @@ class KnowledgeService:
                 + "\n\n"
             )
 
-            chunk_entities = [item[0] for item in results]
             context_text = self._build_context_text(
-                chunk_entities, max_chars=max_context_chars
+                results, max_chars=max_context_chars
             )
             dify_query = "question:" + question + "\n\ncontext:" + context_text
 
@@ -92,16 +92,19 @@ class PhaseService:
         await db.commit()
         return True
 
+    @staticmethod
+    def _list_phases_statement(goal_id: uuid.UUID) -> Select[tuple[Phase]]:
+        return select(Phase).where(
+            and_(Phase.goal_id == goal_id, Phase.is_deleted.is_(False))
+        )
+
     async def list_phases(
         self, db: AsyncSession, goal_id: uuid.UUID, user_id: uuid.UUID
     ) -> Sequence[Phase]:
         goal = await self.goal_service.get_goal(db, goal_id, user_id)
         if not goal:
             return []
-        stmt: Select[tuple[Phase]] = select(Phase).where(
-            and_(Phase.goal_id == goal_id, Phase.is_deleted.is_(False))
-        )
-        result = await db.execute(stmt)
+        result = await db.execute(self._list_phases_statement(goal_id))
         return result.scalars().all()
 
     async def get_phase(
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Sequence, cast
+
+from app.core.config import settings
+from app.services.embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def load_reranker_model():
+    # Lazy import, same as the embedding model.
+    from sentence_transformers import CrossEncoder  # type: ignore
+
+    return CrossEncoder(
+        settings.KNOWLEDGE_RERANK_MODEL,
+        device=settings.HF_EMBEDDING_DEVICE,
+        max_length=settings.KNOWLEDGE_RERANK_MAX_LENGTH,
+    )
+
+
+def warm_up_reranker() -> None:
+    """
+    Load the cross-encoder and score one pair, so the first reranked search
+    isn't spent loading weights (it would always miss its budget). Blocking.
+    """
+    load_reranker_model().predict([("warm-up", "warm-up")], show_progress_bar=False)
+
+
+# One worker: reranks never fight over the CPU, and the embedding threads
+# keep their share. At most KNOWLEDGE_RERANK_MAX_PENDING jobs are queued or
+# running at a time (see RerankService.score).
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+
+
+class RerankScoreCache:
+    """
+    In-process TTL + LRU cache of cross-encoder scores keyed by
+    (normalized query, chunk id). Chunk rows are immutable (re-ingestion
+    writes new ones), so the id stands in for the chunk text.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, uuid.UUID], tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(
+        self, query: str, chunk_ids: Sequence[uuid.UUID]
+    ) -> list[float | None]:
+        now = time.monotonic()
+        out: list[float | None] = []
+        with self._lock:
+            for chunk_id in chunk_ids:
+                key = (query, chunk_id)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    out.append(entry[1])
+        return out
+
+    def put_many(
+        self, query: str, chunk_ids: Sequence[uuid.UUID], scores: Sequence[float]
+    ) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for chunk_id, score in zip(chunk_ids, scores):
+                key = (query, chunk_id)
+                self._entries[key] = (expires_at, score)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class RerankService:
+    """
+    Second-stage reranking with a local cross-encoder.
+
+    Scores (query, chunk) pairs that are not cached yet in a dedicated worker
+    thread. Concurrent requests wait for one of KNOWLEDGE_RERANK_MAX_PENDING
+    job slots. The whole call, wait included, is bounded by a latency budget:
+    if it runs out, the caller gets None and keeps the first-stage order (a
+    job that already started still finishes and fills the cache; one that
+    hasn't is cancelled).
+    """
+
+    def __init__(self) -> None:
+        self.cache = RerankScoreCache(
+            settings.KNOWLEDGE_RERANK_CACHE_SIZE,
+            settings.KNOWLEDGE_RERANK_CACHE_TTL_SECONDS,
+        )
+        self.reranked = 0
+        self.skipped = 0
+        self.timeouts = 0
+        # Requests that had to wait for a job slot
+        self.busy = 0
+        self._slots = asyncio.Semaphore(max(settings.KNOWLEDGE_RERANK_MAX_PENDING, 1))
+        self._lock = threading.Lock()
+
+    def _score(
+        self, query: str, chunk_ids: list[uuid.UUID], passages: list[str]
+    ) -> list[float]:
+        model = load_reranker_model()
+        scores = model.predict(
+            [(query, p) for p in passages],
+            batch_size=settings.KNOWLEDGE_RERANK_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        out = [float(s) for s in scores]
+        self.cache.put_many(query, chunk_ids, out)
+        return out
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    async def _reserve(self, timeout: float | None) -> bool:
+        if self._slots.locked():
+            self._count("busy")
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _release_on_done(self, job: Future) -> None:
+        # The slot is held until the job is done (or cancelled before it
+        # started), even if its caller gave up waiting for it.
+        loop = asyncio.get_running_loop()
+
+        def _release(_job: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._slots.release)
+            except RuntimeError:
+                pass  # loop closed on shutdown
+
+        job.add_done_callback(_release)
+
+    async def score(
+        self,
+        query: str,
+        chunk_ids: Sequence[uuid.UUID],
+        passages: Sequence[str],
+        *,
+        budget_seconds: float | None = None,
+    ) -> list[float] | None:
+        """
+        Relevance scores (higher is better) aligned with `passages`, or None
+        when the latency budget ran out or the model is unavailable.
+        """
+        if budget_seconds is not None and budget_seconds <= 0:
+            self._count("skipped")
+            return None
+
+        key = normalize_query(query)
+        scores = self.cache.get_many(key, chunk_ids)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            deadline = None if budget_seconds is None else time.monotonic() + budget_seconds
+            if not await self._reserve(budget_seconds):
+                self._count("timeouts")
+                logger.info(
+                    "no rerank slot within %.0f ms budget; keeping vector order",
+                    (budget_seconds or 0) * 1000,
+                )
+                return None
+            job = _executor.submit(
+                self._score,
+                key,
+                [chunk_ids[i] for i in missing],
+                [passages[i] for i in missing],
+            )
+            self._release_on_done(job)
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                fresh = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(job)), remaining
+                )
+            except asyncio.TimeoutError:
+                # No-op if the model is already scoring it.
+                job.cancel()
+                self._count("timeouts")
+                logger.info(
+                    "rerank of %d passages exceeded %.0f ms budget; keeping vector order",
+                    len(missing),
+                    (budget_seconds or 0) * 1000,
+                )
+                return None
+            except Exception as exc:
+                # Reranking only refines the order; never fail the search.
+                logger.warning("rerank failed, keeping vector order: %s", exc)
+                return None
+            for i, s in zip(missing, fresh):
+                scores[i] = s
+
+        self._count("reranked")
+        return cast(list[float], scores)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "reranked": self.reranked,
+                "skipped": self.skipped,
+                "timeouts": self.timeouts,
+                "busy": self.busy,
+            }
+        return {**counters, "cache": self.cache.stats()}
+
+
+@lru_cache(maxsize=1)
+def get_rerank_service() -> RerankService:
+    """Process-wide reranker, so the score cache is shared across requests."""
+    return RerankService()
@@ -7,6 +7,7 @@ from typing import Sequence
 
 from sqlalchemy import and_, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.models.goal import Goal
 from app.models.task import Task
@@ -15,6 +16,7 @@ from app.models.summary import Summary
 from app.schemas.summary import SummaryType
 from app.services.ai_service import DifyAIService
 from app.models.base import utcnow
+from app.utils.rate_limit import AsyncRateLimiter
 
 
 @dataclass(frozen=True)
@@ -24,8 +26,14 @@ class PeriodRange:
 
 
 class SummaryService:
-    def __init__(self, ai_service: DifyAIService | None = None) -> None:
+    def __init__(
+        self,
+        ai_service: DifyAIService | None = None,
+        ai_rate_limiter: AsyncRateLimiter | None = None,
+    ) -> None:
         self.ai_service = ai_service
+        # Paces the AI provider calls when many summaries are generated at once.
+        self.ai_rate_limiter = ai_rate_limiter
 
     def _get_ai_service(self) -> DifyAIService:
         if self.ai_service is None:
@@ -61,20 +69,25 @@ class SummaryService:
         label = f"{period_start.year}-{period_start.month:02d}"
         return label, period_start.year, None, period_start.month
 
-    async def list_summaries(
-        self,
-        db: AsyncSession,
-        user_id: uuid.UUID,
-        summary_type: SummaryType | None = None,
-    ) -> Sequence[Summary]:
+    @staticmethod
+    def _list_summaries_statement(
+        user_id: uuid.UUID, summary_type: SummaryType | None = None
+    ) -> Select[tuple[Summary]]:
         stmt = select(Summary).where(
             Summary.user_id == user_id,
             Summary.is_deleted.is_(False),
         )
         if summary_type:
             stmt = stmt.where(Summary.summary_type == summary_type.value)
-        stmt = stmt.order_by(Summary.period_start.desc())
-        result = await db.execute(stmt)
+        return stmt.order_by(Summary.period_start.desc())
+
+    async def list_summaries(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        summary_type: SummaryType | None = None,
+    ) -> Sequence[Summary]:
+        result = await db.execute(self._list_summaries_statement(user_id, summary_type))
         return result.scalars().all()
 
     async def get_summary(
@@ -145,6 +158,8 @@ class SummaryService:
                 period_start=period_start,
                 period_end=period_end,
             )
+            if self.ai_rate_limiter is not None:
+                await self.ai_rate_limiter.acquire()
             content = await self._get_ai_service().summary_text(
                 text=prompt,
                 user_id=str(user_id),
@@ -52,18 +52,24 @@ class TaskListService:
         await db.refresh(new_task_list)
         return new_task_list
 
+    @staticmethod
+    def _list_task_lists_statement(
+        user_id: uuid.UUID, goal_id: uuid.UUID | None = None
+    ) -> Select[tuple[TaskList]]:
+        stmt: Select[tuple[TaskList]] = select(TaskList).where(
+            and_(TaskList.user_id == user_id, TaskList.is_deleted.is_(False))
+        )
+        if goal_id:
+            stmt = stmt.where(TaskList.goal_id == goal_id)
+        return stmt
+
     async def list_task_lists(
         self,
         db: AsyncSession,
         user_id: uuid.UUID,
         goal_id: uuid.UUID | None = None,
     ) -> Sequence[TaskList] | None:
-        stmt: Select[tuple[TaskList]] = select(TaskList).where(
-            and_(TaskList.user_id == user_id, TaskList.is_deleted.is_(False))
-        )
-        if goal_id:
-            stmt = stmt.where(TaskList.goal_id == goal_id)
-        result = await db.execute(stmt)
+        result = await db.execute(self._list_task_lists_statement(user_id, goal_id))
         return result.scalars().all()
 
     async def get_task_list(
@@ -82,16 +88,21 @@ class TaskListService:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
     
+    @staticmethod
+    def _get_task_list_by_name_statement(
+        name: str, user_id: uuid.UUID
+    ) -> Select[tuple[TaskList]]:
+        return select(TaskList).where(
+            and_(TaskList.name == name, TaskList.user_id == user_id, TaskList.is_deleted.is_(False))
+        )
+
     async def get_task_list_by_name(
         self,
         db: AsyncSession,
         name: str,
         user_id: uuid.UUID,
     ) -> TaskList | None:
-        stmt: Select[tuple[TaskList]] = select(TaskList).where(
-            and_(TaskList.name == name, TaskList.user_id == user_id, TaskList.is_deleted.is_(False))
-        )
-        result = await db.execute(stmt)
+        result = await db.execute(self._get_task_list_by_name_statement(name, user_id))
         return result.scalar_one_or_none()
 
     async def update_task_list(
@@ -169,19 +180,24 @@ class TaskService:
         await db.refresh(new_task)
         return new_task
 
-    async def list_tasks(
-        self,
-        db: AsyncSession,
-        user_id: uuid.UUID,
-        task_list_id: uuid.UUID | None = None,
-    ) -> Sequence[Task]:
+    @staticmethod
+    def _list_tasks_statement(
+        user_id: uuid.UUID, task_list_id: uuid.UUID | None = None
+    ) -> Select[tuple[Task]]:
         stmt: Select[tuple[Task]] = select(Task).where(
             and_(Task.user_id == user_id, Task.is_deleted.is_(False))
         )
         if task_list_id:
             stmt = stmt.where(Task.task_list_id == task_list_id)
+        return stmt
 
-        result = await db.execute(stmt)
+    async def list_tasks(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        task_list_id: uuid.UUID | None = None,
+    ) -> Sequence[Task]:
+        result = await db.execute(self._list_tasks_statement(user_id, task_list_id))
         return result.scalars().all()
 
     async def get_task(
@@ -215,12 +231,9 @@ class TaskService:
         result = await db.execute(stmt)
         return int(result.scalar_one() or 0)
 
-    async def count_overdue_tasks(
-        self,
-        db: AsyncSession,
-        user_id: uuid.UUID,
-    ) -> int:
-        stmt = select(func.count()).select_from(Task).where(
+    @staticmethod
+    def _count_overdue_tasks_statement(user_id: uuid.UUID) -> Select[tuple[int]]:
+        return select(func.count()).select_from(Task).where(
             and_(
                 Task.user_id == user_id,
                 Task.is_completed.is_(False),
@@ -229,35 +242,38 @@ class TaskService:
                 Task.end_date < func.now(),
             )
         )
-        result = await db.execute(stmt)
-        return int(result.scalar_one() or 0)
 
-    async def count_completed_tasks(
+    async def count_overdue_tasks(
         self,
         db: AsyncSession,
         user_id: uuid.UUID,
     ) -> int:
-        stmt = select(func.count()).select_from(Task).where(
+        result = await db.execute(self._count_overdue_tasks_statement(user_id))
+        return int(result.scalar_one() or 0)
+
+    @staticmethod
+    def _count_completed_tasks_statement(user_id: uuid.UUID) -> Select[tuple[int]]:
+        return select(func.count()).select_from(Task).where(
             and_(
                 Task.user_id == user_id,
                 Task.is_completed.is_(True),
                 Task.is_deleted.is_(False),
             )
         )
-        result = await db.execute(stmt)
-        return int(result.scalar_one() or 0)
 
-    async def count_tasks_by_goal(
+    async def count_completed_tasks(
         self,
         db: AsyncSession,
         user_id: uuid.UUID,
-        goal_id: uuid.UUID,
-    ) -> tuple[int, int]:
-        """
-        Returns (total_tasks, completed_tasks) for all tasks under the goal's task lists.
-        Phase tasks are stored separately, so they are naturally excluded.
-        """
-        stmt = (
+    ) -> int:
+        result = await db.execute(self._count_completed_tasks_statement(user_id))
+        return int(result.scalar_one() or 0)
+
+    @staticmethod
+    def _count_tasks_by_goal_statement(
+        user_id: uuid.UUID, goal_id: uuid.UUID
+    ) -> Select[tuple[int, int]]:
+        return (
             select(
                 func.count().label("total"),
                 func.count().filter(Task.is_completed.is_(True)).label("completed"),
@@ -271,7 +287,18 @@ class TaskService:
                 TaskList.goal_id == goal_id,
             )
         )
-        result = await db.execute(stmt)
+
+    async def count_tasks_by_goal(
+        self,
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        goal_id: uuid.UUID,
+    ) -> tuple[int, int]:
+        """
+        Returns (total_tasks, completed_tasks) for all tasks under the goal's task lists.
+        Phase tasks are stored separately, so they are naturally excluded.
+        """
+        result = await db.execute(self._count_tasks_by_goal_statement(user_id, goal_id))
         row = result.one()
         total = int(row.total or 0)
         completed = int(row.completed or 0)
@@ -5,6 +5,7 @@ Celery autodiscovery will import `app.tasks` (this package). Import task modules
 to ensure workers register them.
 """
 
+from app.tasks import knowledge_gc as knowledge_gc  # noqa: F401
 from app.tasks import knowledge_ingest as knowledge_ingest  # noqa: F401
 from app.tasks import summaries as summaries  # noqa: F401
 
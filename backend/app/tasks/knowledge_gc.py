@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.db import Sync_session, sync_engine
+import app.models  # noqa: F401  (populate SQLAlchemy metadata)
+from app.models.knowledge_document import KnowledgeDocument
+
+logger = logging.getLogger(__name__)
+
+_VECTOR_INDEX = "ix_knowledge_chunks_embedding_hnsw_cosine"
+
+# Rows are locked with SKIP LOCKED so a running ingestion or delete is never
+# blocked; whatever is skipped is picked up by the next run.
+_DELETE_CHUNKS_SQL = text(
+    """
+    WITH doomed AS (
+        SELECT id FROM knowledge_chunks
+        WHERE is_deleted AND updated_at < :cutoff
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), deleted AS (
+        DELETE FROM knowledge_chunks c USING doomed
+        WHERE c.id = doomed.id
+        RETURNING pg_column_size(c.*) AS bytes
+    )
+    SELECT count(*), coalesce(sum(bytes), 0) FROM deleted
+    """
+)
+_COUNT_CHUNKS_SQL = text(
+    """
+    SELECT count(*), coalesce(sum(pg_column_size(c.*)), 0)
+    FROM (
+        SELECT * FROM knowledge_chunks
+        WHERE is_deleted AND updated_at < :cutoff
+        LIMIT :limit
+    ) c
+    """
+)
+# Chunks go with their document (ON DELETE CASCADE).
+_DELETE_DOCUMENTS_SQL = text(
+    """
+    WITH doomed AS (
+        SELECT id FROM knowledge_documents
+        WHERE is_deleted AND updated_at < :cutoff
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ), deleted AS (
+        DELETE FROM knowledge_documents d USING doomed
+        WHERE d.id = doomed.id
+        RETURNING 1
+    )
+    SELECT count(*) FROM deleted
+    """
+)
+_COUNT_DOCUMENTS_SQL = text(
+    """
+    SELECT count(*) FROM (
+        SELECT 1 FROM knowledge_documents
+        WHERE is_deleted AND updated_at < :cutoff
+        LIMIT :limit
+    ) d
+    """
+)
+
+
+@dataclass
+class GcReport:
+    dry_run: bool
+    chunks_deleted: int = 0
+    chunk_bytes: int = 0
+    documents_deleted: int = 0
+    files_deleted: int = 0
+    file_bytes: int = 0
+    vacuumed: bool = False
+    reindexed: bool = False
+    seconds: float = 0.0
+
+
+def _collect_chunks(db: Session, cutoff: datetime, report: GcReport) -> None:
+    batch_size = settings.KNOWLEDGE_GC_BATCH_SIZE
+    max_batches = settings.KNOWLEDGE_GC_MAX_BATCHES
+    if report.dry_run:
+        count, size = db.execute(
+            _COUNT_CHUNKS_SQL, {"cutoff": cutoff, "limit": batch_size * max_batches}
+        ).one()
+        report.chunks_deleted, report.chunk_bytes = int(count), int(size)
+        return
+
+    # One short transaction per batch keeps locks and WAL bursts small.
+    for _ in range(max_batches):
+        count, size = db.execute(
+            _DELETE_CHUNKS_SQL, {"cutoff": cutoff, "batch_size": batch_size}
+        ).one()
+        db.commit()
+        report.chunks_deleted += int(count)
+        report.chunk_bytes += int(size)
+        if count < batch_size:
+            break
+
+
+def _collect_documents(db: Session, cutoff: datetime, report: GcReport) -> None:
+    batch_size = settings.KNOWLEDGE_GC_BATCH_SIZE
+    max_batches = settings.KNOWLEDGE_GC_MAX_BATCHES
+    if report.dry_run:
+        report.documents_deleted = int(
+            db.execute(
+                _COUNT_DOCUMENTS_SQL, {"cutoff": cutoff, "limit": batch_size * max_batches}
+            ).scalar_one()
+        )
+        return
+
+    for _ in range(max_batches):
+        deleted = int(
+            db.execute(
+                _DELETE_DOCUMENTS_SQL, {"cutoff": cutoff, "batch_size": batch_size}
+            ).scalar_one()
+        )
+        db.commit()
+        report.documents_deleted += deleted
+        if deleted < batch_size:
+            break
+
+
+def _iter_stored_files(root: Path) -> Iterator[Path]:
+    # Only upload storage: objects/, tmp/ and the legacy per-user directories.
+    # The root may be shared with other data (e.g. the ONNX export dir).
+    for child in root.iterdir():
+        if not child.is_dir():
+            continue
+        if child.name not in ("objects", "tmp"):
+            try:
+                uuid.UUID(child.name)
+            except ValueError:
+                continue
+        yield from (path for path in child.rglob("*") if path.is_file())
+
+
+def _is_referenced(db: Session, path: Path) -> bool:
+    return (
+        db.execute(
+            select(KnowledgeDocument.id)
+            .where(
+                KnowledgeDocument.file_path == str(path),
+                KnowledgeDocument.is_deleted.is_(False),
+            )
+            .limit(1)
+        ).first()
+        is not None
+    )
+
+
+def _try_lock_object(db: Session, path: Path) -> bool:
+    # Same key as knowledge_service._lock_objects, which uploads hold from
+    # promoting an object until their document rows commit.
+    return bool(
+        db.execute(select(func.pg_try_advisory_xact_lock(func.hashtext(str(path))))).scalar_one()
+    )
+
+
+def _collect_files(db: Session, cutoff: datetime, report: GcReport) -> None:
+    """
+    Remove stored files that no live document points at: objects left behind
+    by deleted or replaced documents, failed batch uploads and stale temp
+    files. Files younger than the grace period are kept (temp files of
+    uploads in progress, objects of uploads that rolled back).
+    Before unlinking, the object's advisory lock is taken and the mtime and
+    references are checked again: an upload reusing the object holds that
+    lock until its document row is committed, so a file is either unlinked
+    before the upload promotes it (which then writes it anew) or seen as
+    referenced. Objects locked by an upload are left for the next run.
+    """
+    root = Path(settings.KNOWLEDGE_STORAGE_ROOT).expanduser().resolve()
+    if not root.is_dir():
+        return
+    referenced = set(
+        db.execute(
+            select(KnowledgeDocument.file_path).where(
+                KnowledgeDocument.is_deleted.is_(False)
+            )
+        ).scalars()
+    )
+    cutoff_ts = cutoff.timestamp()
+
+    for path in _iter_stored_files(root):
+        try:
+            if str(path) in referenced:
+                continue
+            stat = path.stat()
+            if stat.st_mtime >= cutoff_ts:
+                continue
+            if not report.dry_run:
+                try:
+                    if not _try_lock_object(db, path):
+                        continue
+                    stat = path.stat()
+                    if stat.st_mtime >= cutoff_ts or _is_referenced(db, path):
+                        continue
+                    path.unlink()
+                finally:
+                    # Ends the transaction, releasing the lock.
+                    db.commit()
+        except OSError as exc:
+            logger.warning("knowledge gc could not remove %s: %s", path, exc)
+            continue
+        report.files_deleted += 1
+        report.file_bytes += stat.st_size
+
+
+def _maintain_indexes(report: GcReport) -> None:
+    """
+    VACUUM once dead tuples pass KNOWLEDGE_GC_VACUUM_DEAD_RATIO, and rebuild
+    the vector index after deletes larger than KNOWLEDGE_GC_REINDEX_RATIO of
+    the table (ANN graphs/lists degrade with many removed entries).
+    Both need autocommit, so they run on their own connection.
+    """
+    with sync_engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        row = conn.execute(
+            text(
+                "SELECT n_live_tup, n_dead_tup FROM pg_stat_user_tables "
+                "WHERE relname = 'knowledge_chunks'"
+            )
+        ).one_or_none()
+        live, dead = (int(row[0]), int(row[1])) if row else (0, 0)
+
+        vacuum_ratio = settings.KNOWLEDGE_GC_VACUUM_DEAD_RATIO
+        if vacuum_ratio > 0 and dead and dead / max(live + dead, 1) >= vacuum_ratio:
+            conn.execute(text("VACUUM (ANALYZE) knowledge_chunks"))
+            report.vacuumed = True
+
+        reindex_ratio = settings.KNOWLEDGE_GC_REINDEX_RATIO
+        if (
+            reindex_ratio > 0
+            and report.chunks_deleted
+            and report.chunks_deleted / max(live + report.chunks_deleted, 1) >= reindex_ratio
+        ):
+            conn.execute(text(f"REINDEX INDEX CONCURRENTLY {_VECTOR_INDEX}"))
+            report.reindexed = True
+
+
+@celery_app.task(name="knowledge.gc", bind=True, acks_late=True)
+def collect_garbage(self, dry_run: bool | None = None) -> dict:
+    """
+    Hard-delete knowledge chunks and documents that were soft-deleted more
+    than KNOWLEDGE_GC_GRACE_HOURS ago, in bounded batches, then reclaim
+    unreferenced stored files and VACUUM/REINDEX past their thresholds.
+    With dry_run nothing is changed; the report says what would be reclaimed.
+    """
+    started = time.perf_counter()
+    report = GcReport(
+        dry_run=settings.KNOWLEDGE_GC_DRY_RUN if dry_run is None else dry_run
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.KNOWLEDGE_GC_GRACE_HOURS)
+
+    with Sync_session() as db:
+        _collect_chunks(db, cutoff, report)
+        _collect_documents(db, cutoff, report)
+        _collect_files(db, cutoff, report)
+        db.rollback()
+
+    if not report.dry_run:
+        _maintain_indexes(report)
+
+    report.seconds = round(time.perf_counter() - started, 2)
+    logger.info("knowledge gc %s", asdict(report))
+    return asdict(report)
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-import asyncio
+import logging
 import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import groupby
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from sqlalchemy import update
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
 
 from app.core.celery_app import celery_app
 from app.core.db import Sync_session
@@ -13,100 +19,433 @@ import app.models  # noqa: F401  (populate SQLAlchemy metadata)
 from app.models.knowledge_chunk import KnowledgeChunk
 from app.models.knowledge_document import KnowledgeDocument
 from app.services.embedding_service import EmbeddingService
-from app.utils.knowledge_ingestion import extract_text_from_path, split_text
+from app.utils.chunk_writer import build_chunk_rows, chunk_content_hash, write_chunks
+from app.utils.knowledge_ingestion import (
+    TextChunk,
+    TextSegment,
+    iter_split_segments,
+    iter_text_from_path,
+)
+from app.utils.pipeline import StagePipeline
 
+logger = logging.getLogger(__name__)
 
-def _run(coro):
-    # Celery runs in normal sync context; safe to create a loop.
-    return asyncio.run(coro)
+INGEST_BATCH_SIZE = 64
+# Batch ingestion embeds chunks of several documents per model call.
+BATCH_INGEST_EMBED_SIZE = 256
+
+
+def _batched(items: Iterable[TextChunk], size: int) -> Iterator[list[TextChunk]]:
+    batch: list[TextChunk] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass(eq=False)
+class _IngestState:
+    document: KnowledgeDocument
+    # Generation the new chunk rows are written with (see KnowledgeChunk.generation)
+    generation: int = 0
+    # Fraction of the source file consumed so far (0..1)
+    source_progress: float = 0.0
+    created: int = 0
+    # Incremental re-ingestion: rows kept as-is vs embedded again
+    reused: int = 0
+    recomputed: int = 0
+    extracted: bool = False
+    failed: bool = False
+
+
+@dataclass(eq=False)
+class _ChunkBatch:
+    """One batch of a document's chunks as it moves through the pipeline."""
+
+    chunks: list[TextChunk]
+    start_index: int
+    # Fraction of the source consumed when the batch was cut
+    progress: float
+    # Positions in `chunks` to embed and insert (all unless incremental),
+    # with their embeddings; filled by the embed stage.
+    new: list[int] = field(default_factory=list)
+    embeddings: list[list[float]] = field(default_factory=list)
+    # Incremental mode: kept rows whose chunk_index/pages changed
+    renumbered: list[dict[str, object]] = field(default_factory=list)
+
+
+# content_hash -> existing live chunks (id, chunk_index, page_start, page_end)
+# with that text
+_ExistingChunks = dict[
+    str, deque[tuple[uuid.UUID, int, int | None, int | None]]
+]
+
+
+def _start_ingest(
+    db: Session, document: KnowledgeDocument, *, keep_chunks: bool = False
+) -> None:
+    document.status = "processing"
+    document.ingest_progress = 0
+    document.chunk_count = 0
+    document.error_message = None
+    if keep_chunks:
+        return
+
+    # Soft-delete existing chunks if re-ingesting
+    db.execute(
+        update(KnowledgeChunk)
+        .where(
+            KnowledgeChunk.document_id == document.id,
+            KnowledgeChunk.is_deleted.is_(False),
+        )
+        .values(is_deleted=True)
+    )
+
+
+def _iter_document_chunks(
+    state: _IngestState, embedder: EmbeddingService
+) -> Iterator[TextChunk]:
+    # Extraction, chunking and embedding are all lazy: only a few batches of
+    # chunks are held in memory, and every committed batch is searchable
+    # while the rest of the document is still being parsed. The path is read
+    # up front since the chunks may be consumed in another thread.
+    path = Path(state.document.file_path)
+    mime_type = state.document.mime_type
+
+    def _segments() -> Iterator[TextSegment]:
+        for segment in iter_text_from_path(
+            path,
+            mime_type,
+            pdf_workers=settings.KNOWLEDGE_PDF_WORKERS,
+            pdf_parallel_min_pages=settings.KNOWLEDGE_PDF_PARALLEL_MIN_PAGES,
+            pdf_pages_per_task=settings.KNOWLEDGE_PDF_PAGES_PER_TASK,
+        ):
+            state.source_progress = segment.progress
+            yield segment
+
+    if settings.KNOWLEDGE_CHUNK_MAX_TOKENS > 0:
+        return iter_split_segments(
+            _segments(),
+            chunk_size=min(settings.KNOWLEDGE_CHUNK_MAX_TOKENS, embedder.token_budget()),
+            overlap=settings.KNOWLEDGE_CHUNK_OVERLAP_TOKENS,
+            token_offsets=embedder.token_offsets,
+        )
+    return iter_split_segments(
+        _segments(),
+        chunk_size=settings.KNOWLEDGE_CHUNK_SIZE,
+        overlap=settings.KNOWLEDGE_CHUNK_OVERLAP,
+    )
+
+
+def _embed(embedder: EmbeddingService, texts: list[str]) -> list[list[float]]:
+    embeddings = embedder.embed_texts_sync(texts)
+    if len(embeddings) != len(texts):
+        raise RuntimeError(
+            f"Embedding count mismatch: got {len(embeddings)} embeddings for {len(texts)} chunks"
+        )
+    return embeddings
+
+
+def _write_batch(
+    db: Session,
+    state: _IngestState,
+    chunks: list[TextChunk],
+    embeddings: list[list[float]],
+) -> None:
+    document = state.document
+    write_chunks(
+        db,
+        build_chunk_rows(
+            document.id,
+            document.user_id,
+            document.goal_id,
+            state.created,
+            [c.text for c in chunks],
+            embeddings,
+            pages=[(c.page_start, c.page_end) for c in chunks],
+            generation=state.generation,
+        ),
+    )
+    state.recomputed += len(chunks)
+    _advance(state, len(chunks), state.source_progress)
+
+
+def _load_existing_chunks(db: Session, document_id: uuid.UUID) -> _ExistingChunks:
+    rows = db.execute(
+        select(
+            KnowledgeChunk.id,
+            KnowledgeChunk.chunk_index,
+            KnowledgeChunk.page_start,
+            KnowledgeChunk.page_end,
+            KnowledgeChunk.content_hash,
+        )
+        .where(
+            KnowledgeChunk.document_id == document_id,
+            KnowledgeChunk.is_deleted.is_(False),
+        )
+        .order_by(KnowledgeChunk.chunk_index)
+    ).all()
+    existing: _ExistingChunks = defaultdict(deque)
+    for chunk_id, chunk_index, page_start, page_end, content_hash in rows:
+        if content_hash:
+            existing[content_hash].append((chunk_id, chunk_index, page_start, page_end))
+    return existing
+
+
+def _iter_batches(state: _IngestState, chunks: Iterator[TextChunk]) -> Iterator[_ChunkBatch]:
+    start_index = 0
+    for batch in _batched(chunks, INGEST_BATCH_SIZE):
+        yield _ChunkBatch(batch, start_index, state.source_progress)
+        start_index += len(batch)
+
+
+def _embed_batch(
+    embedder: EmbeddingService, existing: _ExistingChunks | None, batch: _ChunkBatch
+) -> _ChunkBatch:
+    """
+    Embed the chunks of `batch` that need new rows. Incremental mode keeps
+    existing rows whose text is unchanged (renumbering them if chunks moved)
+    and only embeds the new or edited chunks. Matched rows are taken out of
+    `existing`; whatever is left at the end is stale.
+    """
+    if not existing:
+        batch.new = list(range(len(batch.chunks)))
+    else:
+        for position, chunk in enumerate(batch.chunks):
+            chunk_index = batch.start_index + position
+            candidates = existing.get(chunk_content_hash(chunk.text))
+            if not candidates:
+                batch.new.append(position)
+                continue
+            chunk_id, old_index, page_start, page_end = candidates.popleft()
+            if (old_index, page_start, page_end) != (
+                chunk_index,
+                chunk.page_start,
+                chunk.page_end,
+            ):
+                batch.renumbered.append(
+                    {
+                        "id": chunk_id,
+                        "chunk_index": chunk_index,
+                        "page_start": chunk.page_start,
+                        "page_end": chunk.page_end,
+                    }
+                )
+    if batch.new:
+        batch.embeddings = _embed(embedder, [batch.chunks[i].text for i in batch.new])
+    return batch
+
+
+def _write_embedded_batch(db: Session, state: _IngestState, batch: _ChunkBatch) -> None:
+    document = state.document
+    if batch.renumbered:
+        # Bulk UPDATE by primary key (executemany).
+        db.execute(update(KnowledgeChunk), batch.renumbered)
+    if batch.new:
+        new_chunks = [batch.chunks[i] for i in batch.new]
+        write_chunks(
+            db,
+            build_chunk_rows(
+                document.id,
+                document.user_id,
+                document.goal_id,
+                0,
+                [c.text for c in new_chunks],
+                batch.embeddings,
+                chunk_indices=[batch.start_index + i for i in batch.new],
+                pages=[(c.page_start, c.page_end) for c in new_chunks],
+                generation=state.generation,
+            ),
+        )
+    state.reused += len(batch.chunks) - len(batch.new)
+    state.recomputed += len(batch.new)
+    _advance(state, len(batch.chunks), batch.progress)
+
+
+def _advance(state: _IngestState, count: int, progress: float) -> None:
+    document = state.document
+    state.created += count
+    document.chunk_count = state.created
+    # The total is unknown until extraction ends; report how much of
+    # the source has been consumed instead.
+    document.ingest_progress = min(int(progress * 100), 99)
+
+
+def _mark_failed(db: Session, document_id: uuid.UUID, error: Exception) -> None:
+    try:
+        document = db.get(KnowledgeDocument, document_id)
+        if document:
+            document.status = "failed"
+            document.ingest_progress = 0
+            document.error_message = str(error)[:2000]
+            db.commit()
+    except Exception:
+        db.rollback()
 
 
 @celery_app.task(name="knowledge.ingest_document", bind=True, acks_late=True)
-def ingest_document(self, document_id: str) -> None:
+def ingest_document(
+    self, document_id: str, incremental: bool | None = None
+) -> dict[str, object] | None:
+    """
+    (Re-)ingest one document. In incremental mode (default:
+    KNOWLEDGE_INGEST_INCREMENTAL) existing chunks whose text hash is
+    unchanged keep their rows and embeddings; only new or edited chunks are
+    embedded and inserted, and chunks that no longer occur are soft-deleted
+    at the end. Returns how many chunks were reused vs recomputed, and the
+    busy seconds of each pipeline stage next to the wall time.
+    """
     doc_id = uuid.UUID(document_id)
+    if incremental is None:
+        incremental = settings.KNOWLEDGE_INGEST_INCREMENTAL
 
     with Sync_session() as db:
         document = db.get(KnowledgeDocument, doc_id)
         if not document or document.is_deleted:
-            return
+            return None
 
         try:
-            document.status = "processing"
-            document.ingest_progress = 0
-            document.chunk_count = 0
-            document.error_message = None
+            existing = _load_existing_chunks(db, doc_id) if incremental else None
+            # With nothing to reuse, fall back to the plain path.
+            _start_ingest(db, document, keep_chunks=bool(existing))
             db.commit()
 
-            path = Path(document.file_path)
-            text = extract_text_from_path(path, document.mime_type)
-            chunks = split_text(
-                text,
-                chunk_size=settings.KNOWLEDGE_CHUNK_SIZE,
-                overlap=settings.KNOWLEDGE_CHUNK_OVERLAP,
+            # Without old chunks, committed batches are searchable right away.
+            # Otherwise new rows get the next generation and stay hidden until
+            # the stale ones are soft-deleted, so search never sees both sets.
+            state = _IngestState(
+                document,
+                generation=document.generation + 1 if existing else document.generation,
             )
-            total = len(chunks)
-            document.chunk_count = total
-            db.commit()
-
-            # Soft-delete existing chunks if re-ingesting
-            db.execute(
-                update(KnowledgeChunk)
-                .where(
-                    KnowledgeChunk.document_id == document.id,
-                    KnowledgeChunk.is_deleted.is_(False),
+            embedder = EmbeddingService()
+            # extract+chunk -> embed -> write run concurrently, so the model
+            # keeps encoding while the previous batch is being committed.
+            with StagePipeline(settings.KNOWLEDGE_INGEST_PIPELINE_DEPTH) as pipeline:
+                batches = pipeline.source(
+                    "extract", _iter_batches(state, _iter_document_chunks(state, embedder))
                 )
-                .values(is_deleted=True)
-            )
-            db.commit()
+                for batch in pipeline.map(
+                    "embed", partial(_embed_batch, embedder, existing), batches
+                ):
+                    with pipeline.timed("write"):
+                        _write_embedded_batch(db, state, batch)
+                        db.commit()
 
-            if total == 0:
-                document.status = "ready"
-                document.ingest_progress = 100
-                db.commit()
-                return
+                with pipeline.timed("write"):
+                    if existing:
+                        stale = [row[0] for rows in existing.values() for row in rows]
+                        if stale:
+                            db.execute(
+                                update(KnowledgeChunk)
+                                .where(KnowledgeChunk.id.in_(stale))
+                                .values(is_deleted=True)
+                            )
+                    document.generation = state.generation
+                    document.status = "ready"
+                    document.ingest_progress = 100
+                    db.commit()
 
-            embedder = EmbeddingService()
-            batch_size = 64
-            created = 0
-
-            for start in range(0, total, batch_size):
-                batch_chunks = chunks[start : start + batch_size]
-                embeddings = _run(embedder.embed_texts(batch_chunks))
-                if len(embeddings) != len(batch_chunks):
-                    raise RuntimeError(
-                        f"Embedding count mismatch: got {len(embeddings)} embeddings for {len(batch_chunks)} chunks"
-                    )
+            seconds = {name: round(value, 3) for name, value in pipeline.seconds.items()}
+            logger.info(
+                "ingested document_id=%s chunks=%s reused=%s recomputed=%s "
+                "embedding_cache_hits=%s misses=%s seconds=%s",
+                document.id,
+                state.created,
+                state.reused,
+                state.recomputed,
+                embedder.cache.hits if embedder.cache is not None else None,
+                embedder.cache.misses if embedder.cache is not None else None,
+                seconds,
+            )
+            return {
+                "chunks": state.created,
+                "reused": state.reused,
+                "recomputed": state.recomputed,
+                "seconds": seconds,
+            }
+        except Exception as e:
+            db.rollback()
+            _mark_failed(db, doc_id, e)
+            raise
 
-                for idx_in_batch, (chunk, embedding) in enumerate(
-                    zip(batch_chunks, embeddings)
-                ):
-                    db.add(
-                        KnowledgeChunk(
-                            document_id=document.id,
-                            chunk_index=start + idx_in_batch,
-                            content=chunk,
-                            embedding=embedding,
-                        )
-                    )
 
-                created = min(start + len(batch_chunks), total)
-                document.ingest_progress = int(created * 100 / total)
-                db.commit()
+@celery_app.task(name="knowledge.ingest_documents", bind=True, acks_late=True)
+def ingest_documents(self, document_ids: list[str]) -> None:
+    """
+    Ingest many documents in one job. Chunks from consecutive documents
+    share embedding batches of BATCH_INGEST_EMBED_SIZE, so small files no
+    longer each pay for a mostly empty model call. Progress and chunk counts
+    are still tracked per document, and a document whose file can't be
+    parsed fails alone.
+    """
+    with Sync_session() as db:
+        states: list[_IngestState] = []
+        for raw_id in document_ids:
+            document = db.get(KnowledgeDocument, uuid.UUID(raw_id))
+            if document and not document.is_deleted:
+                _start_ingest(db, document)
+                states.append(_IngestState(document, generation=document.generation))
+        db.commit()
+        if not states:
+            return
 
-            document.status = "ready"
-            document.ingest_progress = 100
+        embedder = EmbeddingService()
+        pending: list[tuple[_IngestState, TextChunk]] = []
+
+        def _flush() -> None:
+            if pending:
+                embeddings = _embed(embedder, [chunk.text for _, chunk in pending])
+                # Pending chunks are in document order, so each group is contiguous.
+                offset = 0
+                for state, group in groupby(pending, key=lambda item: item[0]):
+                    chunks = [chunk for _, chunk in group]
+                    _write_batch(
+                        db, state, chunks, embeddings[offset : offset + len(chunks)]
+                    )
+                    offset += len(chunks)
+                pending.clear()
+            for state in states:
+                if state.extracted and not state.failed and state.document.status != "ready":
+                    state.document.status = "ready"
+                    state.document.ingest_progress = 100
             db.commit()
+
+        try:
+            for state in states:
+                chunks = _iter_document_chunks(state, embedder)
+                while True:
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        break
+                    except Exception as e:
+                        # A broken file fails only its own document.
+                        logger.warning(
+                            "ingest failed for document_id=%s: %s", state.document.id, e
+                        )
+                        pending[:] = [item for item in pending if item[0] is not state]
+                        state.failed = True
+                        _mark_failed(db, state.document.id, e)
+                        break
+                    pending.append((state, chunk))
+                    if len(pending) >= BATCH_INGEST_EMBED_SIZE:
+                        _flush()
+                state.extracted = True
+            _flush()
         except Exception as e:
             db.rollback()
-            try:
-                document = db.get(KnowledgeDocument, doc_id)
-                if document:
-                    document.status = "failed"
-                    document.ingest_progress = 0
-                    document.error_message = str(e)[:2000]
-                    db.commit()
-            except Exception:
-                pass
+            for state in states:
+                if not state.failed and state.document.status != "ready":
+                    _mark_failed(db, state.document.id, e)
             raise
 
-
+        logger.info(
+            "ingested %s documents chunks=%s embedding_cache_hits=%s misses=%s",
+            len(states),
+            sum(state.created for state in states),
+            embedder.cache.hits if embedder.cache is not None else None,
+            embedder.cache.misses if embedder.cache is not None else None,
+        )
@@ -2,62 +2,195 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime, timezone
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Callable
 
+from celery import chord
 from sqlalchemy import select
 
 from app.core.celery_app import celery_app
+from app.core.config import settings
 from app.core.db import Async_session
+from app.core.worker_loop import run_async
 import app.models  # noqa: F401  (populate SQLAlchemy metadata)
 from app.models.user import User
 from app.schemas.summary import SummaryType
 from app.services.summary_service import SummaryService
+from app.utils.rate_limit import AsyncRateLimiter
 
 logger = logging.getLogger(__name__)
 
 
-def _run(coro):
-    # Celery runs in sync context; safe to create a loop.
-    return asyncio.run(coro)
+@dataclass
+class SummaryRunStats:
+    users: int = 0
+    generated: int = 0
+    # Already ready for the period
+    skipped: int = 0
+    failed: int = 0
+    ai_wait_seconds: float = 0.0
+    seconds: float = 0.0
+
+
+def _due_types(service: SummaryService, today: date) -> list[SummaryType]:
+    # Summaries are generated on the last day of their period.
+    return [
+        summary_type
+        for summary_type in (SummaryType.weekly, SummaryType.monthly)
+        if service.period_range_for_today(summary_type, today).end == today
+    ]
+
+
+async def _user_id_pages(page_size: int) -> list[list[str]]:
+    # Keyset pagination: each page is one short indexed query.
+    pages: list[list[str]] = []
+    last_id: uuid.UUID | None = None
+    async with Async_session() as db:
+        while True:
+            stmt = (
+                select(User.id)
+                .where(User.is_deleted.is_(False))
+                .order_by(User.id)
+                .limit(page_size)
+            )
+            if last_id is not None:
+                stmt = stmt.where(User.id > last_id)
+            user_ids = list((await db.execute(stmt)).scalars())
+            if not user_ids:
+                break
+            pages.append([str(user_id) for user_id in user_ids])
+            last_id = user_ids[-1]
+            if len(user_ids) < page_size:
+                break
+    return pages
 
 
 @celery_app.task(name="summaries.generate_missing", bind=True, acks_late=True)
-def generate_missing(self) -> None:
+def generate_missing(self) -> dict[str, int]:
+    """
+    Nightly coordinator: pages through live users and fans out one
+    summaries.generate_for_users subtask per SUMMARY_FANOUT_BATCH_SIZE
+    users, with summaries.report_run collecting their stats at the end.
+    Does nothing on days that don't end a summary period.
+    """
     today = datetime.now(timezone.utc).date()
-    _run(_generate_for_date(today))
+    if not _due_types(SummaryService(), today):
+        return {"users": 0, "subtasks": 0}
 
+    # Per-process loop: pooled DB connections are reused across runs.
+    pages = run_async(_user_id_pages(max(settings.SUMMARY_FANOUT_BATCH_SIZE, 1)))
+    if not pages:
+        return {"users": 0, "subtasks": 0}
 
-async def _generate_for_date(today) -> None:
-    service = SummaryService()
+    day = today.isoformat()
+    chord(generate_for_users.s(user_ids, day) for user_ids in pages)(
+        report_run.s(day, time.time())
+    )
+    users = sum(len(page) for page in pages)
+    logger.info(
+        "summary run day=%s users=%s subtasks=%s", day, users, len(pages)
+    )
+    return {"users": users, "subtasks": len(pages)}
+
+
+async def _generate_for_user(
+    service: SummaryService,
+    user_id: uuid.UUID,
+    today: date,
+    due: list[SummaryType],
+    stats: SummaryRunStats,
+) -> None:
     async with Async_session() as db:
-        result = await db.execute(
-            select(User.id).where(User.is_deleted.is_(False))
-        )
-        user_ids = [row[0] for row in result.all()]
-
-    for user_id in user_ids:
-        async with Async_session() as db:
-            for summary_type in (SummaryType.weekly, SummaryType.monthly):
-                period = service.period_range_for_today(summary_type, today)
-                if today != period.end:
-                    continue
-                existing = await service.get_summary(
-                    db, user_id, summary_type, period.start
+        for summary_type in due:
+            period = service.period_range_for_today(summary_type, today)
+            existing = await service.get_summary(db, user_id, summary_type, period.start)
+            if existing and existing.status == "ready":
+                stats.skipped += 1
+                continue
+            try:
+                await service.generate_summary(
+                    db,
+                    user_id,
+                    summary_type,
+                    period.start,
+                    period.end,
                 )
-                if existing and existing.status == "ready":
-                    continue
-                try:
-                    await service.generate_summary(
-                        db,
-                        user_id,
-                        summary_type,
-                        period.start,
-                        period.end,
-                    )
-                except Exception as exc:
-                    logger.warning(
-                        "summary generation failed user_id=%s type=%s error=%s",
-                        user_id,
-                        summary_type.value,
-                        exc,
-                    )
+                stats.generated += 1
+            except Exception as exc:
+                stats.failed += 1
+                logger.warning(
+                    "summary generation failed user_id=%s type=%s error=%s",
+                    user_id,
+                    summary_type.value,
+                    exc,
+                )
+
+
+async def _generate_for_users(
+    user_ids: list[str],
+    today: date,
+    on_progress: Callable[[SummaryRunStats, int], None] | None = None,
+) -> SummaryRunStats:
+    started = time.perf_counter()
+    limiter = AsyncRateLimiter(settings.SUMMARY_AI_RATE_PER_SECOND)
+    service = SummaryService(ai_rate_limiter=limiter)
+    due = _due_types(service, today)
+    stats = SummaryRunStats(users=len(user_ids))
+    semaphore = asyncio.Semaphore(max(settings.SUMMARY_USER_CONCURRENCY, 1))
+    done = 0
+
+    async def _one(user_id: str) -> None:
+        nonlocal done
+        async with semaphore:
+            try:
+                await _generate_for_user(service, uuid.UUID(user_id), today, due, stats)
+            except Exception as exc:
+                # DB trouble for one user must not cost the rest of the batch.
+                stats.failed += 1
+                logger.warning("summaries failed user_id=%s error=%s", user_id, exc)
+            done += 1
+            if on_progress is not None:
+                on_progress(stats, done)
+
+    await asyncio.gather(*(_one(user_id) for user_id in user_ids))
+    stats.ai_wait_seconds = round(limiter.waited_seconds, 2)
+    stats.seconds = round(time.perf_counter() - started, 2)
+    return stats
+
+
+@celery_app.task(name="summaries.generate_for_users", bind=True, acks_late=True)
+def generate_for_users(self, user_ids: list[str], day: str) -> dict:
+    """
+    Generate the summaries due on `day` for a batch of users, concurrently.
+    Progress (users done, counts so far) is published as the task's state.
+    """
+
+    def _progress(stats: SummaryRunStats, done: int) -> None:
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta={**asdict(stats), "done": done})
+
+    stats = run_async(_generate_for_users(user_ids, date.fromisoformat(day), _progress))
+    logger.info("summary batch day=%s %s", day, asdict(stats))
+    return asdict(stats)
+
+
+@celery_app.task(name="summaries.report_run", bind=True)
+def report_run(self, results: list[dict], day: str, started_at: float) -> dict:
+    """Chord callback: totals of one nightly run, logged as a single line."""
+    totals = SummaryRunStats()
+    for result in results:
+        totals.users += result["users"]
+        totals.generated += result["generated"]
+        totals.skipped += result["skipped"]
+        totals.failed += result["failed"]
+        totals.ai_wait_seconds += result["ai_wait_seconds"]
+    totals.ai_wait_seconds = round(totals.ai_wait_seconds, 2)
+    totals.seconds = round(time.time() - started_at, 2)
+    level = logging.WARNING if totals.failed else logging.INFO
+    logger.log(
+        level, "summary run finished day=%s subtasks=%s %s", day, len(results), asdict(totals)
+    )
+    return asdict(totals)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from typing import Any, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.base import utcnow
+from app.models.knowledge_chunk import KnowledgeChunk
+
+WRITE_MODES = ("copy", "executemany", "orm")
+
+# Column order used by the COPY path; must match `_COPY_TYPES`.
+_COPY_COLUMNS = (
+    "id",
+    "is_deleted",
+    "created_at",
+    "updated_at",
+    "document_id",
+    "user_id",
+    "goal_id",
+    "chunk_index",
+    "page_start",
+    "page_end",
+    "content",
+    "content_hash",
+    "generation",
+    "embedding",
+)
+_COPY_TYPES = [
+    "uuid",
+    "bool",
+    "timestamptz",
+    "timestamptz",
+    "uuid",
+    "uuid",
+    "uuid",
+    "int4",
+    "int4",
+    "int4",
+    "text",
+    "text",
+    "int4",
+    "vector",
+]
+
+
+def chunk_content_hash(content: str) -> str:
+    # Must match the backfill in migration 202512170005.
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def build_chunk_rows(
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    goal_id: uuid.UUID | None,
+    start_index: int,
+    contents: Sequence[str],
+    embeddings: Sequence[Sequence[float]],
+    *,
+    chunk_indices: Sequence[int] | None = None,
+    pages: Sequence[tuple[int | None, int | None]] | None = None,
+    generation: int = 0,
+) -> list[dict[str, Any]]:
+    """
+    Build plain column dicts for `knowledge_chunks`, filling the values the ORM
+    would otherwise default (id, timestamps, is_deleted, content_hash).
+    Rows are numbered from `start_index` unless explicit `chunk_indices` are
+    given (incremental re-ingestion only inserts the changed chunks).
+    `pages` holds each chunk's (page_start, page_end), if the source is paged.
+    `generation` is the document generation the rows belong to.
+    """
+    now = utcnow()
+    if chunk_indices is None:
+        chunk_indices = range(start_index, start_index + len(contents))
+    if pages is None:
+        pages = [(None, None)] * len(contents)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "is_deleted": False,
+            "created_at": now,
+            "updated_at": now,
+            "document_id": document_id,
+            "user_id": user_id,
+            "goal_id": goal_id,
+            "chunk_index": chunk_index,
+            "page_start": page_start,
+            "page_end": page_end,
+            "content": content,
+            "content_hash": chunk_content_hash(content),
+            "generation": generation,
+            "embedding": embedding,
+        }
+        for chunk_index, (page_start, page_end), content, embedding in zip(
+            chunk_indices, pages, contents, embeddings
+        )
+    ]
+
+
+def _write_orm(db: Session, rows: Sequence[dict[str, Any]]) -> None:
+    db.add_all(KnowledgeChunk(**row) for row in rows)
+    db.flush()
+
+
+def _write_executemany(db: Session, rows: Sequence[dict[str, Any]]) -> None:
+    # Core insert with a list of parameter sets: a single multi-row statement
+    # per page, no unit-of-work or identity-map bookkeeping.
+    db.execute(insert(KnowledgeChunk), list(rows))
+
+
+def _write_copy(db: Session, rows: Sequence[dict[str, Any]]) -> None:
+    fairy = db.connection().connection
+    raw = fairy.driver_connection
+    if raw is None or not hasattr(raw, "cursor"):
+        raise RuntimeError("COPY requires a psycopg connection")
+
+    # Register pgvector's binary dumpers once per DBAPI connection; `info`
+    # lives as long as the pooled connection does.
+    if not fairy.info.get("pgvector_registered"):
+        from pgvector.psycopg import register_vector  # type: ignore
+
+        register_vector(raw)
+        fairy.info["pgvector_registered"] = True
+
+    statement = (
+        f"COPY {KnowledgeChunk.__tablename__} ({', '.join(_COPY_COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT BINARY)"
+    )
+    with raw.cursor() as cur:
+        with cur.copy(statement) as copy:
+            copy.set_types(_COPY_TYPES)
+            for row in rows:
+                copy.write_row([row[col] for col in _COPY_COLUMNS])
+
+
+def write_chunks(
+    db: Session, rows: Sequence[dict[str, Any]], mode: str | None = None
+) -> None:
+    """
+    Insert chunk rows inside the session's current transaction.
+
+    - "copy": PostgreSQL binary COPY (fastest; psycopg only)
+    - "executemany": SQLAlchemy Core bulk insert
+    - "orm": one ORM entity per row (slowest; kept for comparison)
+    """
+    if not rows:
+        return
+    mode = (mode or settings.KNOWLEDGE_INGEST_WRITE_MODE).lower()
+    if mode == "copy":
+        _write_copy(db, rows)
+    elif mode == "executemany":
+        _write_executemany(db, rows)
+    elif mode == "orm":
+        _write_orm(db, rows)
+    else:
+        raise ValueError(
+            f"Unknown chunk write mode {mode!r}; expected one of {', '.join(WRITE_MODES)}"
+        )
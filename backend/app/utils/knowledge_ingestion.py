@@ -1,7 +1,332 @@
 from __future__ import annotations
 
+import codecs
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+import logging
+import multiprocessing
+import os
 from pathlib import Path
 import re
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+# A block ends at a blank line, or right before a markdown heading line.
+# \r\n counts as a newline too; chunks keep the source's own line endings.
+# (Anchored on a literal \n so the regex engine can skip ahead quickly.)
+_BLOCK_BOUNDARY_RE = re.compile(r"\n(?:[ \t]*\r?\n)+|\n(?=#{1,6}[ \t])")
+_WHITESPACE = frozenset(" \t\r\n\f\v")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Streamed text is read from disk in pieces of this many bytes.
+_READ_BLOCK_BYTES = 256 * 1024
+
+# Start offset of every token of a text (e.g. EmbeddingService.token_offsets).
+TokenOffsets = Callable[[str], Sequence[int]]
+
+
+@dataclass(frozen=True)
+class TextSegment:
+    """A piece of extracted text plus how much of the source has been consumed."""
+
+    text: str
+    progress: float
+    # 1-based source page for paged formats (PDF), else None.
+    page: int | None = None
+
+
+@dataclass(frozen=True)
+class TextChunk:
+    """
+    A chunk and where it comes from: `text` is source[start:end] of the
+    concatenated extracted text, overlap included. page_start/page_end are
+    the first and last source page of the chunk's own text (None for unpaged
+    sources); the overlap copied from the previous chunk does not count.
+    """
+
+    text: str
+    start: int = 0
+    end: int = 0
+    page_start: int | None = None
+    page_end: int | None = None
+
+
+# (start, end, page, token offsets) of a block or chunk; offsets in token mode only.
+_Span = tuple[int, int, int | None, Sequence[int] | None]
+
+
+class _SpanChunker:
+    """
+    Single-pass chunker over offsets into the source text.
+
+    The buffer only holds the not yet chunked tail of the source. Blocks are
+    found there as (start, end) spans and packed whole into chunks; blocks
+    larger than a chunk are cut at whitespace (or token) boundaries. A chunk
+    is emitted as one slice of the buffer, overlap included, so no text is
+    joined or copied twice. Sizes are characters, or tokens when
+    `token_offsets` is given; in token mode the budget covers the overlap
+    too, since it stands for the model's input window.
+    """
+
+    def __init__(
+        self, chunk_size: int, overlap: int, token_offsets: TokenOffsets | None
+    ) -> None:
+        self.token_offsets = token_offsets
+        if token_offsets is None:
+            self.budget = max(int(chunk_size), 200)
+            self.overlap = min(max(int(overlap), 0), max(self.budget - 50, 0))
+            max_pending = self.budget * 4
+        else:
+            chunk_size = max(int(chunk_size), 16)
+            self.overlap = min(max(int(overlap), 0), chunk_size // 2)
+            self.budget = chunk_size - self.overlap
+            # ~4 characters per token
+            max_pending = chunk_size * 16
+        # Without a block boundary in sight, cut anyway to bound the buffer.
+        self.max_pending = max_pending
+
+        self.buf = ""
+        self.base = 0  # source offset of buf[0]
+        self.scan = 0  # source offset where the next block may start
+        # (source offset, page) wherever the source page changes. Paged
+        # sources end every page with a blank line, so a block never spans pages.
+        self.marks: list[tuple[int, int | None]] = []
+        self.blocks: list[_Span] = []  # packed into the next chunk
+        self.packed_tokens = 0
+        self.prev: _Span | None = None  # own span of the last emitted chunk
+        # Chunks completed by the current feed()/finish() call.
+        self.ready: list[TextChunk] = []
+
+    def _page_at(self, pos: int) -> int | None:
+        marks = self.marks
+        if len(marks) == 1:
+            return marks[0][1]
+        page = None
+        for offset, p in marks:
+            if offset > pos:
+                break
+            page = p
+        return page
+
+    def _tokenize(self, start: int, end: int) -> list[int]:
+        assert self.token_offsets is not None
+        rel = self.token_offsets(self.buf[start - self.base : end - self.base])
+        return [start + offset for offset in rel]
+
+    def feed(self, piece: str, page: int | None) -> list[TextChunk]:
+        if not piece:
+            return []
+        if not self.marks or self.marks[-1][1] != page:
+            self.marks.append((self.base + len(self.buf), page))
+        self.buf += piece
+        self._scan(final=False)
+        self._trim()
+        ready, self.ready = self.ready, []
+        return ready
+
+    def finish(self) -> list[TextChunk]:
+        self._scan(final=True)
+        self._flush()
+        ready, self.ready = self.ready, []
+        return ready
+
+    def _scan(self, *, final: bool) -> None:
+        buf, base = self.buf, self.base
+        pos = self.scan - base
+        size = len(buf)
+        for m in _BLOCK_BOUNDARY_RE.finditer(buf, pos):
+            start, end = m.span()
+            # A trailing newline may still become a blank line with the next piece.
+            if not final and end == size:
+                break
+            self._block(base + pos, base + start)
+            pos = end
+        if final:
+            self._block(base + pos, base + size)
+            pos = size
+        elif size - pos > self.max_pending:
+            # Cut after the last whitespace so no word is split (CSV, logs);
+            # only a window without any whitespace is cut where it stands.
+            cut = max(buf.rfind(c, pos, size) for c in _WHITESPACE) + 1
+            if cut <= pos:
+                cut = size
+            self._block(base + pos, base + cut)
+            pos = cut
+        self.scan = base + pos
+
+    def _block(self, start: int, end: int) -> None:
+        buf, base = self.buf, self.base
+        while start < end and buf[start - base] in _WHITESPACE:
+            start += 1
+        while end > start and buf[end - 1 - base] in _WHITESPACE:
+            end -= 1
+        if start == end:
+            return
+        offsets = self._tokenize(start, end) if self.token_offsets else None
+        span = (start, end, self._page_at(start), offsets)
+
+        size = len(offsets) if offsets is not None else end - start
+        if size > self.budget:
+            self._flush()
+            self._split(span)
+            return
+        if self.blocks:
+            if offsets is not None:
+                fits = self.packed_tokens + size <= self.budget
+            else:
+                fits = end - self.blocks[0][0] <= self.budget
+            if not fits:
+                self._flush()
+        self.blocks.append(span)
+        if offsets is not None:
+            self.packed_tokens += size
+
+    def _split(self, span: _Span) -> None:
+        buf, base, budget = self.buf, self.base, self.budget
+        span_start, span_end, page, offsets = span
+        if offsets is not None:
+            for i in range(0, len(offsets), budget):
+                end = offsets[i + budget] if i + budget < len(offsets) else span_end
+                while end > offsets[i] and buf[end - 1 - base] in _WHITESPACE:
+                    end -= 1
+                self._emit((offsets[i], end, page, offsets[i : i + budget]), page)
+            return
+
+        start = span_start
+        while start < span_end:
+            end = min(start + budget, span_end)
+            if end < span_end:
+                # Prefer a whitespace cut in the second half of the window.
+                lo = start + budget // 2 - base
+                cut = max(buf.rfind(" ", lo, end - base), buf.rfind("\n", lo, end - base))
+                if cut > lo:
+                    end = base + cut
+            stop = end
+            while stop > start and buf[stop - 1 - base] in _WHITESPACE:
+                stop -= 1
+            self._emit((start, stop, page, None), page)
+            start = end
+            while start < span_end and buf[start - base] in _WHITESPACE:
+                start += 1
+
+    def _flush(self) -> None:
+        blocks = self.blocks
+        if not blocks:
+            return
+        first, last = blocks[0], blocks[-1]
+        tail: list[int] | None = None
+        if self.token_offsets is not None and self.overlap:
+            # Only the last `overlap` tokens are needed for the next chunk.
+            tail = []
+            for block in reversed(blocks):
+                offsets = block[3]
+                assert offsets is not None
+                tail[:0] = offsets[max(len(offsets) - (self.overlap - len(tail)), 0) :]
+                if len(tail) >= self.overlap:
+                    break
+        self.blocks = []
+        self.packed_tokens = 0
+        self._emit((first[0], last[1], first[2], tail), last[2])
+
+    def _emit(self, own: _Span, page_end: int | None) -> None:
+        buf, base, overlap = self.buf, self.base, self.overlap
+        own_start, own_end, page, offsets = own
+        start = own_start
+        prev = self.prev
+        if prev is not None and overlap:
+            prev_start, prev_end, _, prev_offsets = prev
+            if self.token_offsets is not None:
+                prev_offsets = prev_offsets or ()
+                start = prev_offsets[-overlap] if len(prev_offsets) >= overlap else prev_start
+            else:
+                start = max(prev_start, prev_end - overlap)
+                if start > prev_start and buf[start - 1 - base] not in _WHITESPACE:
+                    # Don't open the chunk mid-word.
+                    m = _WHITESPACE_RE.search(buf, start - base, prev_end - base)
+                    start = base + m.end() if m else prev_end
+            if start >= prev_end:
+                start = own_start
+        if offsets is not None and overlap:
+            own = (own_start, own_end, page, offsets[-overlap:])
+        self.prev = own
+        self.ready.append(
+            TextChunk(
+                text=buf[start - base : own_end - base],
+                start=start,
+                end=own_end,
+                page_start=page,
+                page_end=page_end,
+            )
+        )
+
+    def _trim(self) -> None:
+        keep = self.scan
+        if self.blocks:
+            keep = min(keep, self.blocks[0][0])
+        if self.prev is not None and self.overlap:
+            keep = min(keep, self.prev[0])
+        drop = keep - self.base
+        # Drop the consumed head once it is at least half of the buffer, so
+        # each character is copied a bounded number of times.
+        if drop > 0 and drop * 2 >= len(self.buf):
+            page = self._page_at(keep)
+            self.buf = self.buf[drop:]
+            self.base = keep
+            self.marks = [(keep, page)] + [m for m in self.marks if m[0] > keep]
+
+
+def iter_chunks(
+    pieces: Iterable[tuple[str, int | None]],
+    chunk_size: int = 600,
+    overlap: int = 120,
+    *,
+    token_offsets: TokenOffsets | None = None,
+) -> Iterator[TextChunk]:
+    """
+    Incrementally chunk a stream of (text, page) pieces for RAG.
+
+    Pieces are treated as one continuous text and chunks are yielded as soon
+    as they are complete, so memory stays bounded by a few chunks regardless
+    of the size of the source. Sizes are characters, or tokens as counted by
+    `token_offsets` (chunk_size then is the whole budget, overlap included).
+    """
+    chunker = _SpanChunker(chunk_size, overlap, token_offsets)
+    for text, page in pieces:
+        yield from chunker.feed(text, page)
+    yield from chunker.finish()
+
+
+def iter_split_text(
+    texts: Iterable[str], chunk_size: int = 600, overlap: int = 120
+) -> Iterator[str]:
+    """
+    Incrementally chunk a stream of text pieces for RAG (see iter_chunks).
+    """
+    for chunk in iter_chunks(((t, None) for t in texts), chunk_size, overlap):
+        yield chunk.text
+
+
+def iter_split_segments(
+    segments: Iterable[TextSegment],
+    chunk_size: int = 600,
+    overlap: int = 120,
+    *,
+    token_offsets: TokenOffsets | None = None,
+) -> Iterator[TextChunk]:
+    """
+    Like iter_split_text, for extracted segments: each chunk also carries
+    its span and the pages it came from, tracked while chunking.
+    """
+    return iter_chunks(
+        ((seg.text, seg.page) for seg in segments),
+        chunk_size,
+        overlap,
+        token_offsets=token_offsets,
+    )
 
 
 def split_text(text: str, chunk_size: int = 600, overlap: int = 120) -> list[str]:
@@ -10,112 +335,217 @@ def split_text(text: str, chunk_size: int = 600, overlap: int = 120) -> list[str
     """
     if not text:
         return []
+    return list(iter_split_text([text], chunk_size=chunk_size, overlap=overlap))
 
-    chunk_size = max(int(chunk_size), 200)
-    overlap = max(int(overlap), 0)
-    overlap = min(overlap, max(chunk_size - 50, 0))
 
-    t = text.replace("\r\n", "\n").replace("\r", "\n").strip()
-    if not t:
-        return []
+def split_spans(
+    text: str,
+    chunk_size: int = 600,
+    overlap: int = 120,
+    *,
+    token_offsets: TokenOffsets | None = None,
+) -> list[tuple[int, int]]:
+    """
+    (start, end) offsets of the chunks of `text`; text[start:end] is the chunk.
+    """
+    return [
+        (chunk.start, chunk.end)
+        for chunk in iter_chunks(
+            [(text, None)], chunk_size, overlap, token_offsets=token_offsets
+        )
+    ]
+
+
+def _iter_plain_text(path: Path) -> Iterator[TextSegment]:
+    total = max(path.stat().st_size, 1)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    consumed = 0
+    with path.open("rb") as f:
+        while True:
+            raw = f.read(_READ_BLOCK_BYTES)
+            if not raw:
+                break
+            consumed += len(raw)
+            text = decoder.decode(raw)
+            if text:
+                yield TextSegment(text=text, progress=min(consumed / total, 1.0))
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield TextSegment(text=tail, progress=1.0)
+
+
+# Page range extraction in pool workers: each worker parses the PDF once.
+_worker_reader: Any = None
+
+
+def _init_pdf_worker(path: str) -> None:
+    global _worker_reader
+    from pypdf import PdfReader  # type: ignore
+
+    _worker_reader = PdfReader(path)
+
 
-    heading_re = re.compile(r"^(#{1,6})\s+.+$", re.MULTILINE)
-    matches = list(heading_re.finditer(t))
-
-    blocks: list[str] = []
-    if matches:
-        for i, m in enumerate(matches):
-            start = m.start()
-            end = matches[i + 1].start() if i + 1 < len(matches) else len(t)
-            seg = t[start:end].strip()
-            if seg:
-                blocks.append(seg)
-    else:
-        blocks = [b.strip() for b in re.split(r"\n\s*\n+", t) if b.strip()]
-
-    chunks: list[str] = []
-    current: list[str] = []
-    current_len = 0
-
-    def flush() -> None:
-        nonlocal current, current_len
-        if not current:
+def _extract_page(reader: Any, page_no: int) -> str:
+    try:
+        return reader.pages[page_no].extract_text() or ""
+    except Exception:
+        return ""
+
+
+def _extract_pdf_pages(start: int, stop: int) -> list[str]:
+    return [_extract_page(_worker_reader, page_no) for page_no in range(start, stop)]
+
+
+def _pdf_segment(text: str, page_no: int, total_pages: int) -> TextSegment:
+    return TextSegment(
+        text=text + "\n\n" if text.strip() else "",
+        progress=(page_no + 1) / max(total_pages, 1),
+        page=page_no + 1,
+    )
+
+
+def _iter_pdf_pages_parallel(
+    path: Path, total_pages: int, workers: int, pages_per_task: int
+) -> Iterator[str]:
+    """
+    Page texts in order, extracted by a process pool `pages_per_task` pages
+    at a time. At most 2 * workers ranges are in flight, so a slow consumer
+    (embedding) keeps memory bounded.
+    """
+    ranges = (
+        (start, min(start + pages_per_task, total_pages))
+        for start in range(0, total_pages, pages_per_task)
+    )
+    # forkserver/spawn: forking a worker that already runs model threads is unsafe.
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_pdf_worker,
+        initargs=(str(path),),
+    )
+    try:
+        in_flight = deque(
+            pool.submit(_extract_pdf_pages, *r) for r in islice(ranges, 2 * workers)
+        )
+        while in_flight:
+            texts = in_flight.popleft().result()
+            for r in islice(ranges, 1):
+                in_flight.append(pool.submit(_extract_pdf_pages, *r))
+            yield from texts
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_pdf(
+    path: Path,
+    reader: Any,
+    total_pages: int,
+    *,
+    workers: int,
+    min_pages: int,
+    pages_per_task: int,
+) -> Iterator[TextSegment]:
+    done = 0
+    # More processes than cores only adds startup and pickling overhead.
+    workers = min(workers, os.cpu_count() or 1)
+    if workers > 1 and total_pages >= max(min_pages, 2):
+        try:
+            for text in _iter_pdf_pages_parallel(
+                path,
+                total_pages,
+                min(workers, -(-total_pages // max(pages_per_task, 1))),
+                max(pages_per_task, 1),
+            ):
+                yield _pdf_segment(text, done, total_pages)
+                done += 1
             return
-        combined = "\n\n".join(current).strip()
-        if combined:
-            chunks.append(combined)
-        current = []
-        current_len = 0
-
-    for b in blocks:
-        if len(b) > chunk_size:
-            flush()
-            start = 0
-            while start < len(b):
-                end = min(start + chunk_size, len(b))
-                seg = b[start:end].strip()
-                if seg:
-                    chunks.append(seg)
-                start = end - overlap if end - overlap > start else end
-            continue
-
-        add_len = len(b) + (2 if current else 0)
-        if current and current_len + add_len > chunk_size:
-            flush()
-        current.append(b)
-        current_len += add_len
-
-    flush()
-
-    if overlap <= 0 or len(chunks) <= 1:
-        return chunks
-
-    out: list[str] = []
-    prev_tail = ""
-    for c in chunks:
-        if prev_tail:
-            out.append((prev_tail + "\n\n" + c).strip())
-        else:
-            out.append(c)
-        prev_tail = c[-overlap:] if len(c) > overlap else c
-    return out
+        except Exception as exc:
+            # E.g. no child processes allowed here; the rest goes sequentially.
+            logger.warning(
+                "parallel PDF extraction of %s stopped at page %d, continuing in-process: %s",
+                path,
+                done,
+                exc,
+            )
+
+    for page_no in range(done, total_pages):
+        yield _pdf_segment(_extract_page(reader, page_no), page_no, total_pages)
 
 
-def extract_text_from_path(path: Path, mime_type: str | None) -> str:
+def iter_text_from_path(
+    path: Path,
+    mime_type: str | None,
+    *,
+    pdf_workers: int = 0,
+    pdf_parallel_min_pages: int = 0,
+    pdf_pages_per_task: int = 8,
+) -> Iterator[TextSegment]:
     """
-    Best-effort text extraction.
+    Best-effort streaming text extraction.
+
+    Text files are read block by block, PDFs page by page and DOCX paragraph by
+    paragraph. Segments carry their own separators, so concatenating every
+    segment gives the full document text. PDF segments carry their page
+    number; with pdf_workers > 1, PDFs of at least pdf_parallel_min_pages
+    pages are extracted by a process pool (still yielded in page order).
     """
     mt = (mime_type or "").lower()
     suffix = path.suffix.lower()
 
     if mt.startswith("text/") or suffix in {".txt", ".md", ".csv", ".log"}:
-        return path.read_text(encoding="utf-8", errors="ignore")
+        yield from _iter_plain_text(path)
+        return
 
     if mt == "application/pdf" or suffix == ".pdf":
+        reader = None
         try:
             from pypdf import PdfReader  # type: ignore
 
             reader = PdfReader(str(path))
-            parts: list[str] = []
-            for page in reader.pages:
-                t = page.extract_text() or ""
-                if t.strip():
-                    parts.append(t)
-            return "\n\n".join(parts)
+            total_pages = len(reader.pages)
         except Exception:
-            pass
+            reader = None
+
+        if reader is not None:
+            yield from _iter_pdf(
+                path,
+                reader,
+                total_pages,
+                workers=pdf_workers,
+                min_pages=pdf_parallel_min_pages,
+                pages_per_task=pdf_pages_per_task,
+            )
+            return
 
     if suffix == ".docx" or mt in {
         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
     }:
+        paragraphs = None
         try:
             import docx  # type: ignore
 
-            doc = docx.Document(str(path))
-            return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+            paragraphs = docx.Document(str(path)).paragraphs
         except Exception:
-            pass
+            paragraphs = None
+
+        if paragraphs is not None:
+            total_paragraphs = max(len(paragraphs), 1)
+            for idx, p in enumerate(paragraphs):
+                yield TextSegment(
+                    text=p.text + "\n" if p.text.strip() else "",
+                    progress=(idx + 1) / total_paragraphs,
+                )
+            return
 
-    return path.read_bytes().decode("utf-8", errors="ignore")
+    yield from _iter_plain_text(path)
 
 
+def extract_text_from_path(path: Path, mime_type: str | None, **options: int) -> str:
+    """
+    Best-effort text extraction (options as for iter_text_from_path).
+    """
+    return "".join(
+        seg.text for seg in iter_text_from_path(path, mime_type, **options)
+    ).strip()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, TypeVar
+
+A = TypeVar("A")
+B = TypeVar("B")
+
+# How often blocked stages check whether the pipeline was stopped.
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class _Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class StagePipeline:
+    """
+    Chain of iterator stages, each running in its own thread and handing
+    items to the next one through a bounded queue of `depth` items. The
+    slowest stage sets the pace; the others block on a full (or empty) queue
+    instead of buffering without limit. An exception in any stage is
+    re-raised to the consumer, and leaving the `with` block stops and joins
+    every stage.
+
+    With depth 0 the stages run inline in the consumer's thread, one after
+    another, with the same timings.
+
+    `seconds` holds each stage's busy time (waiting on its queues excluded),
+    so comparing their sum to the wall time shows how much overlapped.
+    """
+
+    def __init__(self, depth: int) -> None:
+        self.depth = max(int(depth), 0)
+        self.seconds: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._started = time.perf_counter()
+
+    def __enter__(self) -> StagePipeline:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self.seconds["wall"] = time.perf_counter() - self._started
+
+    def source(self, name: str, items: Iterable[A]) -> Iterator[A]:
+        """First stage: produce `items` (the time to produce each is timed)."""
+        return self._stage(name, self._timed_iter(name, items))
+
+    def map(self, name: str, fn: Callable[[A], B], items: Iterable[A]) -> Iterator[B]:
+        """Next stage: apply `fn` to every item of the previous stage."""
+        return self._stage(name, self._timed_map(name, fn, items))
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Time work done by the consumer itself (the last stage)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, started)
+
+    def _add(self, name: str, started: float) -> None:
+        # Each name is only updated from its own stage's thread.
+        self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+    def _timed_iter(self, name: str, items: Iterable[A]) -> Iterator[A]:
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._add(name, started)
+                return
+            self._add(name, started)
+            yield item
+
+    def _timed_map(
+        self, name: str, fn: Callable[[A], B], items: Iterable[A]
+    ) -> Iterator[B]:
+        for item in items:
+            with self.timed(name):
+                out = fn(item)
+            yield out
+
+    def _stage(self, name: str, items: Iterator[B]) -> Iterator[B]:
+        if self.depth == 0:
+            return items
+        q: queue.Queue = queue.Queue(maxsize=self.depth)
+        thread = threading.Thread(
+            target=self._run, args=(items, q), name=f"pipeline-{name}", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+        return self._drain(q)
+
+    def _put(self, q: queue.Queue, item: object) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, items: Iterator[object], q: queue.Queue) -> None:
+        try:
+            for item in items:
+                if not self._put(q, item):
+                    return
+        except BaseException as e:
+            self._put(q, _Failed(e))
+            return
+        finally:
+            # Closes the upstream generators in this thread too.
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+        self._put(q, _DONE)
+
+    def _drain(self, q: queue.Queue) -> Iterator[B]:
+        while True:
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
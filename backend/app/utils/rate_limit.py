@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import asyncio
+
+
+class AsyncRateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart across all coroutines of one
+    event loop; callers over the rate wait for their slot. rate <= 0
+    disables the limit.
+    """
+
+    def __init__(self, rate_per_second: float) -> None:
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self.waited_seconds = 0.0
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # No await between reading and booking the slot, so no lock needed.
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            self.waited_seconds += slot - now
+            await asyncio.sleep(slot - now)
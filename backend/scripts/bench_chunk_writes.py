@@ -0,0 +1,100 @@
+"""
+Compare knowledge chunk write throughput for each ingestion write mode.
+
+Usage (from backend/):
+    uv run python scripts/bench_chunk_writes.py
+    uv run python scripts/bench_chunk_writes.py --sizes 1000 10000 --modes copy executemany
+
+Rows are written for a throwaway user/document inside a transaction that is
+rolled back, so the database is left untouched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import Sync_session  # noqa: E402
+import app.models  # noqa: E402,F401
+from app.models.knowledge_document import KnowledgeDocument  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.chunk_writer import WRITE_MODES, build_chunk_rows, write_chunks  # noqa: E402
+
+BATCH_SIZE = 64
+
+
+def _synthetic_batch(rng: np.random.Generator, n: int) -> tuple[list[str], list[list[float]]]:
+    mat = rng.standard_normal((n, settings.EMBEDDING_DIM)).astype(np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+    contents = ["lorem ipsum dolor sit amet " * 25 for _ in range(n)]
+    return contents, mat.tolist()
+
+
+def _run_once(mode: str, total: int) -> float:
+    rng = np.random.default_rng(0)
+    with Sync_session() as db:
+        user = User(
+            username=f"bench_{uuid.uuid4().hex[:12]}",
+            email=f"bench_{uuid.uuid4().hex[:12]}@example.com",
+            hashed_password="x",
+        )
+        db.add(user)
+        db.flush()
+        document = KnowledgeDocument(
+            user_id=user.id,
+            original_filename="bench.txt",
+            stored_filename="bench.txt",
+            file_path="/dev/null",
+            file_size=0,
+            status="processing",
+        )
+        db.add(document)
+        db.flush()
+
+        elapsed = 0.0
+        written = 0
+        while written < total:
+            n = min(BATCH_SIZE, total - written)
+            contents, embeddings = _synthetic_batch(rng, n)
+            started = time.perf_counter()
+            write_chunks(
+                db,
+                build_chunk_rows(
+                    document.id, user.id, None, written, contents, embeddings
+                ),
+                mode=mode,
+            )
+            db.flush()
+            elapsed += time.perf_counter() - started
+            written += n
+
+        db.rollback()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", choices=WRITE_MODES, default=list(WRITE_MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'chunks':>8} {'seconds':>9} {'chunks/s':>10}")
+    for total in args.sizes:
+        for mode in args.modes:
+            elapsed = _run_once(mode, total)
+            rate = total / elapsed if elapsed > 0 else float("inf")
+            print(f"{mode:<12} {total:>8} {elapsed:>9.2f} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of the knowledge chunker on multi-MB markdown and plain text.
+
+Usage (from backend/):
+    uv run python scripts/bench_chunker.py
+    uv run python scripts/bench_chunker.py --mb 2 8 32 --files docs/big.md
+    uv run python scripts/bench_chunker.py --tokens   # also token-budget mode
+
+Inputs are synthetic (markdown with headings/lists/code, and plain text with
+long single-newline paragraphs) unless --files is given. Each input is fed
+to the chunker in 256 KiB pieces, as ingestion does. Reported: throughput,
+chunk count and the peak memory traced while chunking. Token mode loads the
+embedding model's tokenizer.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.utils.knowledge_ingestion import TokenOffsets, iter_chunks  # noqa: E402
+
+PIECE_CHARS = 256 * 1024
+WORDS = (
+    "the of and to in is that for it as with was on be by this are from or an "
+    "which at not have has but were can all their more its also one other than "
+    "data model query index vector chunk token document search result value"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 24))
+    return " ".join(words).capitalize() + "."
+
+
+def _markdown(rng: random.Random, chars: int) -> str:
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        kind = rng.random()
+        if kind < 0.1:
+            part = "#" * rng.randint(1, 3) + " " + " ".join(rng.choices(WORDS, k=4)).title()
+        elif kind < 0.25:
+            part = "\n".join("- " + _sentence(rng) for _ in range(rng.randint(2, 8)))
+        elif kind < 0.3:
+            part = "```\n" + "\n".join(
+                f"x{i} = {rng.randint(0, 999)}" for i in range(rng.randint(3, 20))
+            ) + "\n```"
+        else:
+            part = " ".join(_sentence(rng) for _ in range(rng.randint(2, 10)))
+        parts.append(part)
+        size += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def _plain_text(rng: random.Random, chars: int) -> str:
+    # Hard-wrapped paragraphs: many single newlines, few blank lines.
+    lines: list[str] = []
+    size = 0
+    while size < chars:
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(5, 60)))
+        wrapped = [paragraph[i : i + 78] for i in range(0, len(paragraph), 78)]
+        lines.append("\n".join(wrapped))
+        size += len(paragraph) + len(wrapped) + 2
+    return "\n\n".join(lines)
+
+
+def _pieces(text: str) -> list[tuple[str, int | None]]:
+    return [(text[i : i + PIECE_CHARS], None) for i in range(0, len(text), PIECE_CHARS)]
+
+
+def _run(text: str, chunk: Callable[[list[tuple[str, int | None]]], int]) -> tuple[float, int, int]:
+    pieces = _pieces(text)
+    started = time.perf_counter()
+    count = chunk(pieces)
+    elapsed = time.perf_counter() - started
+
+    # Separate traced run: tracemalloc slows allocation down a lot.
+    tracemalloc.start()
+    chunk(pieces)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, count, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=float, nargs="+", default=[2, 8])
+    parser.add_argument("--files", type=Path, nargs="*", default=[])
+    parser.add_argument("--chunk-size", type=int, default=settings.KNOWLEDGE_CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=settings.KNOWLEDGE_CHUNK_OVERLAP)
+    parser.add_argument("--tokens", action="store_true", help="also run token-budget mode")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    inputs: list[tuple[str, str]] = []
+    for mb in args.mb:
+        chars = int(mb * 1024 * 1024)
+        inputs.append((f"markdown {mb:g}MB", _markdown(rng, chars)))
+        inputs.append((f"text {mb:g}MB", _plain_text(rng, chars)))
+    for path in args.files:
+        inputs.append((path.name, path.read_text(encoding="utf-8", errors="ignore")))
+
+    modes: list[tuple[str, int, int, TokenOffsets | None]] = [
+        ("chars", args.chunk_size, args.overlap, None)
+    ]
+    if args.tokens:
+        from app.services.embedding_service import EmbeddingService
+
+        embedder = EmbeddingService()
+        budget = settings.KNOWLEDGE_CHUNK_MAX_TOKENS or embedder.token_budget()
+        modes.append(
+            (
+                "tokens",
+                min(budget, embedder.token_budget()),
+                settings.KNOWLEDGE_CHUNK_OVERLAP_TOKENS,
+                embedder.token_offsets,
+            )
+        )
+
+    print(f"{'input':<16} {'mode':<7} {'MB/s':>8} {'chunks':>8} {'avg chars':>10} {'peak MiB':>9}")
+    for name, text in inputs:
+        for mode, size, overlap, token_offsets in modes:
+
+            def chunk(pieces: list[tuple[str, int | None]]) -> int:
+                total = 0
+                for _ in iter_chunks(pieces, size, overlap, token_offsets=token_offsets):
+                    total += 1
+                return total
+
+            elapsed, count, peak = _run(text, chunk)
+            mb = len(text) / (1024 * 1024)
+            print(
+                f"{name:<16} {mode:<7} {mb / elapsed:>8.1f} {count:>8} "
+                f"{len(text) / max(count, 1):>10.0f} {peak / (1024 * 1024):>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Parity check and throughput benchmark for the embedding backends.
+
+Usage (from backend/):
+    uv run python scripts/bench_embedding_backends.py
+    uv run python scripts/bench_embedding_backends.py --texts 2000 --min-cosine 0.98
+
+Encodes the same synthetic texts with the PyTorch and ONNX backends, prints
+texts/sec for each, and compares the vectors row by row. Exits non-zero when
+any pair's cosine similarity falls below --min-cosine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+WORDS = (
+    "goal plan task review progress knowledge document summary weekly habit "
+    "learning python design pattern health routine project deadline meeting "
+    "目标 计划 任务 学习 总结 进度 知识 文档"
+).split()
+
+
+def _synthetic_texts(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 120)))
+        for _ in range(n)
+    ]
+
+
+def _bench(backend: str, texts: list[str]) -> tuple[np.ndarray, float]:
+    service = EmbeddingService(backend=backend)
+    service._encode(texts[:8])  # load + warm up outside the timed region
+    started = time.perf_counter()
+    mat = service._encode(texts)
+    return mat, len(texts) / (time.perf_counter() - started)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = _synthetic_texts(args.texts)
+    torch_mat, torch_rate = _bench("torch", texts)
+    onnx_mat, onnx_rate = _bench("onnx", texts)
+
+    # Both matrices are L2-normalized, so the row-wise dot product is the cosine.
+    cosine = np.sum(torch_mat * onnx_mat, axis=1)
+
+    print(f"model: {settings.EMBEDDING_MODEL_NAME}")
+    print(f"onnx quantization: {settings.EMBEDDING_ONNX_QUANTIZATION or 'none (fp32)'}")
+    print(f"{'backend':<8} {'texts/s':>10}")
+    print(f"{'torch':<8} {torch_rate:>10.1f}")
+    print(f"{'onnx':<8} {onnx_rate:>10.1f}  ({onnx_rate / torch_rate:.2f}x)")
+    print(
+        f"cosine(torch, onnx): mean={cosine.mean():.4f} "
+        f"min={cosine.min():.4f} p1={np.percentile(cosine, 1):.4f}"
+    )
+
+    if cosine.min() < args.min_cosine:
+        print(f"FAIL: min cosine {cosine.min():.4f} < {args.min_cosine}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Compare knowledge search with full ORM entities against the column projection.
+
+Usage (from backend/):
+    uv run python scripts/bench_search_projection.py --user-id <uuid>
+    uv run python scripts/bench_search_projection.py --user-id <uuid> --top-k 20 --iterations 100
+
+Both variants rank the user's chunks exactly by cosine distance; they only
+differ in what is selected. "entities" loads KnowledgeChunk and
+KnowledgeDocument (embedding included), as search() used to; "projected"
+fetches just the columns of a KnowledgeSearchHit; "preview" also truncates
+the content server-side, as /query does. Payload bytes are the summed
+pg_column_size of the result rows, i.e. what Postgres has to send.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import Sync_session  # noqa: E402
+import app.models  # noqa: E402,F401
+from app.models.knowledge_chunk import KnowledgeChunk  # noqa: E402
+from app.models.knowledge_document import KnowledgeDocument  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+from app.services.knowledge_service import _hit_columns  # noqa: E402
+
+DEFAULT_QUERIES = [
+    "what is the main idea of this document",
+    "list the deadlines mentioned",
+    "how do I configure the database connection",
+    "summary of chapter two",
+]
+
+
+def _statement(
+    variant: str,
+    user_id: uuid.UUID,
+    embedding: list[float],
+    top_k: int,
+    *,
+    as_columns: bool = False,
+):
+    distance = KnowledgeChunk.embedding.cosine_distance(embedding)
+    if variant == "entities" and as_columns:
+        # What loading the entities fetches (deferred columns excluded).
+        columns = [
+            c for c in KnowledgeChunk.__table__.c if c.key != "content_tsv"
+        ] + list(KnowledgeDocument.__table__.c)
+    elif variant == "entities":
+        columns = [KnowledgeChunk, KnowledgeDocument]
+    else:
+        columns = _hit_columns(
+            settings.KNOWLEDGE_CONTEXT_PREVIEW_CHARS if variant == "preview" else None
+        )
+    return (
+        select(*columns, distance.label("score"))
+        .select_from(KnowledgeChunk)
+        .join(KnowledgeDocument, KnowledgeChunk.document_id == KnowledgeDocument.id)
+        .where(
+            KnowledgeChunk.user_id == user_id,
+            KnowledgeChunk.is_deleted.is_(False),
+            KnowledgeDocument.is_deleted.is_(False),
+        )
+        .order_by(distance)
+        .limit(top_k)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user-id", type=uuid.UUID, required=True)
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    embeddings = EmbeddingService()._encode(args.queries).tolist()
+    variants = ("entities", "projected", "preview")
+
+    print(f"{'variant':<10} {'p50 ms':>8} {'p95 ms':>8} {'bytes/query':>12}")
+    with Sync_session() as db:
+        for variant in variants:
+            statements = [
+                _statement(variant, args.user_id, emb, args.top_k) for emb in embeddings
+            ]
+            # Warm the plan cache and shared buffers before timing.
+            for stmt in statements:
+                db.execute(stmt).all()
+                db.expunge_all()
+
+            latencies = []
+            for _ in range(args.iterations):
+                for stmt in statements:
+                    started = time.perf_counter()
+                    db.execute(stmt).all()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    # Keep the identity map from turning later runs into cache hits.
+                    db.expunge_all()
+
+            payload = 0
+            for emb in embeddings:
+                rows = _statement(
+                    variant, args.user_id, emb, args.top_k, as_columns=True
+                ).subquery()
+                size = db.execute(
+                    select(func.coalesce(func.sum(func.pg_column_size(rows.table_valued())), 0))
+                ).scalar_one()
+                payload += int(size)
+
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(
+                f"{variant:<10} {p50:>8.2f} {p95:>8.2f} {payload // len(statements):>12}"
+            )
+        db.rollback()
+
+
+if __name__ == "__main__":
+    main()
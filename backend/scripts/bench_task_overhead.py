@@ -0,0 +1,99 @@
+"""
+Per-call overhead of running async code from Celery tasks.
+
+Usage (from backend/):
+    uv run python scripts/bench_task_overhead.py
+    uv run python scripts/bench_task_overhead.py --chunks 5000 --db
+
+Embedding: ingestion used to wrap every batch in
+asyncio.run(embedder.embed_texts(batch)), i.e. a new event loop plus a
+thread hop around the blocking encode; it now calls embed_texts_sync. This
+times both dispatch paths around a no-op and reports the cost per batch and
+per document of --chunks chunks (the encode itself is the same either way).
+
+With --db, also compares a summary-style task invocation (open a session,
+SELECT 1) via asyncio.run with a fresh engine, which is what a new loop per
+task amounts to since asyncpg connections can't move between loops, against
+run_async on the worker's persistent loop and pooled connections.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.core.worker_loop import close_worker_loop, run_async  # noqa: E402
+
+BATCH_SIZE = 64
+
+
+def _per_call(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def _bench_embed_dispatch(chunks: int, repeat: int) -> None:
+    batch = ["x"] * BATCH_SIZE
+
+    async def _old() -> int:
+        return await asyncio.to_thread(len, batch)
+
+    old = _per_call(lambda: asyncio.run(_old()), repeat)
+    new = _per_call(lambda: len(batch), repeat)
+    batches = -(-chunks // BATCH_SIZE)
+    print(f"embedding dispatch, {batches} batches per {chunks}-chunk document")
+    print(f"  asyncio.run + to_thread  {old * 1e6:>9.1f} us/batch  {old * batches * 1e3:>8.2f} ms/doc")
+    print(f"  embed_texts_sync         {new * 1e6:>9.1f} us/batch  {new * batches * 1e3:>8.2f} ms/doc")
+
+
+def _bench_db(repeat: int) -> None:
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.core.db import Async_session
+
+    async def _select(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+        async with sessionmaker() as db:
+            await db.execute(text("SELECT 1"))
+
+    async def _fresh() -> None:
+        engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+        try:
+            await _select(async_sessionmaker(engine, class_=AsyncSession))
+        finally:
+            await engine.dispose()
+
+    old = _per_call(lambda: asyncio.run(_fresh()), repeat)
+    new = _per_call(lambda: run_async(_select(Async_session)), repeat)
+    close_worker_loop()
+    print("task invocation (session + SELECT 1)")
+    print(f"  asyncio.run, new engine  {old * 1e3:>9.2f} ms/call")
+    print(f"  run_async, pooled        {new * 1e3:>9.2f} ms/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks per document")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--db", action="store_true", help="also time DB task invocations")
+    args = parser.parse_args()
+
+    _bench_embed_dispatch(args.chunks, args.repeat)
+    if args.db:
+        _bench_db(min(args.repeat, 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Recall/latency benchmark of pgvector ANN indexes against exact search.
+
+Usage (from backend/):
+    uv run python scripts/bench_vector_index.py
+    uv run python scripts/bench_vector_index.py --rows 200000 --index hnsw --ef-search 20 40 80 200
+
+Loads synthetic clustered unit vectors into a temporary table, builds the
+requested index, then for each search setting reports recall@k (against an
+exact sequential scan) and p50/p95 query latency. Nothing outside the
+temporary table is touched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import sync_engine  # noqa: E402
+
+
+def _synthetic_vectors(rng: np.random.Generator, n: int, dim: int, clusters: int) -> np.ndarray:
+    # Real embeddings are clustered by topic; uniform noise would flatter IVF/HNSW.
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    mat = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+    return mat
+
+
+def _search(cur, query: np.ndarray, k: int) -> tuple[list[int], float]:
+    started = time.perf_counter()
+    cur.execute(
+        "SELECT id FROM bench_vectors ORDER BY embedding <=> %s LIMIT %s",
+        (query, k),
+    )
+    ids = [row[0] for row in cur.fetchall()]
+    return ids, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--index", choices=("hnsw", "ivfflat"), default="hnsw")
+    parser.add_argument("--m", type=int, default=settings.KNOWLEDGE_HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=settings.KNOWLEDGE_HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[20, 40, 64, 100, 200])
+    parser.add_argument("--lists", type=int, default=0, help="ivfflat lists (default: sqrt(rows))")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    args = parser.parse_args()
+
+    from pgvector.psycopg import register_vector  # type: ignore
+
+    dim = settings.EMBEDDING_DIM
+    rng = np.random.default_rng(0)
+    data = _synthetic_vectors(rng, args.rows, dim, args.clusters)
+    queries = _synthetic_vectors(rng, args.queries, dim, args.clusters)
+
+    raw = sync_engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        conn.autocommit = True
+        register_vector(conn)
+        cur = conn.cursor()
+        cur.execute(f"CREATE TEMP TABLE bench_vectors (id int PRIMARY KEY, embedding vector({dim}))")
+
+        started = time.perf_counter()
+        with cur.copy("COPY bench_vectors (id, embedding) FROM STDIN WITH (FORMAT BINARY)") as copy:
+            copy.set_types(["int4", "vector"])
+            for i, vec in enumerate(data):
+                copy.write_row([i, vec])
+        print(f"loaded {args.rows} vectors (dim={dim}) in {time.perf_counter() - started:.1f}s")
+
+        # No index yet, so this is an exact sequential scan.
+        exact = [_search(cur, q, args.k)[0] for q in queries]
+
+        started = time.perf_counter()
+        if args.index == "hnsw":
+            cur.execute(
+                "CREATE INDEX ON bench_vectors USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+            )
+            guc, values = "hnsw.ef_search", args.ef_search
+        else:
+            lists = args.lists or max(int(args.rows ** 0.5), 1)
+            cur.execute(
+                "CREATE INDEX ON bench_vectors USING ivfflat (embedding vector_cosine_ops) "
+                f"WITH (lists = {lists})"
+            )
+            guc, values = "ivfflat.probes", args.probes
+        cur.execute("ANALYZE bench_vectors")
+        print(f"built {args.index} index in {time.perf_counter() - started:.1f}s")
+
+        print(f"{guc:<16} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for value in values:
+            cur.execute("SELECT set_config(%s, %s, false)", (guc, str(value)))
+            hits = 0
+            latencies = []
+            for q, truth in zip(queries, exact):
+                ids, elapsed = _search(cur, q, args.k)
+                hits += len(set(ids) & set(truth))
+                latencies.append(elapsed * 1000)
+            recall = hits / (len(queries) * args.k)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            print(f"{value:<16} {recall:>10.3f} {p50:>8.2f} {p95:>8.2f}")
+    finally:
+        raw.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Check that the hot service queries are served by the live-row partial indexes.
+
+Usage (from backend/):
+    uv run python scripts/explain_hot_queries.py
+    uv run python scripts/explain_hot_queries.py --users 200 --rows 500 --allow-seqscan
+
+Seeds synthetic users (with a share of soft-deleted rows in every table)
+inside a transaction that is rolled back, runs EXPLAIN ANALYZE on each query
+and checks that one of its expected indexes appears in the plan. Exits with
+status 1 if any query regressed, so it can run in CI after migrations.
+
+The statements come from the services' own statement builders, so a query
+that changes shape in app/services is checked as it now is. By default sequential scans are disabled: on a
+small seeded database the planner would rightly prefer them, and what is
+checked here is that the partial index is usable and beats the other
+indexes. Pass --allow-seqscan (with enough --users/--rows) to check the
+planner's real choice.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import ClauseElement, Executable, insert, text  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.db import Sync_session  # noqa: E402
+import app.models  # noqa: E402,F401
+from app.models.goal import Goal  # noqa: E402
+from app.models.knowledge_document import KnowledgeDocument  # noqa: E402
+from app.models.phase import Phase  # noqa: E402
+from app.models.summary import Summary  # noqa: E402
+from app.models.task import Task  # noqa: E402
+from app.models.task_list import TaskList  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.summary import SummaryType  # noqa: E402
+from app.services.goal_service import GoalService  # noqa: E402
+from app.services.knowledge_service import KnowledgeService  # noqa: E402
+from app.services.phase_service import PhaseService  # noqa: E402
+from app.services.summary_service import SummaryService  # noqa: E402
+from app.services.task_service import TaskListService, TaskService  # noqa: E402
+from app.utils.chunk_writer import build_chunk_rows, write_chunks  # noqa: E402
+
+SEEDED_TABLES = (
+    "users",
+    "goals",
+    "task_lists",
+    "tasks",
+    "phases",
+    "summaries",
+    "knowledge_documents",
+    "knowledge_chunks",
+)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper that keeps SQLAlchemy's bind processing (e.g. vectors)."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Any) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (ANALYZE, FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@dataclass(frozen=True)
+class Target:
+    """Keys of one seeded user's live rows, used to parameterise the queries."""
+
+    user_id: uuid.UUID
+    goal_id: uuid.UUID
+    goal_name: str
+    task_list_id: uuid.UUID
+    task_list_name: str
+    content_sha256: str
+    embedding: list[float]
+
+
+def _list_tasks(t: Target):
+    return TaskService._list_tasks_statement(t.user_id)
+
+
+def _list_tasks_by_list(t: Target):
+    return TaskService._list_tasks_statement(t.user_id, t.task_list_id)
+
+
+def _count_overdue_tasks(t: Target):
+    return TaskService._count_overdue_tasks_statement(t.user_id)
+
+
+def _count_completed_tasks(t: Target):
+    return TaskService._count_completed_tasks_statement(t.user_id)
+
+
+def _count_tasks_by_goal(t: Target):
+    return TaskService._count_tasks_by_goal_statement(t.user_id, t.goal_id)
+
+
+def _list_task_lists(t: Target):
+    return TaskListService._list_task_lists_statement(t.user_id)
+
+
+def _list_task_lists_by_goal(t: Target):
+    return TaskListService._list_task_lists_statement(t.user_id, t.goal_id)
+
+
+def _get_task_list_by_name(t: Target):
+    return TaskListService._get_task_list_by_name_statement(t.task_list_name, t.user_id)
+
+
+def _list_goals(t: Target):
+    return GoalService._list_goals_statement(t.user_id)
+
+
+def _get_goal_by_name(t: Target):
+    return GoalService._get_goal_by_name_statement(t.goal_name, t.user_id)
+
+
+def _list_phases(t: Target):
+    return PhaseService._list_phases_statement(t.goal_id)
+
+
+def _list_summaries(t: Target):
+    return SummaryService._list_summaries_statement(t.user_id, SummaryType.weekly)
+
+
+def _list_documents(t: Target):
+    return KnowledgeService._list_documents_statement(t.user_id)
+
+
+def _list_documents_by_goal(t: Target):
+    return KnowledgeService._list_documents_statement(
+        t.user_id, KnowledgeDocument.goal_id == t.goal_id
+    )
+
+
+def _list_documents_unassigned(t: Target):
+    return KnowledgeService._list_documents_statement(
+        t.user_id, KnowledgeDocument.goal_id.is_(None)
+    )
+
+
+def _find_duplicate(t: Target):
+    return KnowledgeService._find_duplicate_statement(t.user_id, t.content_sha256)
+
+
+def _search(t: Target, *, hybrid: bool):
+    # The small-tenant (exact) path of KnowledgeService.search.
+    return KnowledgeService()._search_statement(
+        "lorem",
+        t.embedding,
+        KnowledgeService._search_filters(t.user_id),
+        exact=True,
+        hybrid=hybrid,
+        top_k=5,
+        limit=5,
+    )
+
+
+def _search_exact(t: Target):
+    return _search(t, hybrid=False)
+
+
+def _search_exact_hybrid(t: Target):
+    return _search(t, hybrid=True)
+
+
+TASKS_BY_LIST = "ix_tasks_user_id_task_list_id_live"
+TASKS_BY_STATE = "ix_tasks_user_id_is_completed_end_date_live"
+LISTS_BY_GOAL = "ix_task_lists_user_id_goal_id_live"
+DOCS_BY_DATE = "ix_knowledge_documents_user_id_created_at_live"
+DOCS_BY_GOAL = "ix_knowledge_documents_user_id_goal_id_created_at_live"
+
+# (query, acceptable indexes, statement builder)
+HOT_QUERIES: list[tuple[str, tuple[str, ...], Callable[[Target], Any]]] = [
+    ("TaskService.list_tasks", (TASKS_BY_LIST, TASKS_BY_STATE), _list_tasks),
+    ("TaskService.list_tasks(task_list_id)", (TASKS_BY_LIST,), _list_tasks_by_list),
+    ("TaskService.count_overdue_tasks", (TASKS_BY_STATE,), _count_overdue_tasks),
+    ("TaskService.count_completed_tasks", (TASKS_BY_STATE,), _count_completed_tasks),
+    ("TaskService.count_tasks_by_goal", ("ix_task_lists_goal_id_live",), _count_tasks_by_goal),
+    (
+        "TaskListService.list_task_lists",
+        (LISTS_BY_GOAL, "ix_task_lists_user_id_name_live"),
+        _list_task_lists,
+    ),
+    ("TaskListService.list_task_lists(goal_id)", (LISTS_BY_GOAL,), _list_task_lists_by_goal),
+    (
+        "TaskListService.get_task_list_by_name",
+        ("ix_task_lists_user_id_name_live",),
+        _get_task_list_by_name,
+    ),
+    ("GoalService.list_goals", ("ix_goals_user_id_created_at_live",), _list_goals),
+    ("GoalService.get_goal_by_name", ("ix_goals_user_id_created_at_live",), _get_goal_by_name),
+    ("PhaseService.list_phases", ("ix_phases_goal_id_live",), _list_phases),
+    (
+        "SummaryService.list_summaries",
+        ("ix_summaries_user_id_type_period_start_live",),
+        _list_summaries,
+    ),
+    ("KnowledgeService.list_documents", (DOCS_BY_DATE, DOCS_BY_GOAL), _list_documents),
+    ("KnowledgeService.list_documents_by_goal", (DOCS_BY_GOAL,), _list_documents_by_goal),
+    (
+        "KnowledgeService.list_documents_unassigned",
+        (DOCS_BY_GOAL,),
+        _list_documents_unassigned,
+    ),
+    (
+        "KnowledgeService._find_duplicate",
+        ("ix_knowledge_documents_user_id_content_sha256",),
+        _find_duplicate,
+    ),
+    ("KnowledgeService.search (exact)", ("ix_knowledge_chunks_user_id_live",), _search_exact),
+    (
+        "KnowledgeService.search (exact, hybrid)",
+        ("ix_knowledge_chunks_user_id_live",),
+        _search_exact_hybrid,
+    ),
+]
+
+
+def _insert(db: Session, model: Any, rows: list[dict[str, Any]]) -> None:
+    if rows:
+        db.execute(insert(model), rows)
+
+
+def _seed(db: Session, users: int, rows: int, dead_ratio: float) -> Target:
+    rng = np.random.default_rng(0)
+    now = datetime.now(timezone.utc)
+    target: Target | None = None
+
+    def dead() -> bool:
+        return bool(rng.random() < dead_ratio)
+
+    for u in range(users):
+        user_id = uuid.uuid4()
+        tag = uuid.uuid4().hex[:12]
+        _insert(
+            db,
+            User,
+            [
+                {
+                    "id": user_id,
+                    "username": f"explain_{tag}",
+                    "email": f"explain_{tag}@example.com",
+                    "hashed_password": "x",
+                }
+            ],
+        )
+
+        goal_ids = [uuid.uuid4() for _ in range(max(rows // 50, 2))]
+        _insert(
+            db,
+            Goal,
+            [
+                {"id": gid, "user_id": user_id, "name": f"goal{i}", "is_deleted": i > 0 and dead()}
+                for i, gid in enumerate(goal_ids)
+            ],
+        )
+        _insert(
+            db,
+            Phase,
+            [
+                {"goal_id": gid, "name": f"phase{i}", "is_deleted": dead()}
+                for gid in goal_ids
+                for i in range(3)
+            ],
+        )
+
+        list_ids = [uuid.uuid4() for _ in range(max(rows // 20, 2))]
+        _insert(
+            db,
+            TaskList,
+            [
+                {
+                    "id": lid,
+                    "user_id": user_id,
+                    "goal_id": goal_ids[i % len(goal_ids)] if i % 2 == 0 else None,
+                    "name": f"list{i}",
+                    "is_deleted": i > 0 and dead(),
+                }
+                for i, lid in enumerate(list_ids)
+            ],
+        )
+        _insert(
+            db,
+            Task,
+            [
+                {
+                    "user_id": user_id,
+                    "task_list_id": list_ids[i % len(list_ids)],
+                    "name": f"task{i}",
+                    "is_completed": bool(rng.random() < 0.5),
+                    "end_date": now + timedelta(days=int(rng.integers(-30, 30))),
+                    "is_deleted": dead(),
+                }
+                for i in range(rows)
+            ],
+        )
+        _insert(
+            db,
+            Summary,
+            [
+                {
+                    "user_id": user_id,
+                    "summary_type": "weekly",
+                    "period_start": date(2024, 1, 1) + timedelta(weeks=w),
+                    "period_end": date(2024, 1, 7) + timedelta(weeks=w),
+                    "period_label": f"w{w}",
+                    "period_year": 2024,
+                    "status": "ready",
+                    "is_deleted": dead(),
+                }
+                for w in range(max(rows // 10, 2))
+            ],
+        )
+
+        doc_ids = [uuid.uuid4() for _ in range(max(rows // 20, 2))]
+        _insert(
+            db,
+            KnowledgeDocument,
+            [
+                {
+                    "id": did,
+                    "user_id": user_id,
+                    "goal_id": goal_ids[i % len(goal_ids)] if i % 2 == 0 else None,
+                    "original_filename": f"doc{i}.txt",
+                    "stored_filename": f"doc{i}.txt",
+                    "file_path": "/dev/null",
+                    "file_size": 0,
+                    "content_sha256": f"{u:032x}{i:032x}",
+                    "status": "ready",
+                    "is_deleted": i > 0 and dead(),
+                }
+                for i, did in enumerate(doc_ids)
+            ],
+        )
+        for did in doc_ids:
+            mat = rng.standard_normal((5, settings.EMBEDDING_DIM)).astype(np.float32)
+            mat /= np.linalg.norm(mat, axis=1, keepdims=True)
+            chunk_rows = build_chunk_rows(
+                did, user_id, None, 0, ["lorem ipsum"] * 5, mat.tolist()
+            )
+            for row in chunk_rows:
+                row["is_deleted"] = dead()
+            write_chunks(db, chunk_rows)
+
+        if target is None:
+            query = rng.standard_normal(settings.EMBEDDING_DIM).astype(np.float32)
+            target = Target(
+                user_id=user_id,
+                goal_id=goal_ids[0],
+                goal_name="goal0",
+                task_list_id=list_ids[0],
+                task_list_name="list0",
+                content_sha256=f"{u:032x}{0:032x}",
+                embedding=(query / np.linalg.norm(query)).tolist(),
+            )
+
+    for table in SEEDED_TABLES:
+        db.execute(text(f"ANALYZE {table}"))
+    assert target is not None
+    return target
+
+
+def _index_names(plan: dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", ()):
+        yield from _index_names(child)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=200, help="tasks per user")
+    parser.add_argument("--dead-ratio", type=float, default=0.5)
+    parser.add_argument("--allow-seqscan", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="print failing plans")
+    args = parser.parse_args()
+
+    failures = 0
+    with Sync_session() as db:
+        target = _seed(db, max(args.users, 1), max(args.rows, 10), args.dead_ratio)
+        if not args.allow_seqscan:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+
+        print(f"{'query':<44} {'ms':>8}  index")
+        for name, expected, build in HOT_QUERIES:
+            raw = db.execute(Explain(build(target))).scalar_one()
+            explained = json.loads(raw) if isinstance(raw, str) else raw
+            plan = explained[0]
+            used = list(dict.fromkeys(_index_names(plan["Plan"])))
+            ok = any(index in used for index in expected)
+            failures += not ok
+            print(
+                f"{name:<44} {plan['Execution Time']:>8.2f}  "
+                f"{'ok  ' if ok else 'FAIL'} {', '.join(used) or 'seq scan'}"
+            )
+            if not ok:
+                print(f"{'':<54} expected one of: {', '.join(expected)}")
+                if args.verbose:
+                    print(json.dumps(plan["Plan"], indent=2))
+        db.rollback()
+
+    if failures:
+        print(f"{failures} of {len(HOT_QUERIES)} queries missed their index")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
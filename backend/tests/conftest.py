@@ -0,0 +1,10 @@
+import os
+
+# Settings are read at import time; tests never reach these services.
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "postgres",
+    "JWT_SECRET_KEY": "test",
+    "REDIS_HOST": "localhost",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum.onnxruntime")
+
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+# Same floor as scripts/bench_embedding_backends.py --min-cosine.
+MIN_COSINE = 0.98
+
+CORPUS = [
+    "Finish the quarterly project review before Friday's meeting.",
+    "Read two chapters of the design patterns book every week.",
+    "Morning routine: run 5 km, stretch, then plan the day's tasks.",
+    "The knowledge base indexes uploaded PDF and Word documents.",
+    "Weekly summary: three goals on track, one deadline slipped.",
+    "学习 Python 并完成每周的学习总结",
+    "目标：本季度完成两个项目，并保持每天的健康习惯",
+    "deadline",
+]
+
+
+def test_onnx_embeddings_match_torch():
+    torch_mat = EmbeddingService(backend="torch")._encode(CORPUS)
+    onnx_mat = EmbeddingService(backend="onnx")._encode(CORPUS)
+
+    # Both matrices are L2-normalized, so the row-wise dot product is the cosine.
+    cosine = np.sum(torch_mat * onnx_mat, axis=1)
+
+    assert torch_mat.shape == onnx_mat.shape
+    assert cosine.min() >= MIN_COSINE, dict(zip(CORPUS, cosine.round(4).tolist()))
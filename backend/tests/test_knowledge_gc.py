@@ -0,0 +1,73 @@
+import os
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.tasks import knowledge_gc
+from app.tasks.knowledge_gc import GcReport
+
+
+class _Session:
+    """Just enough of a Session for _collect_files."""
+
+    def __init__(self, locked=False, referenced=False):
+        self.locked = locked
+        self.referenced = referenced
+        self.commits = 0
+
+    def execute(self, _statement):
+        return SimpleNamespace(
+            # Snapshot of referenced paths: taken before the upload committed.
+            scalars=lambda: [],
+            scalar_one=lambda: not self.locked,
+            first=lambda: (1,) if self.referenced else None,
+        )
+
+    def commit(self):
+        self.commits += 1
+
+
+def _stale_object(root):
+    path = root / "objects" / "ab" / "ab12.txt"
+    path.parent.mkdir(parents=True)
+    path.write_text("x")
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    return path
+
+
+def _collect(monkeypatch, root, db):
+    monkeypatch.setattr(settings, "KNOWLEDGE_STORAGE_ROOT", str(root))
+    report = GcReport(dry_run=False)
+    knowledge_gc._collect_files(db, datetime.now(timezone.utc), report)
+    return report
+
+
+def test_unreferenced_object_is_removed(monkeypatch, tmp_path):
+    path = _stale_object(tmp_path)
+
+    report = _collect(monkeypatch, tmp_path, _Session())
+
+    assert not path.exists()
+    assert report.files_deleted == 1
+
+
+def test_object_locked_by_an_upload_is_kept(monkeypatch, tmp_path):
+    path = _stale_object(tmp_path)
+    db = _Session(locked=True)
+
+    report = _collect(monkeypatch, tmp_path, db)
+
+    assert path.exists()
+    assert report.files_deleted == 0
+    assert db.commits == 1
+
+
+def test_object_referenced_after_the_snapshot_is_kept(monkeypatch, tmp_path):
+    path = _stale_object(tmp_path)
+
+    report = _collect(monkeypatch, tmp_path, _Session(referenced=True))
+
+    assert path.exists()
+    assert report.files_deleted == 0
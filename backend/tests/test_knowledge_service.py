@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import knowledge_service
+from app.services.knowledge_service import KnowledgeService, StoredUpload
+
+
+class _Session:
+    """Just enough of an AsyncSession for replace_document_file."""
+
+    def __init__(self, claimed_id):
+        self.claimed_id = claimed_id
+        self.rolled_back = False
+        self.committed = False
+
+    async def execute(self, _statement):
+        return SimpleNamespace(scalar_one_or_none=lambda: self.claimed_id)
+
+    async def rollback(self):
+        self.rolled_back = True
+
+    async def commit(self):
+        self.committed = True
+
+
+def _document(status):
+    return SimpleNamespace(
+        id=uuid.uuid4(), status=status, content_sha256="old", mime_type="text/plain"
+    )
+
+
+def _replace(service, db, document):
+    async def _get_document(*_args):
+        return document
+
+    service.get_document = _get_document
+    file = SimpleNamespace(content_type="text/plain")
+    return asyncio.run(
+        service.replace_document_file(db, uuid.uuid4(), document.id, file)
+    )
+
+
+def test_replace_is_refused_while_the_document_is_processing(monkeypatch):
+    async def _store_upload(_db, _file):
+        raise AssertionError("the upload must not be stored")
+
+    monkeypatch.setattr(knowledge_service, "_store_upload", _store_upload)
+    db = _Session(claimed_id=None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        _replace(KnowledgeService(), db, _document("processing"))
+
+    assert exc_info.value.status_code == 409
+    assert not db.committed
+
+
+def test_replace_is_refused_when_a_concurrent_replace_claimed_the_document(monkeypatch):
+    async def _store_upload(_db, _file):
+        return StoredUpload("new.txt", Path("/tmp/new.txt"), 3, "new")
+
+    monkeypatch.setattr(knowledge_service, "_store_upload", _store_upload)
+    # The status UPDATE matched no row: another replace set "processing" first.
+    db = _Session(claimed_id=None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        _replace(KnowledgeService(), db, _document("ready"))
+
+    assert exc_info.value.status_code == 409
+    assert db.rolled_back
+    assert not db.committed
+
+
+class _Stream:
+    """File object that counts how much of the upload was read."""
+
+    def __init__(self, size):
+        self.remaining = size
+        self.read_bytes = 0
+
+    def seek(self, _offset):
+        pass
+
+    def read(self, size):
+        chunk = b"x" * min(size, self.remaining)
+        self.remaining -= len(chunk)
+        self.read_bytes += len(chunk)
+        return chunk
+
+
+def test_batch_upload_aborts_once_the_batch_limit_is_exceeded(monkeypatch, tmp_path):
+    mib = 1024 * 1024
+    monkeypatch.setattr(settings, "KNOWLEDGE_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "KNOWLEDGE_MAX_UPLOAD_BYTES", 0)
+    monkeypatch.setattr(settings, "KNOWLEDGE_BATCH_UPLOAD_MAX_BYTES", 3 * mib)
+    monkeypatch.setattr(settings, "KNOWLEDGE_UPLOAD_CONCURRENCY", 1)
+    # Sizes are unknown up front (streamed multipart), so only the running
+    # total can catch the oversized batch.
+    files = [
+        SimpleNamespace(file=_Stream(2 * mib), size=None, filename=f"{i}.txt")
+        for i in range(4)
+    ]
+    db = _Session(claimed_id=None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(KnowledgeService().upload_documents(db, uuid.uuid4(), files))
+
+    assert exc_info.value.status_code == 413
+    # The second file breaks the limit on its second chunk; the rest never start.
+    assert [f.file.read_bytes for f in files] == [2 * mib, 2 * mib, 0, 0]
+    assert not list((tmp_path / "tmp").iterdir())
+    assert not db.committed
@@ -0,0 +1,41 @@
+import asyncio
+import time
+import uuid
+
+from app.services import rerank_service
+from app.services.rerank_service import RerankService
+
+
+class _SlowCrossEncoder:
+    def predict(self, pairs, **_kwargs):
+        time.sleep(0.05)
+        return [float(len(passage)) for _, passage in pairs]
+
+
+def test_concurrent_scores_are_both_reranked(monkeypatch):
+    monkeypatch.setattr(rerank_service, "load_reranker_model", _SlowCrossEncoder)
+    service = RerankService()
+    passages = ["a", "bbb", "cc"]
+
+    async def _run():
+        return await asyncio.gather(
+            service.score("first", [uuid.uuid4() for _ in passages], passages, budget_seconds=2),
+            service.score("second", [uuid.uuid4() for _ in passages], passages, budget_seconds=2),
+        )
+
+    first, second = asyncio.run(_run())
+
+    assert first == second == [1.0, 3.0, 2.0]
+    assert service.stats()["reranked"] == 2
+    assert service.stats()["timeouts"] == 0
+
+
+def test_score_falls_back_when_the_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(rerank_service, "load_reranker_model", _SlowCrossEncoder)
+    service = RerankService()
+
+    async def _run():
+        return await service.score("q", [uuid.uuid4()], ["a"], budget_seconds=0.01)
+
+    assert asyncio.run(_run()) is None
+    assert service.stats()["timeouts"] == 1
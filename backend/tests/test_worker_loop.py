@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.worker_loop import close_worker_loop, run_async
+
+
+@pytest.fixture(autouse=True)
+def _no_loop_left_behind():
+    yield
+    close_worker_loop()
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_async_reuses_the_loop_until_it_is_closed():
+    first = run_async(_current_loop())
+    assert run_async(_current_loop()) is first
+
+    close_worker_loop()
+
+    assert first.is_closed()
+    assert run_async(_current_loop()) is not first
+    close_worker_loop()
+
+
+def test_run_async_refuses_to_run_off_the_main_thread():
+    errors = []
+
+    def _task():
+        try:
+            run_async(_current_loop())
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=_task)
+    thread.start()
+    thread.join()
+
+    assert len(errors) == 1
+
+
+def test_check_pool_logs_unsupported_pools(caplog):
+    from app.core.celery_app import _check_pool
+
+    class _Worker:
+        pool_cls = "threads"
+
+    _check_pool(_Worker())
+    assert "not supported" in caplog.text
+
+    caplog.clear()
+    _Worker.pool_cls = "solo"
+    _check_pool(_Worker())
+    assert not caplog.text